@@ -0,0 +1,271 @@
+# alerts.py
+"""In-memory repeated-vehicle alerts over sliding day windows.
+
+Each rule answers "plates stopped >= min_count times in the last
+window_days days" (same semantics as queries.REPEATED_VEHICLES_SQL:
+stop_date >= today - window_days, NULL / empty plates ignored).
+
+The engine keeps one Counter of stops per plate per day plus, for every
+rule, the running totals for its window and the set of plates currently
+over the threshold. Days that fall out of a window are subtracted when
+the date rolls over, so reading a rule's alerts never scans the table.
+
+On first use the counters are warm-started from checkpost_stops, which
+also records the highest stop id read (the high-water mark). Every
+get_alert_engine() then catches up with `id > mark`: one primary-key
+probe when nothing is new, whichever process inserted the stops (this
+dashboard, securecheck.py ingest, another dashboard). Deletes and
+archiving (db.notify_table_changed) make the next call rebuild, as does
+SECURECHECK_ALERT_RESYNC, which also picks up stops whose id committed
+after a higher one had already been read.
+
+Rules come from SECURECHECK_ALERT_RULES, a comma-separated list of
+name:min_count:window_days (default "repeated_vehicles:2:30").
+"""
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import pandas as pd
+
+from db import on_table_write, run_query
+from queries import TABLE
+
+
+ALERT_RULES = os.environ.get("SECURECHECK_ALERT_RULES", "repeated_vehicles:2:30")
+# counters are rebuilt from the DB this often, to pick up deletes made by other
+# processes and ids that committed out of order
+ALERT_RESYNC_SECONDS = float(os.environ.get("SECURECHECK_ALERT_RESYNC", "600"))
+
+MAX_ID_SQL = f"SELECT MAX(id) AS top FROM {TABLE}"
+
+# per-day plate counts for the stops with low < id <= high
+COUNTS_SQL = f"""
+SELECT stop_date, vehicle_number, COUNT(*) AS cnt
+FROM {TABLE}
+WHERE id > %s AND id <= %s
+  AND vehicle_number IS NOT NULL
+  AND vehicle_number <> ''
+  AND stop_date >= %s
+GROUP BY stop_date, vehicle_number
+"""
+
+
+class AlertRule:
+    """Plates seen at least `min_count` times in the last `window_days` days."""
+
+    def __init__(self, name, min_count=2, window_days=30, limit=50):
+        if min_count < 1 or window_days < 0:
+            raise ValueError("min_count must be >= 1 and window_days >= 0")
+        self.name = name
+        self.min_count = min_count
+        self.window_days = window_days
+        self.limit = limit
+
+    def __repr__(self):
+        return f"AlertRule({self.name!r}, min_count={self.min_count}, window_days={self.window_days})"
+
+
+def parse_rules(spec=ALERT_RULES):
+    """'name:min_count:window_days,...' -> list of AlertRule."""
+    rules = []
+    for part in spec.split(","):
+        if part.strip():
+            name, min_count, window_days = part.strip().split(":")
+            rules.append(AlertRule(name, int(min_count), int(window_days)))
+    return rules
+
+
+class AlertEngine:
+    """Sliding-window plate counters for a set of AlertRules (thread-safe)."""
+
+    def __init__(self, rules=None, today=None):
+        self._lock = threading.Lock()
+        self._days = {}                     # stop_date -> Counter(plate -> stops)
+        self._rules = {}
+        self._totals = {}                   # rule name -> Counter over its window
+        self._hot = {}                      # rule name -> plates at/over min_count
+        self._today = today or date.today()
+        self._sync_lock = threading.Lock()  # one warm start / catch-up at a time
+        self.high_water = None              # highest checkpost_stops.id counted
+        self.warmed_at = None
+        self.stale = False
+        for rule in rules if rules is not None else parse_rules():
+            self.add_rule(rule)
+
+    # ---- rules -------------------------------------------------------
+    def add_rule(self, rule):
+        """Add or replace a rule; its window is rebuilt from the day buckets."""
+        with self._lock:
+            self._rules[rule.name] = rule
+            totals = Counter()
+            for day, counts in self._days.items():
+                if self._in_window(day, rule):
+                    totals.update(counts)
+            self._totals[rule.name] = totals
+            self._hot[rule.name] = {p for p, n in totals.items() if n >= rule.min_count}
+
+    def set_threshold(self, name, min_count):
+        rule = self._rules[name]
+        self.add_rule(AlertRule(rule.name, min_count, rule.window_days, rule.limit))
+
+    def rules(self):
+        return list(self._rules.values())
+
+    def _in_window(self, day, rule):
+        return day >= self._today - timedelta(days=rule.window_days)
+
+    def _max_window(self):
+        return max((r.window_days for r in self._rules.values()), default=0)
+
+    # ---- updates -----------------------------------------------------
+    def _bump(self, name, plate, delta):
+        totals = self._totals[name]
+        totals[plate] += delta
+        if totals[plate] <= 0:
+            del totals[plate]
+        if totals.get(plate, 0) >= self._rules[name].min_count:
+            self._hot[name].add(plate)
+        else:
+            self._hot[name].discard(plate)
+
+    def _advance(self, today):
+        """Roll the windows forward to `today`, subtracting days that aged out."""
+        if today <= self._today:
+            return
+        old_today, self._today = self._today, today
+        for rule in self._rules.values():
+            old_start = old_today - timedelta(days=rule.window_days)
+            new_start = today - timedelta(days=rule.window_days)
+            for day, counts in self._days.items():
+                if old_start <= day < new_start:
+                    for plate, n in counts.items():
+                        self._bump(rule.name, plate, -n)
+        horizon = today - timedelta(days=self._max_window())
+        for day in [d for d in self._days if d < horizon]:
+            del self._days[day]
+
+    def add(self, counts, today=None):
+        """Add {(stop_date, plate): stops} to the counters."""
+        with self._lock:
+            self._advance(today or date.today())
+            horizon = self._today - timedelta(days=self._max_window())
+            for (day, plate), n in counts.items():
+                if day < horizon:
+                    continue
+                self._days.setdefault(day, Counter())[plate] += n
+                for rule in self._rules.values():
+                    if self._in_window(day, rule):
+                        self._bump(rule.name, plate, n)
+
+    def add_stops(self, df, today=None):
+        """Count the stops in a freshly inserted DataFrame."""
+        if df.empty or "stop_date" not in df.columns or "vehicle_number" not in df.columns:
+            return
+        days = pd.to_datetime(df["stop_date"], errors="coerce")
+        plates = df["vehicle_number"].astype(object)
+        keep = days.notna() & plates.notna() & (plates.astype(str) != "")
+        if not keep.any():
+            return
+        counts = pd.DataFrame({"day": days[keep].dt.date, "plate": plates[keep].astype(str)}) \
+            .groupby(["day", "plate"]).size()
+        self.add(counts.to_dict(), today=today)
+
+    def _read_counts(self, low, high, today):
+        start = today - timedelta(days=self._max_window())
+        rows = run_query(COUNTS_SQL, (low, high, start), ttl=0, name="Alert counts")
+        return {(pd.Timestamp(d).date(), str(p)): int(n)
+                for d, p, n in rows[["stop_date", "vehicle_number", "cnt"]].itertuples(index=False)}
+
+    @staticmethod
+    def _max_id():
+        top = run_query(MAX_ID_SQL, ttl=0, name="Alert high-water mark")["top"].iloc[0]
+        return 0 if pd.isna(top) else int(top)
+
+    def warm_start(self, today=None):
+        """Replace all counters with per-day counts read from the database."""
+        today = today or date.today()
+        with self._sync_lock:
+            top = self._max_id()
+            counts = self._read_counts(0, top, today)
+            with self._lock:
+                self._days.clear()
+                self._today = today
+                for name in self._rules:
+                    self._totals[name] = Counter()
+                    self._hot[name] = set()
+            self.add(counts, today=today)
+            self.high_water = top
+            self.warmed_at = time.time()
+            self.stale = False
+        return len(counts)
+
+    def catch_up(self, today=None):
+        """Count the stops inserted since the last read (id above the high-water mark).
+
+        Returns the number of (day, plate) counts added.
+        """
+        if self.high_water is None:
+            return self.warm_start(today)
+        with self._sync_lock:
+            top = self._max_id()
+            if top <= self.high_water:
+                return 0
+            counts = self._read_counts(self.high_water, top, today or date.today())
+            self.add(counts, today=today)
+            self.high_water = top
+        return len(counts)
+
+    # ---- reads -------------------------------------------------------
+    def alerts(self, name, today=None):
+        """DataFrame (vehicle_number, cnt) of plates over the rule's threshold, busiest first."""
+        with self._lock:
+            self._advance(today or date.today())
+            rule = self._rules[name]
+            totals = self._totals[name]
+            hits = [(plate, totals[plate]) for plate in self._hot[name]]
+        hits.sort(key=lambda item: (-item[1], item[0]))
+        return pd.DataFrame(hits[:rule.limit], columns=["vehicle_number", "cnt"])
+
+    def is_flagged(self, name, plate):
+        """O(1) check whether a single plate is currently alerting under a rule."""
+        with self._lock:
+            return plate in self._hot[name]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "days": len(self._days),
+                "plates_tracked": {name: len(t) for name, t in self._totals.items()},
+                "alerting": {name: len(h) for name, h in self._hot.items()},
+                "warmed_at": self.warmed_at,
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine():
+    """Return the process-wide engine, caught up with the stops added since the last call."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            engine = AlertEngine()
+            engine.warm_start()
+            _engine = engine
+        elif _engine.stale or time.time() - (_engine.warmed_at or 0) > ALERT_RESYNC_SECONDS:
+            _engine.warm_start()
+        else:
+            _engine.catch_up()
+    return _engine
+
+
+@on_table_write
+def _on_stops_written(table_name, inserted):
+    # inserts are read back by id in catch_up(), whichever process made them;
+    # deletes / archiving (an empty frame) can only be redone from the table
+    if table_name.lower() == TABLE and _engine is not None and inserted.empty:
+        _engine.stale = True
@@ -0,0 +1,534 @@
+# archive.py
+"""Cold Parquet tier for stops older than the archive horizon.
+
+`python archive.py run` moves every checkpost_stops row with
+stop_date < today - SECURECHECK_ARCHIVE_HORIZON_DAYS into Parquet files
+under SECURECHECK_ARCHIVE_DIR, hive-partitioned as
+
+    year=2019/month=7/country_name=Canada/<run>-<n>.parquet
+
+with the compact dtypes of data_processing.STOP_SCHEMA (dates as date32,
+times of day as time64, flags as bool, categories as dictionary-encoded
+strings), then deletes the archived rows from MySQL in small batches so
+the hot table stays small.
+
+A run is recorded in _manifest.json (ignored by the Parquet dataset) as
+writing -> written -> done. Only the files of finished runs are part of the
+cold dataset, so a row is never counted in both tiers; `run` resumes an
+interrupted run first (removing half-written files, finishing deletes).
+
+Analytics panels that read the raw table (the per-plate and exact-age
+panels) are answered by merging a GROUP BY over the hot table with the
+same partial aggregate over a pruned scan of the cold files: only the
+needed columns are read, flag filters are pushed into the Parquet reader,
+and date / country filters skip whole partitions. The filtered summary
+merges its per-group counts the same way (summary.py). Rollup-served
+panels need nothing here: archiving deletes do not touch
+checkpost_stops_daily, and rollups.rebuild() folds the cold tier back in.
+
+The other raw panels have no cold merge, so archiving refuses to run
+unless the panels come from the rollup (SECURECHECK_USE_ROLLUPS=1, the
+default) or from DuckDB, whose snapshot includes the archive
+(SECURECHECK_ANALYTICS_BACKEND=duckdb). Recent Stops pages through the hot
+table only; the dashboard says so once stops have been archived.
+
+    python archive.py run [--horizon-days N]
+    python archive.py status
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from data_processing import apply_schema
+from db import get_pool, notify_table_changed, run_query
+from queries import ANALYTICS_BACKEND, TABLE, USE_ROLLUPS, ROLLUP_QUERIES
+from streaming import run_query_chunks
+from violations import get_dictionary
+
+
+ARCHIVE_DIR = os.environ.get("SECURECHECK_ARCHIVE_DIR", "archive")
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("SECURECHECK_ARCHIVE_HORIZON_DAYS", "365"))
+ARCHIVE_CHUNK_ROWS = int(os.environ.get("SECURECHECK_ARCHIVE_CHUNK_ROWS", "100000"))
+ARCHIVE_DELETE_BATCH = 10000
+MANIFEST = "_manifest.json"
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("stop_date", pa.date32()),
+    ("stop_time", pa.time64("us")),
+    ("driver_gender", _TEXT),
+    ("driver_age_raw", pa.string()),
+    ("driver_age", pa.int16()),
+    ("driver_race", _TEXT),
+    ("violation_raw", _TEXT),
+    ("violation", _TEXT),
+    ("violation_id", pa.uint16()),              # null in files written before the column
+    ("search_conducted", pa.bool_()),
+    ("search_type", _TEXT),
+    ("stop_outcome", _TEXT),
+    ("is_arrested", pa.bool_()),
+    ("stop_duration", _TEXT),
+    ("drugs_related_stop", pa.bool_()),
+    ("vehicle_number", pa.string()),
+    ("needs_review", pa.bool_()),
+])
+
+PARTITION_SCHEMA = pa.schema([
+    ("year", pa.int16()),
+    ("month", pa.int8()),
+    ("country_name", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+# archive columns + partition keys, as read back through cold_dataset()
+ROW_SCHEMA = pa.schema(list(ARCHIVE_SCHEMA) + list(PARTITION_SCHEMA))
+
+
+# ---- manifest -----------------------------------------------------------
+def _manifest_path(root=None):
+    return os.path.join(root or ARCHIVE_DIR, MANIFEST)
+
+
+def read_manifest(root=None):
+    try:
+        with open(_manifest_path(root), encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {"runs": []}
+
+
+def _write_manifest(manifest, root=None):
+    path = _manifest_path(root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1)
+    os.replace(path + ".tmp", path)     # readers never see a half-written manifest
+
+
+def _set_run(manifest, run, root=None):
+    manifest["runs"] = [r for r in manifest["runs"] if r["run_id"] != run["run_id"]] + [run]
+    _write_manifest(manifest, root)
+
+
+# ---- writing --------------------------------------------------------------
+def to_archive_table(df):
+    """Raw stop rows -> pa.Table with ARCHIVE_SCHEMA plus the partition columns."""
+    df = apply_schema(df)
+    n = len(df)
+    arrays = []
+    for field in ARCHIVE_SCHEMA:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(n, field.type))
+            continue
+        col = pa.array(df[field.name], from_pandas=True)
+        if field.name == "stop_time":
+            # timedelta since midnight -> time of day
+            col = pc.cast(pc.cast(pc.cast(col, pa.duration("us")), pa.int64()), pa.time64("us"))
+        elif field.name == "stop_date":
+            col = pc.cast(col, pa.date32())
+        arrays.append(pc.cast(col, field.type))
+    stop_date = pd.to_datetime(df["stop_date"]) if "stop_date" in df.columns else pd.Series(pd.NaT, index=df.index)
+    arrays.append(pa.array(stop_date.dt.year, type=pa.int16(), from_pandas=True))
+    arrays.append(pa.array(stop_date.dt.month, type=pa.int8(), from_pandas=True))
+    country = df["country_name"].astype(object) if "country_name" in df.columns else [None] * n
+    arrays.append(pa.array(country, type=pa.string(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=ROW_SCHEMA)
+
+
+def write_partitions(tables, run_id, root=None):
+    """Write an iterable of archive tables into the partitioned dataset; returns the new file paths.
+
+    One write for the whole run, so each partition gets one file per run
+    rather than one per chunk.
+    """
+    root = root or ARCHIVE_DIR
+    files = []
+    ds.write_dataset((batch for table in tables for batch in table.to_batches()), root,
+                     schema=ROW_SCHEMA, format="parquet", partitioning=PARTITIONING,
+                     basename_template=f"{run_id}-{{i}}.parquet",
+                     existing_data_behavior="overwrite_or_ignore",
+                     file_visitor=lambda written: files.append(os.path.relpath(written.path, root)))
+    return files
+
+
+def _remove_run_files(run_id, root=None):
+    root = root or ARCHIVE_DIR
+    for path in glob.glob(os.path.join(root, "**", f"{run_id}-*.parquet"), recursive=True):
+        os.remove(path)
+
+
+def _delete_archived(run):
+    """Delete the run's rows from the hot table, ARCHIVE_DELETE_BATCH at a time."""
+    deleted = 0
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            while True:
+                cursor.execute(f"DELETE FROM {TABLE} WHERE stop_date < %s AND id <= %s LIMIT {ARCHIVE_DELETE_BATCH}",
+                               (run["cutoff"], run["max_id"]))
+                conn.commit()
+                if cursor.rowcount <= 0:
+                    break
+                deleted += cursor.rowcount
+        finally:
+            cursor.close()
+    return deleted
+
+
+def _finish(manifest, run, root=None):
+    run["deleted"] = run.get("deleted", 0) + _delete_archived(run)
+    run["state"] = "done"
+    run["finished_at"] = time.time()
+    _set_run(manifest, run, root)
+    notify_table_changed(TABLE)
+    _forget_cold()
+
+
+def resume(root=None):
+    """Clean up after an interrupted run: drop partial files, finish pending deletes."""
+    manifest = read_manifest(root)
+    resumed = 0
+    for run in list(manifest["runs"]):
+        if run["state"] == "writing":
+            _remove_run_files(run["run_id"], root)
+            manifest["runs"].remove(run)
+            _write_manifest(manifest, root)
+        elif run["state"] == "written":
+            _finish(manifest, run, root)
+            resumed += 1
+    return resumed
+
+
+def check_readers():
+    """Raise RuntimeError unless every analytics panel also reads the cold tier."""
+    if not USE_ROLLUPS and ANALYTICS_BACKEND != "duckdb":
+        raise RuntimeError(
+            "archiving needs SECURECHECK_USE_ROLLUPS=1 or SECURECHECK_ANALYTICS_BACKEND=duckdb: "
+            f"with rollups off the raw analytics panels read only {TABLE} and would leave out archived stops")
+
+
+def archive(horizon_days=ARCHIVE_HORIZON_DAYS, today=None, chunk_rows=ARCHIVE_CHUNK_ROWS, root=None):
+    """Move stops older than `horizon_days` to the cold tier. Returns the run record (None if nothing to do)."""
+    check_readers()
+    resume(root)
+    cutoff = (today or date.today()) - timedelta(days=horizon_days)
+    found = run_query(f"SELECT MAX(id) AS max_id, COUNT(*) AS n FROM {TABLE} WHERE stop_date < %s",
+                      (cutoff,), ttl=0, name="Archive candidates")
+    max_id = found["max_id"].iloc[0]
+    if pd.isna(max_id):
+        return None
+    manifest = read_manifest(root)
+    run = {"run_id": f"{cutoff:%Y%m%d}-{uuid.uuid4().hex[:8]}", "cutoff": cutoff.isoformat(),
+           "max_id": int(max_id), "state": "writing", "started_at": time.time(), "rows": 0, "files": []}
+    _set_run(manifest, run, root)
+
+    def tables():
+        # id <= max_id: rows inserted while the run is going are left for the next one
+        for chunk in run_query_chunks(f"SELECT * FROM {TABLE} WHERE stop_date < %s AND id <= %s",
+                                      (cutoff, run["max_id"]), chunk_rows=chunk_rows, name="Archive read"):
+            run["rows"] += len(chunk)
+            yield to_archive_table(chunk)
+
+    run["files"] = write_partitions(tables(), run["run_id"], root)
+    run["state"] = "written"
+    _set_run(manifest, run, root)
+    _finish(manifest, run, root)
+    return run
+
+
+# ---- reading --------------------------------------------------------------
+_cold = {}                  # root -> (manifest mtime, dataset or None)
+_cold_lock = threading.Lock()
+
+
+def _forget_cold():
+    with _cold_lock:
+        _cold.clear()
+        _partials.clear()
+
+
+def cold_generation(root=None):
+    """Changes whenever a run finishes (the manifest is rewritten)."""
+    try:
+        return os.stat(_manifest_path(root)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def cold_dataset(root=None):
+    """pyarrow Dataset over the files of finished runs, or None when the cold tier is empty."""
+    root = root or ARCHIVE_DIR
+    generation = cold_generation(root)
+    with _cold_lock:
+        hit = _cold.get(root)
+        if hit is not None and hit[0] == generation:
+            return hit[1]
+    files = [os.path.join(root, f) for run in read_manifest(root)["runs"] if run["state"] == "done"
+             for f in run["files"]]
+    dataset = None
+    if files:
+        dataset = ds.dataset(files, schema=ROW_SCHEMA,
+                             format="parquet", partitioning=PARTITIONING, partition_base_dir=root)
+    with _cold_lock:
+        _cold[root] = (generation, dataset)
+    return dataset
+
+
+def cold_filter(start_date=None, end_date=None, countries=None):
+    """Dataset filter for a date range / countries; the year, month and country parts prune partitions."""
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if start_date is not None:
+        expr = both(expr, (pc.field("year") > start_date.year)
+                    | ((pc.field("year") == start_date.year) & (pc.field("month") >= start_date.month)))
+        expr = both(expr, pc.field("stop_date") >= pa.scalar(start_date, pa.date32()))
+    if end_date is not None:
+        expr = both(expr, (pc.field("year") < end_date.year)
+                    | ((pc.field("year") == end_date.year) & (pc.field("month") <= end_date.month)))
+        expr = both(expr, pc.field("stop_date") <= pa.scalar(end_date, pa.date32()))
+    if countries:
+        expr = both(expr, pc.field("country_name").isin(list(countries)))
+    return expr
+
+
+def scan_cold(columns=None, filter=None, batch_rows=ARCHIVE_CHUNK_ROWS, root=None):
+    """Yield pa.Tables of archived stops (only `columns`, rows matching `filter`)."""
+    dataset = cold_dataset(root)
+    if dataset is None:
+        return
+    for batch in dataset.to_batches(columns=columns, filter=filter, batch_size=batch_rows):
+        if batch.num_rows:
+            yield pa.Table.from_batches([batch])
+
+
+def archived_before(root=None):
+    """Cutoff date (ISO string) of the latest finished run, or None when nothing is archived."""
+    return max((r["cutoff"] for r in read_manifest(root)["runs"] if r["state"] == "done"), default=None)
+
+
+def filter_expression(start_date=None, end_date=None, gender="All", violation_contains="", plate="",
+                      search_flag="All"):
+    """queries.filter_where() for the cold tier: the same sidebar filters as a dataset filter (None = all)."""
+    expr = cold_filter(start_date, end_date) if start_date is not None and end_date is not None else None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if gender != "All":
+        expr = both(expr, pc.field("driver_gender") == gender)
+    if violation_contains.strip() != "":
+        # by name, which files written before violation_id also carry
+        dictionary = get_dictionary()
+        names = dictionary.names()
+        expr = both(expr, pc.field("violation").isin([names[i] for i in dictionary.resolve(violation_contains)]))
+    if plate.strip() != "":
+        expr = both(expr, pc.field("vehicle_number") == plate.strip())
+    if search_flag in ("True", "False"):
+        expr = both(expr, pc.field("search_conducted") == (search_flag == "True"))
+    return expr
+
+
+SUMMARY_KEYS = ["violation_id", "driver_gender", "stop_duration", "stop_outcome"]
+
+
+def summary_partial(filter=None, root=None):
+    """queries.SUMMARY_PARTIAL_SQL over the archived stops matching `filter`."""
+    columns = SUMMARY_KEYS + ["violation", "driver_age", "is_arrested", "search_conducted", "drugs_related_stop"]
+    parts = []
+    for table in scan_cold(columns, filter, root=root):
+        frame = get_dictionary().fill_ids(table.to_pandas())
+        flags = {c: frame[c].fillna(False).astype(int) for c in ("is_arrested", "search_conducted",
+                                                                 "drugs_related_stop")}
+        age = pd.to_numeric(frame["driver_age"])
+        keys = frame[SUMMARY_KEYS].astype(object)
+        part = keys.where(keys.notna(), None).assign(
+            total=1, age_sum=age.fillna(0), age_count=age.notna().astype(int),
+            arrests=flags["is_arrested"], searches=flags["search_conducted"], drug_stops=flags["drugs_related_stop"],
+            high_risk=flags["is_arrested"] & flags["search_conducted"])
+        parts.append(part.groupby(SUMMARY_KEYS, dropna=False).sum().reset_index())
+    if not parts:
+        return pd.DataFrame(columns=SUMMARY_KEYS + ["total", "age_sum", "age_count", "arrests", "searches",
+                                                    "drug_stops", "high_risk"])
+    return pd.concat(parts, ignore_index=True)
+
+
+# ---- hot + cold panels ------------------------------------------------------
+# key -> SQL expression on the hot table (default: the column itself)
+_HOT_KEYS = {"year": "YEAR(stop_date)", "month": "MONTH(stop_date)", "hour": "HOUR(stop_time)"}
+
+
+class ColdMerge:
+    """An analytics panel answered from partial aggregates of both tiers.
+
+    keys/measures describe the partial (GROUP BY keys; measure -> None for
+    COUNT(*) or the flag column summed); finish turns the merged partial
+    into the panel's result (ordering, LIMIT, rates).
+    """
+
+    def __init__(self, label, keys, measures, finish, where=None, cold_filter=None):
+        self.label = label
+        self.keys = keys
+        self.measures = measures
+        self.finish = finish
+        self.where = where
+        self.cold_filter = cold_filter
+
+    def hot_sql(self):
+        select = [f"{_HOT_KEYS.get(k, k)} AS {k}" for k in self.keys]
+        select += [f"COUNT(*) AS {m}" if flag is None else f"SUM({flag} = 1) AS {m}"
+                   for m, flag in self.measures.items()]
+        where = f"WHERE {self.where}" if self.where else ""
+        return f"SELECT {', '.join(select)} FROM {TABLE} {where} GROUP BY {', '.join(self.keys)}"
+
+    def cold_columns(self):
+        cols = {"stop_time" if k == "hour" else k for k in self.keys}
+        cols |= {flag for flag in self.measures.values() if flag is not None}
+        if "violation_id" in self.keys:
+            cols.add("violation")
+        return sorted(cols)
+
+    def cold_partial(self, table):
+        if "hour" in self.keys:
+            table = table.append_column("hour", pc.hour(table["stop_time"]))
+        frame = table.to_pandas()
+        if "violation_id" in self.keys:
+            frame = get_dictionary().fill_ids(frame)
+        for m, flag in self.measures.items():
+            frame[m] = 1 if flag is None else frame[flag].fillna(False).astype(int)
+        return frame.groupby(self.keys, dropna=False, observed=True)[list(self.measures)].sum().reset_index()
+
+    def merge(self, parts):
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return pd.DataFrame(columns=self.keys + list(self.measures))
+        df = pd.concat(parts, ignore_index=True)
+        for k in self.keys:
+            if pd.api.types.is_numeric_dtype(df[k]):
+                df[k] = df[k].astype("Int64")
+            else:
+                df[k] = df[k].astype(object).where(df[k].notna(), None)
+        for m in self.measures:
+            df[m] = pd.to_numeric(df[m]).astype("int64")
+        return df.groupby(self.keys, dropna=False, sort=False)[list(self.measures)].sum().reset_index()
+
+
+def _top(by, n):
+    return lambda df: df.sort_values(by, ascending=False, kind="stable").head(n).reset_index(drop=True)
+
+
+def _named(finish):
+    """finish, then violation_id -> the violation's name in its place (as the raw panel's join)."""
+    def run(df):
+        df = finish(df)
+        names = get_dictionary().names()
+        df.insert(df.columns.get_loc("violation_id"), "violation",
+                  [names.get(int(i)) if pd.notna(i) else None for i in df["violation_id"]])
+        return df.drop(columns="violation_id")
+    return run
+
+
+def _yearly(df):
+    df["arrest_rate"] = (100.0 * df["arrests"] / df["stops"].where(df["stops"] != 0)).round(2)
+    return df.sort_values(["country_name", "year"], ascending=[True, False], na_position="first") \
+        .reset_index(drop=True)
+
+
+COLD_MERGES = {m.label: m for m in [
+    ColdMerge("Top 10 vehicles in drug-related stops", ["vehicle_number"], {"drug_stop_count": None},
+              _top("drug_stop_count", 10), where="drugs_related_stop = 1",
+              cold_filter=pc.field("drugs_related_stop")),
+    ColdMerge("Vehicles most frequently searched", ["vehicle_number"], {"searches": None},
+              _top("searches", 20), where="search_conducted = 1",
+              cold_filter=pc.field("search_conducted")),
+    ColdMerge("Violation trends by age & race", ["driver_age", "driver_race", "violation_id"], {"cnt": None},
+              _named(_top("cnt", 200)), where="driver_age IS NOT NULL",
+              cold_filter=pc.field("driver_age").is_valid()),
+    ColdMerge("Yearly stops & arrests by country", ["country_name", "year"],
+              {"stops": None, "arrests": "is_arrested"}, _yearly),
+    ColdMerge("Time period analysis (Year/Month/Hour)", ["year", "month", "hour"], {"stops": None},
+              lambda df: df.sort_values(["year", "month", "hour"], ascending=[False, False, True])
+              .reset_index(drop=True)),
+]}
+
+_partials = {}              # label -> (cold generation, cold partial DataFrame)
+
+
+def serves(label, root=None):
+    """True when `label` must be answered hot + cold (it reads the raw table and the cold tier has rows)."""
+    if label not in COLD_MERGES or (USE_ROLLUPS and label in ROLLUP_QUERIES):
+        return False
+    return cold_dataset(root) is not None
+
+
+def _cold_partial(spec, root=None):
+    generation = cold_generation(root)
+    with _cold_lock:
+        hit = _partials.get(spec.label)
+        if hit is not None and hit[0] == generation:
+            return hit[1]
+    parts = [spec.cold_partial(t) for t in scan_cold(spec.cold_columns(), spec.cold_filter, root=root)]
+    partial = spec.merge(parts)
+    with _cold_lock:
+        _partials[spec.label] = (generation, partial)
+    return partial
+
+
+def load_merged(label, ttl=None, root=None):
+    """Panel result over both tiers. The cold partial is kept until the next archive run."""
+    spec = COLD_MERGES[label]
+    hot = run_query(spec.hot_sql(), ttl=ttl, name=f"{label} (hot)")
+    return spec.finish(spec.merge([hot, _cold_partial(spec, root)]))
+
+
+def status(root=None):
+    manifest = read_manifest(root)
+    dataset = cold_dataset(root)
+    done = [r for r in manifest["runs"] if r["state"] == "done"]
+    return {
+        "dir": os.path.abspath(root or ARCHIVE_DIR),
+        "runs": len(done),
+        "pending": [r["run_id"] for r in manifest["runs"] if r["state"] != "done"],
+        "rows": sum(r["rows"] for r in done),
+        "files": sum(len(r["files"]) for r in done),
+        "bytes": sum(os.path.getsize(f) for f in dataset.files) if dataset is not None else 0,
+        "latest_cutoff": max((r["cutoff"] for r in done), default=None),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["run", "status"])
+    ap.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS)
+    args = ap.parse_args()
+    if args.command == "run":
+        try:
+            run = archive(args.horizon_days)
+        except RuntimeError as e:
+            ap.exit(2, f"{e}\n")
+        if run is None:
+            print("Nothing to archive.")
+        else:
+            print(f"Archived {run['rows']:,} stops before {run['cutoff']} into {len(run['files'])} files; "
+                  f"{run['deleted']:,} rows deleted from {TABLE}")
+    else:
+        for key, value in status().items():
+            print(f"{key:>14}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# arrow_fetch.py
+"""Columnar (Arrow) result path for wide SELECTs.
+
+run_query builds a list of row tuples and then a DataFrame of Python
+objects, which Streamlit converts to Arrow again for st.dataframe. Here the
+result is read in batches from an unbuffered cursor and each batch goes
+column-wise into a pyarrow RecordBatch, typed from the cursor description.
+The returned DataFrame is Arrow-backed (pd.ArrowDtype), so st.dataframe
+hands its buffers over without another conversion.
+
+When connectorx is installed and SECURECHECK_ARROW_ENGINE=connectorx, the
+query is instead read by connectorx, which decodes the MySQL wire protocol
+straight into Arrow buffers without creating any Python row objects.
+"""
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pymysql
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import escape_item
+
+from db import DB_CONFIG, get_pool
+from instrumentation import get_recorder, new_call, query_name
+from query_cache import get_cache, is_cacheable, tables_in
+
+try:
+    import connectorx
+except ImportError:       # optional
+    connectorx = None
+
+
+ARROW_BATCH_ROWS = int(os.environ.get("SECURECHECK_ARROW_BATCH_ROWS", "50000"))
+ARROW_ENGINE = os.environ.get("SECURECHECK_ARROW_ENGINE", "pymysql")
+
+# MySQL column type -> Arrow type (None: let pyarrow infer)
+_ARROW_TYPES = {
+    FIELD_TYPE.TINY: pa.int64(), FIELD_TYPE.SHORT: pa.int64(), FIELD_TYPE.LONG: pa.int64(),
+    FIELD_TYPE.INT24: pa.int64(), FIELD_TYPE.LONGLONG: pa.int64(), FIELD_TYPE.YEAR: pa.int64(),
+    FIELD_TYPE.FLOAT: pa.float64(), FIELD_TYPE.DOUBLE: pa.float64(),
+    # DECIMAL aggregates (SUM, ROUND, AVG) are shown as floats on the dashboard
+    FIELD_TYPE.DECIMAL: pa.float64(), FIELD_TYPE.NEWDECIMAL: pa.float64(),
+    FIELD_TYPE.DATE: pa.date32(), FIELD_TYPE.NEWDATE: pa.date32(),
+    FIELD_TYPE.DATETIME: pa.timestamp("us"), FIELD_TYPE.TIMESTAMP: pa.timestamp("us"),
+    FIELD_TYPE.TIME: pa.duration("us"),
+    FIELD_TYPE.VARCHAR: pa.string(), FIELD_TYPE.VAR_STRING: pa.string(), FIELD_TYPE.STRING: pa.string(),
+    FIELD_TYPE.ENUM: pa.string(), FIELD_TYPE.SET: pa.string(), FIELD_TYPE.JSON: pa.string(),
+}
+
+
+def arrow_schema(description):
+    """[(name, Arrow type)] from a DB-API cursor.description (None: inferred per batch)."""
+    return [(d[0], _ARROW_TYPES.get(d[1])) for d in description]
+
+
+def _column(values, arrow_type):
+    if arrow_type is None:
+        return pa.array(values, from_pandas=True)
+    if pa.types.is_floating(arrow_type):
+        values = [None if v is None else float(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def iter_record_batches(cursor, batch_rows=ARROW_BATCH_ROWS):
+    """Yield pa.RecordBatch objects from an executed cursor, `batch_rows` rows at a time.
+
+    Each fetchmany() batch is transposed into one array per column; the
+    batch's row tuples are dropped before the next one is fetched.
+    """
+    fields = arrow_schema(cursor.description)
+    names = [name for name, _ in fields]
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        del rows
+        arrays = [_column(list(col), arrow_type) for col, (_, arrow_type) in zip(columns, fields)]
+        yield pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def combine_batches(batches, names):
+    if not batches:
+        return pa.table({name: pa.array([], type=pa.null()) for name in names})
+    try:
+        return pa.Table.from_batches(batches)
+    except pa.ArrowInvalid:
+        # an inferred column came out null-typed in an all-NULL batch: unify
+        return pa.concat_tables([pa.Table.from_batches([b]) for b in batches], promote_options="default")
+
+
+# a quoted literal (kept, but for %% -> %), or a %s / %% outside of one
+_TOKEN = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|%[s%]""")
+
+
+def inline_params(query, params):
+    """Bind %s params client-side (what pymysql's mogrify does) for connectorx.
+
+    Unlike `query % params`, a % inside a quoted literal that was not
+    doubled (LIKE '%speed%', DATE_FORMAT(d, '%Y')) is left as written.
+    """
+    if not params:
+        return query
+    values = iter([escape_item(p, "utf8mb4") for p in params])
+
+    def bind(match):
+        token = match.group()
+        if token[0] in "'\"":
+            return token.replace("%%", "%")
+        if token == "%%":
+            return "%"
+        try:
+            return next(values)
+        except StopIteration:
+            raise TypeError("not enough arguments for the %s placeholders in the query") from None
+
+    bound = _TOKEN.sub(bind, query)
+    if next(values, None) is not None:
+        raise TypeError("more arguments than %s placeholders in the query")
+    return bound
+
+
+def _connectorx_uri():
+    c = DB_CONFIG
+    return f"mysql://{c['user']}:{c['password']}@{c['host']}:{c['port']}/{c['database']}"
+
+
+def fetch_arrow_table(query, params=None, batch_rows=ARROW_BATCH_ROWS, call=None):
+    """Execute `query` and return a pyarrow.Table (no cache, no DataFrame)."""
+    call = call if call is not None else {}
+    if ARROW_ENGINE == "connectorx" and connectorx is not None:
+        mark = time.perf_counter()
+        table = connectorx.read_sql(_connectorx_uri(), inline_params(query, params), return_type="arrow")
+        call["execute_ms"] = (time.perf_counter() - mark) * 1000
+        return table
+    mark = time.perf_counter()
+    with get_pool().connection() as conn:
+        call["checkout_ms"] = (time.perf_counter() - mark) * 1000
+        cursor = conn.cursor(pymysql.cursors.SSCursor)   # unbuffered: rows arrive as we read them
+        try:
+            mark = time.perf_counter()
+            cursor.execute(query, params or ())
+            call["execute_ms"] = (time.perf_counter() - mark) * 1000
+            mark = time.perf_counter()
+            names = [d[0] for d in cursor.description] if cursor.description else []
+            batches = list(iter_record_batches(cursor, batch_rows)) if cursor.description else []
+            call["fetch_ms"] = (time.perf_counter() - mark) * 1000
+        finally:
+            cursor.close()
+        conn.commit()
+    return combine_batches(batches, names)
+
+
+def to_frame(table):
+    """Arrow-backed DataFrame over the table's buffers (no per-value conversion)."""
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def run_query_arrow(query, params=None, ttl=None, name=None, batch_rows=ARROW_BATCH_ROWS):
+    """run_query, but through the Arrow path: returns an Arrow-backed DataFrame.
+
+    Shares the query cache (under a separate key) and the instrumentation
+    recorder with run_query.
+    """
+    call = new_call(query_name(query, name), query, params)
+    started = time.perf_counter()
+    try:
+        cache = get_cache()
+        key = None
+        if ttl != 0 and is_cacheable(query):
+            sql_key, params_key = cache.make_key(query, params)
+            key = (sql_key, params_key, "arrow")
+            cached = cache.get(key)
+            if cached is not None:
+                call.update(cache="hit", rows=len(cached))
+                return cached
+            call["cache"] = "miss"
+        table = fetch_arrow_table(query, params, batch_rows=batch_rows, call=call)
+        mark = time.perf_counter()
+        df = to_frame(table)
+        call["frame_ms"] = (time.perf_counter() - mark) * 1000
+        call.update(rows=table.num_rows, bytes=table.nbytes)
+        if key is not None:
+            cache.put(key, df, ttl=ttl, tables=tables_in(query), nbytes=table.nbytes)
+        return df.copy(deep=False) if key is not None else df
+    except Exception as e:
+        call["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        call["total_ms"] = (time.perf_counter() - started) * 1000
+        get_recorder().record(call)
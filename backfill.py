@@ -0,0 +1,252 @@
+# backfill.py
+"""Re-clean large CSV exports in parallel (data_processing.load_and_clean in a process pool).
+
+    python backfill.py exports/*.csv --out cleaned.parquet       # one file, input order
+    python backfill.py exports/*.csv --out cleaned.csv
+    python backfill.py exports/*.csv --partitioned cleaned/      # year/month/country dataset
+    python backfill.py exports/2019.csv --scaling --workers 8    # rows/sec with 1..8 workers
+
+Every file is cut into byte ranges of about SECURECHECK_BACKFILL_CHUNK_BYTES
+that end on a line break. A worker reads its own range (with the header
+line prepended) and cleans it, so the parent never holds raw data. Ranges
+are cut at any newline, so quoted fields must not span lines (the
+exports' don't).
+
+Ordered output (--out): workers return the cleaned chunk (CSV text, or an
+Arrow table in the archive's schema for .parquet) and the parent writes
+them in input order. At most `max_in_flight` chunks (default 2 per worker)
+are being cleaned or waiting for their turn, so memory is bounded by that
+many chunks whatever the input size.
+
+Partitioned output (--partitioned): each worker writes its chunk straight
+into a hive-partitioned Parquet dataset with archive.write_partitions
+(year=/month=/country_name=, archive schema). Files are named
+<file>-<chunk>-<n>.parquet, so input order can be recovered; the parent
+only collects row counts.
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from data_processing import load_and_clean
+
+
+BACKFILL_CHUNK_BYTES = int(os.environ.get("SECURECHECK_BACKFILL_CHUNK_BYTES", str(32 * 2**20)))
+
+
+def split_ranges(path, chunk_bytes=BACKFILL_CHUNK_BYTES):
+    """(header line, [(start, end), ...]) byte ranges of `path`, each ending after a newline."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        header = fh.readline()
+        ranges, start = [], fh.tell()
+        while start < size:
+            fh.seek(min(start + chunk_bytes, size))
+            fh.readline()                       # run on to the end of the line
+            end = min(fh.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def plan(paths, chunk_bytes=BACKFILL_CHUNK_BYTES):
+    """One task dict per byte range, in input order."""
+    tasks = []
+    for file_no, path in enumerate(paths):
+        header, ranges = split_ranges(path, chunk_bytes)
+        for chunk_no, (start, end) in enumerate(ranges):
+            tasks.append({"path": path, "file_no": file_no, "chunk_no": chunk_no,
+                          "start": start, "end": end, "header": header})
+    return tasks
+
+
+def read_range(task):
+    with open(task["path"], "rb") as fh:
+        fh.seek(task["start"])
+        data = fh.read(task["end"] - task["start"])
+    return pd.read_csv(io.BytesIO(task["header"] + data), low_memory=False)
+
+
+def output_columns(header):
+    """Columns load_and_clean produces for a CSV header.
+
+    Cleans one dummy row where every column is filled, since load_and_clean
+    drops all-NA columns and a chunk may lack values in one.
+    """
+    names = pd.read_csv(io.BytesIO(header)).columns
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")             # "x" is not a date
+        return list(load_and_clean(pd.DataFrame([["x"] * len(names)], columns=names), compact=False).columns)
+
+
+def _clean_csv(task, columns):
+    raw = read_range(task)
+    cleaned = load_and_clean(raw, compact=False).reindex(columns=columns)
+    return len(raw), cleaned.to_csv(header=False, index=False)
+
+
+def _clean_parquet(task):
+    from archive import to_archive_table
+    raw = read_range(task)
+    return len(raw), to_archive_table(load_and_clean(raw))
+
+
+def _clean_partitioned(task, root):
+    from archive import to_archive_table, write_partitions
+    raw = read_range(task)
+    table = to_archive_table(load_and_clean(raw))
+    write_partitions([table], f"{task['file_no']:04d}-{task['chunk_no']:05d}", root)
+    return len(raw), None
+
+
+class _Sink:
+    """Writes ordered chunk results to `out` (.csv or .parquet)."""
+
+    def __init__(self, out, columns):
+        self.out, self.columns = out, columns
+        self.parquet = out.endswith(".parquet")
+        self.tmp = out + ".tmp"
+        self._writer = None
+        if self.parquet:
+            import pyarrow.parquet as pq
+            from archive import ROW_SCHEMA
+            self._writer = pq.ParquetWriter(self.tmp, ROW_SCHEMA)
+        else:
+            self._fh = open(self.tmp, "w", newline="", encoding="utf-8")
+            self._fh.write(",".join(columns) + "\n")
+
+    def write(self, result):
+        if self.parquet:
+            self._writer.write_table(result)
+        else:
+            self._fh.write(result)
+
+    def close(self, ok=True):
+        (self._writer if self.parquet else self._fh).close()
+        if ok:
+            os.replace(self.tmp, self.out)
+        elif os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def backfill(paths, out=None, partitioned=None, workers=None, chunk_bytes=BACKFILL_CHUNK_BYTES,
+             max_in_flight=None, on_progress=None):
+    """Clean `paths` into `out` (ordered file) or `partitioned` (dataset dir). Returns a report dict.
+
+    on_progress(report) is called after every finished chunk.
+    """
+    if (out is None) == (partitioned is None):
+        raise ValueError("give exactly one of out / partitioned")
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    tasks = plan(paths, chunk_bytes)
+    report = {"files": len(paths), "chunks": len(tasks), "workers": workers, "rows": 0,
+              "bytes": sum(t["end"] - t["start"] for t in tasks), "bytes_done": 0, "peak_in_flight": 0}
+    sink = None
+    if out is not None:
+        sink = _Sink(out, output_columns(tasks[0]["header"]) if tasks else [])
+    started = time.perf_counter()
+    ok = False
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running, done = {}, {}          # future -> seq, seq -> result waiting for its turn
+            next_submit = next_write = 0
+            while next_write < len(tasks):
+                # bounded window: nothing is submitted beyond max_in_flight past the write position
+                while next_submit < len(tasks) and next_submit - next_write < max_in_flight:
+                    task = tasks[next_submit]
+                    if partitioned is not None:
+                        fut = pool.submit(_clean_partitioned, task, partitioned)
+                    elif sink.parquet:
+                        fut = pool.submit(_clean_parquet, task)
+                    else:
+                        fut = pool.submit(_clean_csv, task, sink.columns)
+                    running[fut] = next_submit
+                    next_submit += 1
+                report["peak_in_flight"] = max(report["peak_in_flight"], next_submit - next_write)
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    done[running.pop(fut)] = fut.result()
+                while next_write in done:
+                    rows, result = done.pop(next_write)
+                    if sink is not None:
+                        sink.write(result)
+                    task = tasks[next_write]
+                    report["rows"] += rows
+                    report["bytes_done"] += task["end"] - task["start"]
+                    next_write += 1
+                    if on_progress:
+                        on_progress(dict(report, seconds=time.perf_counter() - started))
+        ok = True
+    finally:
+        if sink is not None:
+            sink.close(ok)
+    seconds = time.perf_counter() - started
+    report.update(seconds=seconds, rows_per_sec=report["rows"] / seconds if seconds else None,
+                  mb_per_sec=report["bytes"] / 2**20 / seconds if seconds else None)
+    return report
+
+
+def scaling(paths, max_workers=None, chunk_bytes=BACKFILL_CHUNK_BYTES, fmt="parquet"):
+    """Run the same backfill with 1, 2, 4, ... max_workers workers -> list of report dicts."""
+    max_workers = max_workers or os.cpu_count() or 1
+    counts, w = [], 1
+    while w < max_workers:
+        counts.append(w)
+        w *= 2
+    counts.append(max_workers)
+    tmpdir = tempfile.mkdtemp(prefix="securecheck-backfill-")
+    results = []
+    try:
+        for w in counts:
+            report = backfill(paths, out=os.path.join(tmpdir, f"scaling.{fmt}"), workers=w, chunk_bytes=chunk_bytes)
+            report["speedup"] = results[0]["seconds"] / report["seconds"] if results else 1.0
+            report["efficiency"] = report["speedup"] / w
+            results.append(report)
+            print(f"{w:>7} {report['seconds']:>9.2f} {report['rows_per_sec']:>12,.0f} {report['mb_per_sec']:>8.1f}"
+                  f" {report['speedup']:>7.2f}x {report['efficiency']:>10.0%}", flush=True)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None, prog=None):
+    ap = argparse.ArgumentParser(prog=prog, description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="+", help="CSV exports, cleaned in the order given")
+    ap.add_argument("--out", help="ordered output file (.csv or .parquet)")
+    ap.add_argument("--partitioned", metavar="DIR", help="hive-partitioned Parquet output directory")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--chunk-mb", type=float, default=BACKFILL_CHUNK_BYTES / 2**20)
+    ap.add_argument("--max-in-flight", type=int, help="chunks cleaning or waiting to be written (default 2 per worker)")
+    ap.add_argument("--scaling", action="store_true", help="report rows/sec for 1..--workers workers")
+    args = ap.parse_args(argv)
+    chunk_bytes = int(args.chunk_mb * 2**20)
+
+    if args.scaling:
+        print(f"{'workers':>7} {'seconds':>9} {'rows/sec':>12} {'MB/sec':>8} {'speedup':>8} {'efficiency':>10}")
+        scaling(args.paths, args.workers, chunk_bytes)
+        return
+    if (args.out is None) == (args.partitioned is None):
+        ap.error("give one of --out or --partitioned (or --scaling)")
+
+    def show(report):
+        print(f"{report['bytes_done'] / report['bytes']:.0%} · {report['rows']:,} rows · "
+              f"{report['rows'] / report['seconds']:,.0f} rows/sec", end="\r", flush=True)
+
+    report = backfill(args.paths, out=args.out, partitioned=args.partitioned, workers=args.workers,
+                      chunk_bytes=chunk_bytes, max_in_flight=args.max_in_flight, on_progress=show)
+    print(f"\n{report['rows']:,} rows from {report['files']} file(s) in {report['chunks']} chunks, "
+          f"{report['seconds']:.1f}s ({report['rows_per_sec']:,.0f} rows/sec, {report['mb_per_sec']:.1f} MB/sec, "
+          f"{report['workers']} workers, at most {report['peak_in_flight']} chunks in flight)")
+
+
+if __name__ == "__main__":
+    main()
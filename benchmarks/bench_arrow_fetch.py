@@ -0,0 +1,99 @@
+# benchmarks/bench_arrow_fetch.py
+"""Compare run_query's tuple path with the Arrow fetch path (arrow_fetch.py).
+
+    python benchmarks/bench_arrow_fetch.py                      # SQLite stand-in
+    python benchmarks/bench_arrow_fetch.py --backend mysql      # DB from SECURECHECK_DB_*
+    python benchmarks/bench_arrow_fetch.py --sizes 1000 100000 1000000
+
+Both paths read `SELECT *` of n synthetic stops and end with what
+st.dataframe needs (an Arrow table):
+
+    tuples  fetchall() -> pd.DataFrame(rows) -> pa.Table.from_pandas
+    arrow   fetchmany() batches -> RecordBatches -> ArrowDtype frame -> pa.Table.from_pandas
+
+py_peak_mb is the tracemalloc peak (Python objects: tuples, boxed values);
+arrow_mb is what pyarrow's allocator holds for the final table.
+The MySQL run creates (and drops) a scratch table `bench_checkpost_stops`.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+import pymysql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from arrow_fetch import combine_batches, iter_record_batches, to_frame  # noqa: E402
+from bench_bulk_insert import TABLE, connect, reset_table  # noqa: E402
+from bulk_load import bulk_insert  # noqa: E402
+from synth import make_stops  # noqa: E402
+
+
+def tuple_path(conn):
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM {TABLE}")
+    rows = cur.fetchall()
+    cols = [d[0] for d in cur.description]
+    cur.close()
+    df = pd.DataFrame(rows, columns=cols)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def arrow_path(conn, batch_rows):
+    # unbuffered on MySQL, like arrow_fetch.fetch_arrow_table
+    cur = conn.cursor(pymysql.cursors.SSCursor) if isinstance(conn, pymysql.connections.Connection) \
+        else conn.cursor()
+    cur.execute(f"SELECT * FROM {TABLE}")
+    names = [d[0] for d in cur.description]
+    table = combine_batches(list(iter_record_batches(cur, batch_rows)), names)
+    cur.close()
+    df = to_frame(table)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def measure(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    table = fn(*args)
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20, table.nbytes / 2**20, table.num_rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    ap.add_argument("--batch-rows", type=int, default=50_000)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "bench.sqlite")
+    print(f"{'rows':>10} {'path':>7} {'seconds':>9} {'rows/sec':>12} {'py_peak_mb':>11} {'arrow_mb':>9}")
+    for n in args.sizes:
+        conn = connect(args.backend, path)
+        try:
+            reset_table(conn)
+            bulk_insert(conn, make_stops(n), TABLE, batch_size=20_000)
+            for label, fn, extra in (("tuples", tuple_path, ()), ("arrow", arrow_path, (args.batch_rows,))):
+                seconds, peak, arrow_mb, rows = measure(fn, conn, *extra)
+                assert rows == n
+                print(f"{n:>10} {label:>7} {seconds:>9.2f} {n / seconds:>12,.0f} {peak:>11.1f} {arrow_mb:>9.1f}")
+            cur = conn.cursor()
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_backends.py
+"""Run every analytics panel query on the row store and on DuckDB (duckdb_engine.py).
+
+    python benchmarks/bench_backends.py                      # SQLite stand-in vs DuckDB
+    python benchmarks/bench_backends.py --backend mysql      # DB from SECURECHECK_DB_*
+    python benchmarks/bench_backends.py --sizes 100000 1000000 --repeat 5
+
+Both sides hold the same n synthetic stops: a table in the row store, and
+a Parquet snapshot in the compact archive schema for DuckDB. Each query in
+queries.ANALYTICS_QUERIES runs `--repeat` times per side (translated with
+sql_dialect where needed); the median is reported along with whether both
+sides returned the same number of rows.
+The MySQL run creates (and drops) the scratch tables `bench_checkpost_stops`
+and `bench_violations` (the violation panels join the dictionary by id).
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from archive import to_archive_table  # noqa: E402
+from bench_bulk_insert import TABLE, connect, reset_table  # noqa: E402
+from bulk_load import bulk_insert, placeholder_for  # noqa: E402
+from duckdb_engine import DuckDBEngine  # noqa: E402
+from queries import ANALYTICS_QUERIES  # noqa: E402
+from sql_dialect import translate  # noqa: E402
+from synth import make_stops  # noqa: E402
+from violations import VIOLATION_TABLE  # noqa: E402
+
+BENCH_VIOLATIONS = "bench_violations"
+
+
+def row_store_sql(sql, backend):
+    sql = re.sub(r"\bcheckpost_stops\b", TABLE, sql)
+    sql = re.sub(rf"\b{VIOLATION_TABLE}\b", BENCH_VIOLATIONS, sql)
+    return translate(sql, "sqlite") if backend == "sqlite" else sql
+
+
+def add_violation_ids(conn, df):
+    """Give the scratch table a violation_id column and a dictionary for it -> df with ids."""
+    codes, names = pd.factorize(df["violation"])
+    mark = placeholder_for(conn)
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {BENCH_VIOLATIONS}")
+    cur.execute(f"CREATE TABLE {BENCH_VIOLATIONS} (violation_id SMALLINT PRIMARY KEY, name VARCHAR(64))")
+    cur.executemany(f"INSERT INTO {BENCH_VIOLATIONS} VALUES ({mark}, {mark})",
+                    [(i + 1, str(name)) for i, name in enumerate(names)])
+    cur.execute(f"ALTER TABLE {TABLE} ADD COLUMN violation_id SMALLINT")
+    conn.commit()
+    cur.close()
+    return df.assign(violation_id=pd.arrays.IntegerArray((codes + 1).astype(np.int32), codes < 0))
+
+
+def run_row_store(conn, sql):
+    cur = conn.cursor()
+    cur.execute(sql)
+    rows = cur.fetchall()
+    cols = [d[0] for d in cur.description]
+    cur.close()
+    return pd.DataFrame(rows, columns=cols)
+
+
+def timed(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "bench.sqlite")
+    print(f"{'rows':>10} {'query':<50} {args.backend + '_ms':>10} {'duckdb_ms':>10} {'speedup':>8} {'same':>5}")
+    for n in args.sizes:
+        df = make_stops(n)
+        snapshot = os.path.join(tmpdir, f"stops-{n}.parquet")
+        pq.write_table(to_archive_table(df), snapshot)
+        engine = DuckDBEngine(snapshot=snapshot)
+        engine.attach()
+        conn = connect(args.backend, path)
+        try:
+            reset_table(conn)
+            bulk_insert(conn, add_violation_ids(conn, df), TABLE, batch_size=20_000)
+            totals = [0.0, 0.0]
+            for label, sql in ANALYTICS_QUERIES.items():
+                row_ms, expected = timed(lambda: run_row_store(conn, row_store_sql(sql, args.backend)), args.repeat)
+                duck_ms, got = timed(lambda: engine.run_query(sql, name=label), args.repeat)
+                totals[0] += row_ms
+                totals[1] += duck_ms
+                same = "yes" if len(got) == len(expected) else "NO"
+                print(f"{n:>10} {label[:50]:<50} {row_ms:>10.1f} {duck_ms:>10.1f} {row_ms / duck_ms:>7.1f}x {same:>5}")
+            print(f"{n:>10} {'TOTAL':<50} {totals[0]:>10.1f} {totals[1]:>10.1f} {totals[0] / totals[1]:>7.1f}x")
+            cur = conn.cursor()
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cur.execute(f"DROP TABLE IF EXISTS {BENCH_VIOLATIONS}")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_bulk_insert.py
+"""Compare the old row-by-row iterrows insert with bulk_load.bulk_insert.
+
+    python benchmarks/bench_bulk_insert.py                      # SQLite stand-in
+    python benchmarks/bench_bulk_insert.py --backend mysql      # DB from SECURECHECK_DB_*
+    python benchmarks/bench_bulk_insert.py --sizes 10000 100000 1000000 --legacy-max 100000
+
+The MySQL run creates (and drops) a scratch table `bench_checkpost_stops`.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bulk_load import bulk_insert, placeholder_for  # noqa: E402
+from synth import make_stops  # noqa: E402
+
+TABLE = "bench_checkpost_stops"
+DDL = f"""
+CREATE TABLE {TABLE} (
+  stop_date DATE, stop_time TIME, country_name VARCHAR(64), driver_gender VARCHAR(16),
+  driver_age INT, driver_race VARCHAR(32), violation VARCHAR(64),
+  search_conducted BOOLEAN, search_type VARCHAR(64), stop_outcome VARCHAR(32),
+  is_arrested BOOLEAN, stop_duration VARCHAR(32), drugs_related_stop BOOLEAN,
+  vehicle_number VARCHAR(32)
+)
+"""
+
+
+def connect(backend, path):
+    if backend == "sqlite":
+        return sqlite3.connect(path)
+    import pymysql
+    from db import DB_CONFIG
+    return pymysql.connect(**DB_CONFIG)
+
+
+def reset_table(conn):
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    cur.execute(DDL)
+    conn.commit()
+    cur.close()
+
+
+def legacy_insert(conn, df):
+    """The pre-bulk implementation: one execute per iterrows() row, one commit."""
+    cur = conn.cursor()
+    marks = ", ".join([placeholder_for(conn)] * len(df.columns))
+    sql = f"INSERT INTO {TABLE} ({', '.join(df.columns)}) VALUES ({marks})"
+    inserted = 0
+    for _, row in df.iterrows():
+        cur.execute(sql, tuple(None if v is None or v != v else v.item() if hasattr(v, "item") else v
+                               for v in row))
+        inserted += 1
+    conn.commit()
+    cur.close()
+    return inserted
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--batch-size", type=int, default=5000)
+    ap.add_argument("--legacy-max", type=int, default=100_000,
+                    help="skip the iterrows baseline above this many rows")
+    ap.add_argument("--load-data", action="store_true", help="MySQL: use LOAD DATA LOCAL INFILE")
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "bench.sqlite")
+    print(f"{'rows':>10} {'method':>10} {'seconds':>9} {'rows/sec':>12}")
+    for n in args.sizes:
+        df = make_stops(n)
+        conn = connect(args.backend, path)
+        try:
+            if n <= args.legacy_max:
+                reset_table(conn)
+                t0 = time.perf_counter()
+                legacy_insert(conn, df)
+                dt = time.perf_counter() - t0
+                print(f"{n:>10} {'iterrows':>10} {dt:>9.2f} {n / dt:>12,.0f}")
+            reset_table(conn)
+            report = bulk_insert(conn, df, TABLE, batch_size=args.batch_size, load_data=args.load_data)
+            print(f"{n:>10} {'bulk':>10} {report['seconds']:>9.2f} {report['rows_per_sec']:>12,.0f}")
+            cur = conn.cursor()
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            conn.commit()
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
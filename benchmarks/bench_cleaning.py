@@ -0,0 +1,100 @@
+# benchmarks/bench_cleaning.py
+"""Time data_processing.load_and_clean against the previous row-wise version.
+
+    python benchmarks/bench_cleaning.py --sizes 100000 1000000
+
+Both versions run on the same raw frame and their outputs are compared
+with pandas' assert_frame_equal before timings are printed.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_processing import load_and_clean  # noqa: E402
+from synth import make_stops  # noqa: E402
+
+RAW_VIOLATIONS = ["Speeding", "speeding - 10mph over", "DUI", "Drunk driving", "Seat belt",
+                  "Equipment failure", "moving violation", "  registration/plates ", None]
+RAW_BOOLS = ["True", "False", "true", "false", "1", "0", None]
+
+
+def legacy_load_and_clean(df):
+    """load_and_clean as it was before vectorization (DataFrame input only)."""
+    df = df.copy()
+    df = df.dropna(axis=1, how='all')
+    df.columns = [c.strip().lower() for c in df.columns]
+    if 'stop_date' in df.columns:
+        df['stop_date'] = pd.to_datetime(df['stop_date'], errors='coerce').dt.date
+    if 'stop_time' in df.columns:
+        df['stop_time'] = pd.to_datetime(df['stop_time'], errors='coerce').dt.time
+    if 'driver_age' not in df.columns and 'driver_age_raw' in df.columns:
+        df['driver_age'] = pd.to_numeric(df['driver_age_raw'], errors='coerce').astype('Int64')
+    elif 'driver_age' in df.columns:
+        df['driver_age'] = pd.to_numeric(df['driver_age'], errors='coerce').astype('Int64')
+    for c in ['search_conducted', 'is_arrested', 'drugs_related_stop']:
+        if c in df.columns:
+            df[c] = df[c].map({
+                'True': True, 'False': False,
+                'true': True, 'false': False,
+                '1': True, '0': False,
+                1: True, 0: False,
+                True: True, False: False
+            }).astype('boolean')
+    if 'violation_raw' in df.columns and 'violation' not in df.columns:
+        def map_violation(s):
+            if pd.isna(s): return None
+            s0 = str(s).lower()
+            if 'speed' in s0: return 'Speeding'
+            if 'dui' in s0 or 'drunk' in s0: return 'DUI'
+            if 'seat' in s0: return 'Seatbelt'
+            if 'equipment' in s0: return 'Equipment'
+            return s.strip().title()
+        df['violation'] = df['violation_raw'].apply(map_violation)
+    for c in ['country_name', 'driver_gender', 'driver_race', 'stop_outcome', 'stop_duration']:
+        if c in df.columns:
+            df[c] = df[c].fillna('Unknown')
+    if 'stop_date' in df.columns and 'stop_time' in df.columns:
+        df['needs_review'] = (df['stop_date'].isna() & df['stop_time'].isna()).astype('boolean')
+    return df
+
+
+def make_raw(n, seed=0):
+    """Synthetic stops in the raw export shape (string flags, violation_raw)."""
+    rng = np.random.default_rng(seed)
+    df = make_stops(n, seed).drop(columns=["violation"])
+    df["violation_raw"] = rng.choice(np.array(RAW_VIOLATIONS, dtype=object), n)
+    for c in ["search_conducted", "is_arrested", "drugs_related_stop"]:
+        df[c] = rng.choice(np.array(RAW_BOOLS, dtype=object), n)
+    df.loc[rng.random(n) < 0.01, "stop_date"] = "not a date"
+    df.loc[rng.random(n) < 0.01, "stop_time"] = None
+    return df
+
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = ap.parse_args()
+    print(f"{'rows':>10} {'legacy s':>9} {'vector s':>9} {'speedup':>8}")
+    for n in args.sizes:
+        raw = make_raw(n)
+        old, t_old = timed(legacy_load_and_clean, raw)
+        new, t_new = timed(lambda df: load_and_clean(df, compact=False), raw)
+        pd.testing.assert_frame_equal(old, new)
+        print(f"{n:>10} {t_old:>9.2f} {t_new:>9.2f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# benchmarks/bench_memory.py
+"""Memory footprint of a cleaned stop log before/after the compact schema.
+
+    python benchmarks/bench_memory.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_cleaning import make_raw  # noqa: E402
+from data_processing import apply_schema, load_and_clean, memory_report  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+    loose = load_and_clean(make_raw(args.rows), compact=False)
+    compact = apply_schema(loose)
+    report = memory_report(loose, compact)
+    report[["bytes_before", "bytes_after"]] = report[["bytes_before", "bytes_after"]] / 2**20
+    report = report.rename(columns={"bytes_before": "MiB_before", "bytes_after": "MiB_after"})
+    with pd.option_context("display.width", 120, "display.float_format", "{:.2f}".format):
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
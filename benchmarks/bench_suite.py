@@ -0,0 +1,310 @@
+# benchmarks/bench_suite.py
+"""End-to-end benchmark of the ingest and dashboard query paths, with baselines.
+
+    python benchmarks/bench_suite.py                                  # SQLite, 10k + 100k rows
+    python benchmarks/bench_suite.py --sizes 100000 1000000 --out run.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json    # run, then compare
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare old.json new.json           # no run
+    python benchmarks/bench_suite.py --backend mysql --mysql-db securecheck_bench
+
+Stages, per size, on synthetic raw stop logs (bench_cleaning.make_raw):
+
+    csv_parse       pd.read_csv of the raw export
+    clean           data_processing.load_and_clean
+    bulk_insert     db.insert_dataframe_to_table into a fresh scratch table
+    query:<name>    the filtered Recent Stops page and summary, every
+                    analytics panel (queries.analytics_sql) and the
+                    repeated-vehicle SQL, each run --repeat times uncached
+    alert_engine    alerts.AlertEngine warm start + alerts()
+    plate_search    plate_search.PlateIndex lookups (prefix, substring,
+                    wildcard, misread) on an index loaded from the table
+
+Every stage records its run latencies (p50/p95/p99/mean ms), throughput
+(rows of input per second at the median) and peak RSS. Each size runs in
+a fresh process so sizes don't share memory; on Linux the peak RSS is
+reset before every stage (/proc/self/clear_refs), elsewhere it is the
+process high-water mark so far.
+
+The MySQL run uses a separate database (--mysql-db, created beforehand):
+its checkpost_stops is emptied and reloaded for every size.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# db.py reads SECURECHECK_DB_* at import time, so the app modules are only
+# imported inside run_size(), after the child process has set them.
+
+SCRATCH_TABLE = "bench_insert_stops"
+# p50 changes below this many ms are noise, whatever the percentage
+MIN_DELTA_MS = 1.0
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:         # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, q):
+    values = sorted(values)
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def measure(stage, rows, fn, repeat, setup=None):
+    """Run fn() `repeat` times (setup() before each, untimed) -> stage record."""
+    reset_peak_rss()
+    seconds, result = [], None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - t0)
+    ms = [s * 1000 for s in seconds]
+    median = percentile(seconds, 50)
+    return {
+        "stage": stage, "rows": rows, "runs": repeat,
+        "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "p99_ms": percentile(ms, 99),
+        "mean_ms": sum(ms) / len(ms), "max_ms": max(ms),
+        "rows_per_sec": rows / median if median > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "result_rows": len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def run_size(n, args, workdir):
+    """All stages for `n` rows, in the current (fresh) process. Returns stage records."""
+    if args.backend == "sqlite":
+        os.environ["SECURECHECK_DB_BACKEND"] = "sqlite"
+        os.environ["SECURECHECK_SQLITE_PATH"] = os.path.join(workdir, f"bench-{n}.sqlite")
+    else:
+        os.environ["SECURECHECK_DB_BACKEND"] = "mysql"
+        os.environ["SECURECHECK_DB_NAME"] = args.mysql_db
+
+    import pandas as pd
+    import alerts
+    import db_schema
+    import plate_search
+    import rollups
+    from bench_cleaning import make_raw
+    from data_processing import load_and_clean
+    from db import get_pool, insert_dataframe_to_table, run_query
+    from queries import (ANALYTICS_QUERIES, REPEATED_VEHICLES_SQL, TABLE, analytics_sql, build_page_sql,
+                         build_summary_sql, filter_where)
+
+    def execute(sql):
+        with get_pool().connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+                conn.commit()
+            finally:
+                cursor.close()
+
+    def want(stage):
+        return not args.stages or any(stage.startswith(s) for s in args.stages)
+
+    results = []
+
+    def record(stage, fn, repeat, setup=None):
+        if want(stage):
+            rec = measure(stage, n, fn, repeat, setup)
+            results.append(rec)
+            print(f"{n:>10} {stage[:52]:<52} {rec['p50_ms']:>10.1f} {rec['p95_ms']:>10.1f} "
+                  f"{rec['rows_per_sec'] or 0:>12,.0f} {rec['peak_rss_mb'] or 0:>9.1f}", flush=True)
+
+    csv_path = os.path.join(workdir, f"stops-{n}.csv")
+    make_raw(n).to_csv(csv_path, index=False)
+
+    raw = pd.read_csv(csv_path)
+    record("csv_parse", lambda: pd.read_csv(csv_path), args.ingest_repeat)
+    clean = load_and_clean(raw)
+    record("clean", lambda: load_and_clean(raw), args.ingest_repeat)
+
+    def fresh_scratch():
+        execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        execute(db_schema.create_table_sql(SCRATCH_TABLE))
+
+    record("bulk_insert", lambda: insert_dataframe_to_table(clean, SCRATCH_TABLE), args.ingest_repeat,
+           setup=fresh_scratch)
+    execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+
+    # the dashboard's tables, loaded once (untimed) for the query stages
+    db_schema.migrate(verbose=False)
+    execute(f"DELETE FROM {TABLE}")
+    insert_dataframe_to_table(clean, TABLE)
+    rollups.rebuild()
+
+    start, end = date(2022, 1, 1), date(2022, 12, 31)
+    conditions, params = filter_where(start, end, gender="M")
+    page_sql, page_params = build_page_sql(conditions, params, 50)
+    summary_sql, summary_params = build_summary_sql(conditions, params)
+    statements = [("Recent stops (filtered page)", page_sql, page_params),
+                  ("Summary (filtered)", summary_sql, summary_params)]
+    statements += [(label, analytics_sql(label), ()) for label in ANALYTICS_QUERIES]
+    statements.append(("Repeated vehicles (30 days)", REPEATED_VEHICLES_SQL, ()))
+    for name, sql, sql_params in statements:
+        record(f"query:{name}", lambda: run_query(sql, sql_params, ttl=0, name=name), args.repeat)
+
+    def warm_and_read():
+        engine = alerts.AlertEngine()
+        engine.warm_start()
+        return engine.alerts(engine.rules()[0].name)
+
+    record("alert_engine", warm_and_read, args.repeat)
+
+    index = plate_search.PlateIndex()
+    index.load()
+    plate = plate_search.normalize(clean["vehicle_number"].dropna().iloc[0])
+    probes = [plate[:4], plate[2:7], plate[:3] + "?" + plate[4:], plate[:-1] + "X"]
+    record("plate_search", lambda: [index.search(q) for q in probes], args.repeat)
+    return results
+
+
+def _child(n, args, workdir, queue):
+    try:
+        queue.put(("ok", run_size(n, args, workdir)))
+    except Exception as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="securecheck-bench-")
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'rows':>10} {'stage':<52} {'p50_ms':>10} {'p95_ms':>10} {'rows/sec':>12} {'rss_mb':>9}")
+    results = []
+    for n in args.sizes:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_child, args=(n, args, workdir, queue))
+        proc.start()
+        status, payload = queue.get()
+        proc.join()
+        if status != "ok":
+            raise SystemExit(f"size {n} failed: {payload}")
+        results.extend(payload)
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    """Print p50 / peak RSS changes per (stage, rows); returns the regressed stages."""
+    base = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    print(f"\nbaseline: {baseline.get('created')} ({baseline.get('commit')}, {baseline.get('backend')})"
+          f"   current: {current.get('created')} ({current.get('commit')}, {current.get('backend')})")
+    print(f"{'rows':>10} {'stage':<52} {'base_p50':>9} {'p50':>9} {'change':>8} "
+          f"{'base_rss':>9} {'rss':>9}  verdict")
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["stage"], r["rows"]))
+        if b is None:
+            print(f"{r['rows']:>10} {r['stage'][:52]:<52} {'-':>9} {r['p50_ms']:>9.1f} {'-':>8}"
+                  f" {'-':>9} {r['peak_rss_mb'] or 0:>9.1f}  new")
+            continue
+        change = (r["p50_ms"] - b["p50_ms"]) / b["p50_ms"] * 100 if b["p50_ms"] else 0.0
+        delta = r["p50_ms"] - b["p50_ms"]
+        if change > threshold and delta > MIN_DELTA_MS:
+            verdict = "REGRESSION"
+            regressions.append(r["stage"])
+        elif change < -threshold and -delta > MIN_DELTA_MS:
+            verdict = "faster"
+        else:
+            verdict = "ok"
+        print(f"{r['rows']:>10} {r['stage'][:52]:<52} {b['p50_ms']:>9.1f} {r['p50_ms']:>9.1f} {change:>+7.1f}%"
+              f" {b['peak_rss_mb'] or 0:>9.1f} {r['peak_rss_mb'] or 0:>9.1f}  {verdict}")
+    print(f"\n{len(regressions)} regression(s) over {threshold:.0f}%")
+    return regressions
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save(doc, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, indent=1)
+    print(f"results written to {path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    ap.add_argument("--mysql-db", default="securecheck_bench", help="database the MySQL run may overwrite")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=5, help="runs per query stage")
+    ap.add_argument("--ingest-repeat", type=int, default=3, help="runs per parse/clean/insert stage")
+    ap.add_argument("--stages", nargs="+", help="only stages starting with these names (e.g. clean query:)")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="compare this run against a saved result file")
+    ap.add_argument("--save-baseline", help="also write this run to the given baseline path")
+    ap.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="compare two result files")
+    ap.add_argument("--threshold", type=float, default=10.0, help="p50 slowdown (%%) reported as a regression")
+    args = ap.parse_args()
+
+    if args.compare:
+        regressions = compare(_load(args.compare[0]), _load(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    doc = run(args)
+    _save(doc, args.out)
+    if args.save_baseline:
+        _save(doc, args.save_baseline)
+    if args.baseline:
+        regressions = compare(_load(args.baseline), doc, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
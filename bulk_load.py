@@ -0,0 +1,175 @@
+# bulk_load.py
+"""Chunked bulk INSERT of DataFrames into a DB-API connection.
+
+Rows are sent with `executemany`, which pymysql rewrites into multi-row
+`INSERT ... VALUES (...), (...)` statements, and each chunk is committed on
+its own. When a chunk is rejected the failing rows are isolated by
+bisecting the chunk (log2(chunk) extra statements per bad row instead of one
+round trip per row) and moved to a quarantine frame.
+"""
+import csv
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = int(os.environ.get("SECURECHECK_BULK_BATCH_SIZE", "5000"))
+
+
+def placeholder_for(conn):
+    """Parameter marker for the connection's driver ('?' for sqlite3, else '%s')."""
+    module = type(conn).__module__.split(".")[0]
+    return "?" if module in ("sqlite3", "_sqlite3") else "%s"
+
+
+def frame_to_rows(df):
+    """DataFrame -> list of tuples of plain Python values (NaN/NA/NaT -> None).
+
+    datetime64 / timedelta64 columns (the compact stop schema) become
+    datetime / timedelta objects, which the drivers bind as DATETIME / TIME.
+    """
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        # built by position (the .dt converters may return their own 0-based index) and
+        # kept out of a DataFrame, which would re-infer datetime64 and turn None back into NaT
+        if kind in "Mm":
+            # at microsecond resolution numpy boxes to datetime / timedelta objects
+            unit = "datetime64[us]" if kind == "M" else "timedelta64[us]"
+            values = series.to_numpy().astype(unit).astype(object)
+        else:
+            values = np.array(series.astype(object), dtype=object)
+        values[series.isna().to_numpy()] = None
+        columns.append(values)
+    return list(zip(*columns)) if columns else [()] * len(df)
+
+
+def _insert_rows(cursor, sql, rows, index, quarantine, counter):
+    """Insert `rows` inside a savepoint; bisect on failure. Returns rows inserted."""
+    counter[0] += 1
+    savepoint = f"bulk_sp_{counter[0]}"
+    cursor.execute(f"SAVEPOINT {savepoint}")
+    try:
+        cursor.executemany(sql, rows)
+        cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+        return len(rows)
+    except Exception as e:
+        cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+        cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+        if len(rows) == 1:
+            quarantine.append((index[0], str(e)))
+            return 0
+    mid = len(rows) // 2
+    return (_insert_rows(cursor, sql, rows[:mid], index[:mid], quarantine, counter)
+            + _insert_rows(cursor, sql, rows[mid:], index[mid:], quarantine, counter))
+
+
+def _load_data_chunk(cursor, chunk, table_name):
+    """Send one chunk through LOAD DATA LOCAL INFILE (MySQL only)."""
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            for row in frame_to_rows(chunk):
+                writer.writerow([r"\N" if v is None else (int(v) if isinstance(v, bool) else v)
+                                 for v in row])
+        cols = ", ".join(chunk.columns)
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n' ({cols})",
+            (path,),
+        )
+        return cursor.rowcount
+    finally:
+        os.remove(path)
+
+
+def bulk_insert(conn, df, table_name, batch_size=BULK_BATCH_SIZE, load_data=False,
+                quarantine_path=None, on_chunk=None, on_commit=None, before_commit=None):
+    """Insert `df` into `table_name` in committed chunks of `batch_size` rows.
+
+    load_data:        try MySQL `LOAD DATA LOCAL INFILE` per chunk first (the
+                      connection needs local_infile=True); a chunk that fails
+                      there falls back to executemany so bad rows are still
+                      quarantined.
+    quarantine_path:  optional CSV the rejected rows (plus `_error`) are
+                      appended to.
+    on_chunk:         optional callback(report_so_far) after each commit.
+    on_commit:        optional callback(committed_rows_df) after each commit,
+                      with the chunk's rows minus any quarantined ones.
+    before_commit:    optional callback(cursor, report_so_far) just before
+                      each commit; what it writes through `cursor` commits
+                      (or rolls back) together with the chunk.
+
+    Returns a report dict: inserted, failed, chunks, seconds, rows_per_sec
+    and `quarantine` (DataFrame of rejected rows with an `_error` column).
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    cols = ", ".join(df.columns)
+    marks = ", ".join([placeholder_for(conn)] * len(df.columns))
+    insert_sql = f"INSERT INTO {table_name} ({cols}) VALUES ({marks})"
+
+    report = {"inserted": 0, "failed": 0, "chunks": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    rejected = []
+    counter = [0]
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(df), batch_size):
+            chunk = df.iloc[start:start + batch_size]
+            done = None
+            if load_data:
+                try:
+                    done = _load_data_chunk(cursor, chunk, table_name)
+                except Exception:
+                    conn.rollback()
+                    done = None
+            chunk_rejects = []
+            if done is None:
+                done = _insert_rows(cursor, insert_sql, frame_to_rows(chunk),
+                                    list(chunk.index), chunk_rejects, counter)
+                rejected.extend(chunk_rejects)
+                report["failed"] += len(chunk_rejects)
+            report["inserted"] += done
+            report["chunks"] += 1
+            if before_commit is not None:
+                before_commit(cursor, dict(report))
+            conn.commit()
+            if on_commit is not None:
+                if chunk_rejects:
+                    bad = [idx for idx, _ in chunk_rejects]
+                    on_commit(chunk[~chunk.index.isin(bad)])
+                else:
+                    on_commit(chunk)
+            report["seconds"] = time.perf_counter() - started
+            if report["seconds"] > 0:
+                report["rows_per_sec"] = report["inserted"] / report["seconds"]
+            if on_chunk is not None:
+                on_chunk(dict(report))
+    finally:
+        cursor.close()
+
+    if rejected:
+        quarantine = df.loc[[idx for idx, _ in rejected]].copy()
+        quarantine["_error"] = [err for _, err in rejected]
+        for idx, err in rejected:
+            logger.warning("Row %s of %s quarantined: %s", idx, table_name, err)
+        if quarantine_path:
+            quarantine.to_csv(quarantine_path, mode="a", index=True,
+                              header=not os.path.exists(quarantine_path))
+    else:
+        quarantine = pd.DataFrame(columns=list(df.columns) + ["_error"])
+    report["quarantine"] = quarantine
+    report["seconds"] = time.perf_counter() - started
+    report["rows_per_sec"] = report["inserted"] / report["seconds"] if report["seconds"] > 0 else 0.0
+    return report
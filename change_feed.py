@@ -0,0 +1,99 @@
+# change_feed.py
+"""Incremental Recent Stops: fetch only the stops that arrived since the last refresh.
+
+A ChangeFeed (one per session, kept in st.session_state) remembers the
+highest checkpost_stops.id it has seen, its high-water mark. ids are
+AUTO_INCREMENT, so new stops are exactly `id > mark`: a range on the
+primary key, and a refresh with nothing new costs one index probe however
+large the table is. New rows are merged into a frame of the newest
+max_rows arrivals (newest first); the first refresh seeds it.
+
+ids are taken at insert time but become visible at commit, so with
+concurrent writers a lower id can appear after a higher one. Each refresh
+therefore also lists the matching ids in the FEED_LOOKBACK_IDS below the
+mark (an id-only range read) and fetches the ones the frame lacks.
+
+The feed only sees inserts: stops deleted or archived stay in the frame
+until they are trimmed or the feed is reset.
+"""
+import os
+import time
+
+import pandas as pd
+
+from db import run_query
+from queries import TABLE, build_feed_sql
+
+
+FEED_MAX_ROWS = int(os.environ.get("SECURECHECK_FEED_MAX_ROWS", "1000"))
+FEED_REFRESH_SECONDS = int(os.environ.get("SECURECHECK_FEED_REFRESH", "10"))
+FEED_LOOKBACK_IDS = int(os.environ.get("SECURECHECK_FEED_LOOKBACK", "1000"))
+
+MAX_ID_SQL = f"SELECT MAX(id) AS top FROM {TABLE}"
+
+
+class ChangeFeed:
+    """The newest `max_rows` stops matching the filters, kept current by id."""
+
+    def __init__(self, conditions=(), params=(), max_rows=FEED_MAX_ROWS, lookback=FEED_LOOKBACK_IDS):
+        self.conditions, self.params = list(conditions), list(params)
+        self.max_rows = int(max_rows)
+        self.lookback = int(lookback)
+        self.rows = pd.DataFrame()
+        self.high_water = None
+        self.refreshes = 0
+        self.refreshed_at = None
+
+    def reset(self):
+        self.rows = pd.DataFrame()
+        self.high_water = None
+
+    def _where(self, extra):
+        conditions = self.conditions + [extra]
+        return " WHERE " + " AND ".join(conditions)
+
+    def _late_ids(self):
+        """Matching ids just below the mark that the frame lacks (committed late)."""
+        low = max(self.high_water - self.lookback, 0)
+        sql = f"SELECT id FROM {TABLE}{self._where('id > %s AND id <= %s')}"
+        ids = run_query(sql, tuple(self.params) + (low, self.high_water), ttl=0, name="Change feed lookback")["id"]
+        held = set(self.rows["id"].tolist()) if not self.rows.empty else set()
+        floor = self.rows["id"].min() if len(self.rows) >= self.max_rows else -1
+        # ids below a full frame's oldest row were trimmed, not missed
+        return [int(i) for i in ids if int(i) not in held and int(i) > floor]
+
+    def _select_ids(self, ids):
+        sql = f"SELECT * FROM {TABLE} WHERE id IN ({', '.join(['%s'] * len(ids))})"
+        return sql, tuple(ids)
+
+    def refresh(self):
+        """Fetch the stops past the high-water mark and merge them in.
+
+        Returns a dict with rows (the frame, newest first), new_rows,
+        high_water and seconds.
+        """
+        started = time.perf_counter()
+        # the mark moves to the newest id in the table, not just the newest
+        # match, so filtered-out arrivals are not read again next time
+        top = run_query(MAX_ID_SQL, ttl=0, name="Change feed mark")["top"].iloc[0]
+        top = None if pd.isna(top) else int(top)
+        sql, params = build_feed_sql(self.conditions, self.params, self.high_water, self.max_rows)
+        fetched = run_query(sql, tuple(params), ttl=0, name="Change feed")
+        if self.high_water is not None:
+            late = self._late_ids()
+            if late:
+                sql, params = self._select_ids(late)
+                fetched = pd.concat([fetched, run_query(sql, params, ttl=0, name="Change feed late rows")],
+                                    ignore_index=True)
+        new_rows = 0
+        if len(fetched):
+            frame = pd.concat([fetched, self.rows], ignore_index=True) if not self.rows.empty else fetched
+            self.rows = frame.sort_values("id", ascending=False).head(self.max_rows).reset_index(drop=True)
+            new_rows = int(self.rows["id"].isin(fetched["id"]).sum())
+            top = max(top or 0, int(fetched["id"].max()))
+        if top is not None:
+            self.high_water = max(self.high_water or 0, top)
+        self.refreshes += 1
+        self.refreshed_at = time.time()
+        return {"rows": self.rows, "new_rows": new_rows, "high_water": self.high_water,
+                "seconds": time.perf_counter() - started}
@@ -1,11 +1,210 @@
 # data_processing_mysql.py
+import os
+
 import pandas as pd
 import numpy as np
+from pandas.tseries.api import guess_datetime_format
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the Arrow-backed plate strings)
+    PLATE_DTYPE = 'string[pyarrow]'
+except ImportError:
+    PLATE_DTYPE = 'string'
+
+# explicit clock formats tried for stop_time values pandas can't guess
+STOP_TIME_FORMATS = ('%H:%M:%S', '%H:%M')
+
+BOOL_LOOKUP = {
+    'True': True, 'False': False,
+    'true': True, 'false': False,
+    '1': True, '0': False,
+    1: True, 0: False,
+    True: True, False: False
+}
+
+# keyword -> category table for violation_raw; first match wins
+VIOLATION_KEYWORDS = [
+    (('speed',), 'Speeding'),
+    (('dui', 'drunk'), 'DUI'),
+    (('seat',), 'Seatbelt'),
+    (('equipment',), 'Equipment'),
+]
+
+
+# Declared dtypes for a cleaned stop log (see apply_schema). Low-cardinality
+# text -> category, flags -> nullable boolean, age -> smallest nullable int
+# that fits, date -> datetime64, time of day -> timedelta64, plates -> strings.
+STOP_SCHEMA = {
+    'stop_date': 'datetime64[ns]',
+    'stop_time': 'timedelta64[ns]',
+    'country_name': 'category',
+    'driver_gender': 'category',
+    'driver_race': 'category',
+    'violation_raw': 'category',
+    'violation': 'category',
+    'search_type': 'category',
+    'stop_outcome': 'category',
+    'stop_duration': 'category',
+    'driver_age': 'Int8',
+    'search_conducted': 'boolean',
+    'is_arrested': 'boolean',
+    'drugs_related_stop': 'boolean',
+    'needs_review': 'boolean',
+    'vehicle_number': PLATE_DTYPE,
+    'vehicle_plate': PLATE_DTYPE,
+    'officer_id': PLATE_DTYPE,
+}
+
+
+def _parse_datetimes(s, part):
+    """Parse each distinct value once with an explicit, once-guessed format.
+
+    pd.to_datetime without a format guesses one from the first non-null
+    value and applies it to every element. factorize() keeps first-seen
+    order, so guessing from uniques[0] and parsing only the distinct values
+    gives exactly the same result as the row-wise call. Returns an object
+    Series of datetime.date / datetime.time (`part`) with NaT for failures.
+    """
+    if not (s.dtype == object or pd.api.types.is_string_dtype(s.dtype)):
+        parsed = pd.to_datetime(s, errors='coerce')
+        return parsed.dt.date if part == 'date' else parsed.dt.time
+
+    codes, uniques = pd.factorize(s)
+    uniques = pd.Index(uniques, dtype=object)
+    fmt = None
+    if len(uniques) and isinstance(uniques[0], str):
+        fmt = guess_datetime_format(uniques[0])
+
+    values = np.full(len(uniques) + 1, pd.NaT, dtype=object)   # last slot: missing
+    todo = np.ones(len(uniques), dtype=bool)
+    if fmt is None and part == 'time':
+        # bare times can't be guessed and would go through dateutil one by
+        # one; only the time of day is kept, so explicit clock formats give
+        # the same answer for the values they match
+        for clock_fmt in STOP_TIME_FORMATS:
+            idx = np.flatnonzero(todo)
+            attempt = pd.to_datetime(uniques[idx], format=clock_fmt, errors='coerce')
+            hit = np.asarray(attempt.notna())
+            values[idx[hit]] = attempt[hit].time
+            todo[idx[hit]] = False
+    idx = np.flatnonzero(todo)
+    if len(idx):
+        if fmt is not None:
+            parsed = pd.to_datetime(uniques[idx], format=fmt, errors='coerce')
+        else:
+            # keep uniques[0] (no guessable format) in front so pandas parses
+            # the rest element by element, as the row-wise call did
+            parsed = pd.to_datetime(uniques[np.r_[0, idx]], errors='coerce')[1:]
+        ok = np.asarray(parsed.notna())
+        values[idx[ok]] = parsed[ok].date if part == 'date' else parsed[ok].time
+    if todo.all() and not (len(idx) and ok.any()):
+        # nothing parseable (or empty): pandas would hand back a datetime64
+        # column here, which apply_schema can't cast to timedelta64
+        return pd.Series(pd.NaT, index=s.index, dtype=object)
+    return pd.Series(values[codes], index=s.index, dtype=object)
+
+
+def to_boolean(s):
+    """Map truthy/falsy spellings to a nullable boolean via a per-value lookup."""
+    codes, uniques = pd.factorize(s)
+    mapped = [BOOL_LOOKUP.get(u) for u in uniques]
+    truth = np.array([m is True for m in mapped] + [False])
+    known = np.array([m is not None for m in mapped] + [False])
+    return pd.Series(pd.arrays.BooleanArray(truth[codes], ~known[codes]), index=s.index)
+
+
+def map_violations(s):
+    """Vectorized violation_raw -> category using VIOLATION_KEYWORDS.
+
+    Each distinct value is classified once with str.contains masks;
+    unmatched values are title-cased, missing values stay missing.
+    """
+    codes, uniques = pd.factorize(s)
+    uniques = pd.Index(uniques, dtype=object)
+    lower = uniques.astype(str).str.lower()
+    matched = np.zeros(len(uniques), dtype=bool)
+    out = np.empty(len(uniques) + 1, dtype=object)
+    out[-1] = None
+    for keywords, category in VIOLATION_KEYWORDS:
+        mask = np.zeros(len(uniques), dtype=bool)
+        for kw in keywords:
+            mask |= np.asarray(lower.str.contains(kw, regex=False), dtype=bool)
+        mask &= ~matched
+        out[:-1][mask] = category
+        matched |= mask
+    if (~matched).any():
+        out[:-1][~matched] = uniques[~matched].str.strip().str.title()
+    return pd.Series(out[codes], index=s.index)
+
+
+def _convert_distinct(s, convert, fill_value):
+    """Apply `convert` (Index -> Index) to the distinct values of `s` only."""
+    codes, uniques = pd.factorize(s)
+    converted = convert(pd.Index(uniques, dtype=object))
+    return pd.Series(converted.take(codes, allow_fill=True, fill_value=fill_value), index=s.index)
+
+
+def _time_to_timedelta(values):
+    seconds = [v.hour * 3600 + v.minute * 60 + v.second + v.microsecond / 1e6 for v in values]
+    return pd.to_timedelta(seconds, unit='s')
+
+
+def _smallest_int(s):
+    """Int8 when every age fits, else Int16, else leave as is."""
+    s = pd.to_numeric(s, errors='coerce').astype('Int64')
+    lo, hi = s.min(), s.max()
+    if pd.isna(lo) or (lo >= -128 and hi <= 127):
+        return s.astype('Int8')
+    if lo >= -32768 and hi <= 32767:
+        return s.astype('Int16')
+    return s
+
+
+def apply_schema(df, schema=STOP_SCHEMA):
+    """Cast the columns of a cleaned frame present in `schema` to their compact dtypes."""
+    df = df.copy()
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        s = df[col]
+        if dtype.startswith('datetime64'):
+            if s.dtype == object:
+                s = _convert_distinct(s, lambda u: pd.DatetimeIndex(pd.to_datetime(u)), pd.NaT)
+            df[col] = s.astype(dtype)
+        elif dtype.startswith('timedelta64'):
+            if s.dtype == object:
+                s = _convert_distinct(s, lambda u: pd.TimedeltaIndex(_time_to_timedelta(u)), pd.NaT)
+            df[col] = s.astype(dtype)
+        elif dtype in ('Int8', 'Int16'):
+            df[col] = _smallest_int(s)
+        else:
+            df[col] = s.astype(dtype)
+    return df
+
+
+def memory_report(before, after):
+    """Per-column deep memory use of two frames (bytes) and the saving ratio."""
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str).reindex(before.columns),
+        'bytes_before': b,
+        'bytes_after': a.reindex(b.index),
+    })
+    report.loc['TOTAL'] = ['', '', b.sum(), a.sum()]
+    report['ratio'] = report['bytes_before'] / report['bytes_after']
+    return report
+
+
+def load_and_clean(path_or_df, compact=True):
+    """Load CSV or DataFrame, drop columns that are all-NA, normalize and handle NaNs.
 
-def load_and_clean(path_or_df):
-    """Load CSV or DataFrame, drop columns that are all-NA, normalize and handle NaNs."""
-    if isinstance(path_or_df, str):
-        df = pd.read_csv(r"C:\Users\BalaGomathi\Downloads\traffic_stops - traffic_stops_with_vehicle_number.csv")
+    With `compact` (the default) the result is cast to STOP_SCHEMA;
+    `compact=False` keeps the original object columns (python date/time).
+    """
+    if isinstance(path_or_df, (str, os.PathLike)):
+        df = pd.read_csv(path_or_df)
     else:
         df = path_or_df.copy()
 
@@ -17,10 +216,10 @@ def load_and_clean(path_or_df):
 
     # parse stop_date and stop_time
     if 'stop_date' in df.columns:
-        df['stop_date'] = pd.to_datetime(df['stop_date'], errors='coerce').dt.date
+        df['stop_date'] = _parse_datetimes(df['stop_date'], 'date')
     if 'stop_time' in df.columns:
         # keep time as string "HH:MM:SS" or as python time object
-        df['stop_time'] = pd.to_datetime(df['stop_time'], errors='coerce').dt.time
+        df['stop_time'] = _parse_datetimes(df['stop_time'], 'time')
 
     # driver_age: try to extract numeric from driver_age_raw if needed
     if 'driver_age' not in df.columns and 'driver_age_raw' in df.columns:
@@ -32,25 +231,11 @@ def load_and_clean(path_or_df):
     bool_cols = ['search_conducted', 'is_arrested', 'drugs_related_stop']
     for c in bool_cols:
         if c in df.columns:
-            df[c] = df[c].map({
-                'True': True, 'False': False,
-                'true': True, 'false': False,
-                '1': True, '0': False,
-                1: True, 0: False,
-                True: True, False: False
-            }).astype('boolean')
+            df[c] = to_boolean(df[c])
 
     # simple violation normalization: map common keywords -> categories
     if 'violation_raw' in df.columns and 'violation' not in df.columns:
-        def map_violation(s):
-            if pd.isna(s): return None
-            s0 = str(s).lower()
-            if 'speed' in s0: return 'Speeding'
-            if 'dui' in s0 or 'drunk' in s0: return 'DUI'
-            if 'seat' in s0: return 'Seatbelt'
-            if 'equipment' in s0: return 'Equipment'
-            return s.strip().title()
-        df['violation'] = df['violation_raw'].apply(map_violation)
+        df['violation'] = map_violations(df['violation_raw'])
 
     # fill categorical NaNs with 'Unknown' for a set of categorical columns
     cat_cols = ['country_name', 'driver_gender', 'driver_race', 'stop_outcome', 'stop_duration']
@@ -62,6 +247,8 @@ def load_and_clean(path_or_df):
     if 'stop_date' in df.columns and 'stop_time' in df.columns:
         df['needs_review'] = (df['stop_date'].isna() & df['stop_time'].isna()).astype('boolean')
 
+    if compact:
+        df = apply_schema(df)
     return df
 
 if __name__ == "__main__":
@@ -85,3 +272,4 @@ if __name__ == "__main__":
     }])
     cleaned = load_and_clean(sample)
     print(cleaned.to_dict(orient='records'))
+    print(memory_report(load_and_clean(sample, compact=False), cleaned))
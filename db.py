@@ -0,0 +1,354 @@
+# db.py
+"""Database access for the checkpost dashboard.
+
+Holds one connection pool per process so Streamlit reruns (and any other
+caller) reuse already-authenticated MySQL connections instead of doing a
+TCP + auth handshake for every query.
+
+SECURECHECK_DB_BACKEND=sqlite swaps the server for a local SQLite file
+(SECURECHECK_SQLITE_PATH) behind the same pool, see sqlite_backend.py.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pymysql
+
+from bulk_load import BULK_BATCH_SIZE, bulk_insert
+from instrumentation import get_recorder, new_call, query_name
+from query_cache import get_cache, is_cacheable, tables_in
+import sqlite_backend
+
+
+logger = logging.getLogger(__name__)
+
+# "mysql" or "sqlite" (service-free stand-in for tests and benchmarks)
+DB_BACKEND = os.environ.get("SECURECHECK_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("SECURECHECK_SQLITE_PATH", "securecheck.sqlite")
+
+DB_CONFIG = {
+    "host": os.environ.get("SECURECHECK_DB_HOST", "localhost"),
+    "port": int(os.environ.get("SECURECHECK_DB_PORT", "3306")),
+    "user": os.environ.get("SECURECHECK_DB_USER", "root"),
+    "password": os.environ.get("SECURECHECK_DB_PASSWORD", "Rtx3090ti"),
+    "database": os.environ.get("SECURECHECK_DB_NAME", "mydb"),
+}
+if os.environ.get("SECURECHECK_DB_LOCAL_INFILE", "0") == "1":
+    # allows the LOAD DATA LOCAL INFILE fast path in bulk_load
+    DB_CONFIG["local_infile"] = True
+
+POOL_SIZE = int(os.environ.get("SECURECHECK_POOL_SIZE", "5"))
+POOL_MAX_IDLE = float(os.environ.get("SECURECHECK_POOL_MAX_IDLE", "300"))
+POOL_TIMEOUT = float(os.environ.get("SECURECHECK_POOL_TIMEOUT", "30"))
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection became free within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Small thread-safe pool of pymysql (or sqlite_backend) connections.
+
+    - at most `size` connections exist at any time (idle + checked out)
+    - idle connections older than `max_idle` seconds are closed on checkout
+    - a reused connection is pinged before it is handed out (health check)
+    """
+
+    def __init__(self, size=POOL_SIZE, max_idle=POOL_MAX_IDLE, timeout=POOL_TIMEOUT,
+                 health_check=True, **connect_kwargs):
+        if size < 1:
+            raise ValueError("pool size must be >= 1")
+        self.size = size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check = health_check
+        self.connect_kwargs = connect_kwargs or dict(DB_CONFIG)
+        self._idle = []          # list of (conn, last_used) — used as a LIFO stack
+        self._open = 0           # idle + checked out
+        self._cond = threading.Condition()
+        self._stats = {
+            "hits": 0,           # checkout served by an idle connection
+            "misses": 0,         # checkout had to open a new connection
+            "waits": 0,          # checkout had to wait for a release
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "evicted_idle": 0,
+            "failed_health_checks": 0,
+            "discarded": 0,
+        }
+
+    def _connect(self):
+        if DB_BACKEND == "sqlite":
+            return sqlite_backend.connect(SQLITE_PATH)
+        return pymysql.connect(**self.connect_kwargs)
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """Check out a connection, opening or waiting for one if needed."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_since = None
+        with self._cond:
+            while True:
+                while self._idle:
+                    conn, last_used = self._idle.pop()
+                    if self.max_idle and time.monotonic() - last_used > self.max_idle:
+                        self._open -= 1
+                        self._stats["evicted_idle"] += 1
+                        self._close_quietly(conn)
+                        continue
+                    if self.health_check:
+                        try:
+                            conn.ping(reconnect=False)
+                        except Exception:
+                            self._open -= 1
+                            self._stats["failed_health_checks"] += 1
+                            self._close_quietly(conn)
+                            continue
+                    self._stats["hits"] += 1
+                    self._record_wait(waited_since)
+                    return conn
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._record_wait(waited_since)
+                    raise PoolTimeout(f"no database connection free after {timeout:.1f}s")
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats["waits"] += 1
+                self._cond.wait(remaining)
+
+        # open the new connection outside the lock so other threads can proceed
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["misses"] += 1
+            self._record_wait(waited_since)
+        return conn
+
+    def _record_wait(self, waited_since):
+        if waited_since is None:
+            return
+        waited = time.monotonic() - waited_since
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool (or close it when `discard`)."""
+        with self._cond:
+            if discard:
+                self._open -= 1
+                self._stats["discarded"] += 1
+                self._close_quietly(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """`with pool.connection() as conn:` — rolls back and returns on exit."""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def stats(self):
+        """Snapshot of hit/miss/wait counters plus current occupancy."""
+        with self._cond:
+            out = dict(self._stats)
+            out["idle"] = len(self._idle)
+            out["in_use"] = self._open - len(self._idle)
+            out["size"] = self.size
+        checkouts = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / checkouts if checkouts else 0.0
+        out["avg_wait"] = out["wait_time_total"] / out["waits"] if out["waits"] else 0.0
+        return out
+
+    def close_all(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._close_quietly(conn)
+            self._open -= len(self._idle)
+            self._idle = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+_write_listeners = []
+
+
+def on_table_write(callback):
+    """Register callback(table_name, inserted_df), run after every committed insert batch.
+
+    Used to keep derived state (query cache, ...) in step with the tables.
+    Returns the callback so it can be used as a decorator.
+    """
+    _write_listeners.append(callback)
+    return callback
+
+
+_prepare_hooks = []
+
+
+def before_table_write(callback):
+    """Register callback(table_name, df) -> df, applied to every frame before
+    insert_dataframe_to_table writes it (e.g. to fill in key columns).
+
+    Returns the callback so it can be used as a decorator.
+    """
+    _prepare_hooks.append(callback)
+    return callback
+
+
+def _notify_write(table_name, inserted):
+    """Run the write listeners; returns a message per listener that failed."""
+    errors = []
+    for callback in list(_write_listeners):
+        try:
+            callback(table_name, inserted)
+        except Exception as e:
+            name = getattr(callback, "__module__", "") + "." + getattr(callback, "__name__", repr(callback))
+            logger.exception("Write listener %s failed for %s", name, table_name)
+            errors.append(f"{name}: {type(e).__name__}: {e}")
+    return errors
+
+
+def notify_table_changed(table_name):
+    """Tell the write listeners about a change made outside insert_dataframe_to_table
+    (deletes, archiving); they get an empty frame of inserted rows."""
+    _notify_write(table_name, pd.DataFrame())
+
+
+on_table_write(lambda table_name, inserted: get_cache().invalidate_table(table_name))
+
+
+def run_query(query, params=None, ttl=None, name=None):
+    """Execute SQL and return a pandas DataFrame.
+
+    SELECT/WITH results are served from the process-wide query cache for
+    `ttl` seconds (default SECURECHECK_CACHE_TTL); `ttl=0` always hits the DB.
+    Each call is timed under `name` (default: the SQL head), see
+    instrumentation.py.
+    """
+    call = new_call(query_name(query, name), query, params)
+    started = time.perf_counter()
+    try:
+        cache = get_cache()
+        key = None
+        if ttl != 0 and is_cacheable(query):
+            key = cache.make_key(query, params)
+            cached = cache.get(key)
+            if cached is not None:
+                call.update(cache="hit", rows=len(cached))
+                return cached
+            call["cache"] = "miss"
+
+        mark = time.perf_counter()
+        with get_pool().connection() as conn:
+            call["checkout_ms"] = (time.perf_counter() - mark) * 1000
+            cursor = conn.cursor()
+            try:
+                mark = time.perf_counter()
+                cursor.execute(query, params or ())
+                call["execute_ms"] = (time.perf_counter() - mark) * 1000
+                mark = time.perf_counter()
+                rows = cursor.fetchall()
+                cols = [desc[0] for desc in cursor.description] if cursor.description else []
+                call["fetch_ms"] = (time.perf_counter() - mark) * 1000
+            finally:
+                cursor.close()
+            # end the implicit read transaction so the next checkout sees fresh data
+            conn.commit()
+        mark = time.perf_counter()
+        df = pd.DataFrame(rows, columns=cols)
+        call["frame_ms"] = (time.perf_counter() - mark) * 1000
+        nbytes = int(df.memory_usage(deep=True).sum())
+        call.update(rows=len(df), bytes=nbytes)
+        if key is not None:
+            cache.put(key, df, ttl=ttl, tables=tables_in(query), nbytes=nbytes)
+        return df.copy(deep=False) if key is not None else df
+    except Exception as e:
+        call["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        call["total_ms"] = (time.perf_counter() - started) * 1000
+        get_recorder().record(call)
+
+
+def insert_dataframe_to_table(df, table_name, batch_size=BULK_BATCH_SIZE, load_data=None,
+                              quarantine_path=None, on_chunk=None, before_commit=None):
+    """Bulk-insert a pandas DataFrame into a database table.
+
+    Rows go in committed chunks of `batch_size` via multi-row INSERTs (see
+    bulk_load.bulk_insert); rejected rows are quarantined rather than
+    aborting the load. before_commit(cursor, report) runs inside each
+    batch's transaction (see bulk_insert). Returns the bulk_insert report
+    dict plus `listener_errors`: one message per write listener failure
+    (the rows are committed, but derived state such as the rollup may lag).
+    """
+    if load_data is None:
+        load_data = DB_CONFIG.get("local_infile", False)
+    call = new_call(f"insert:{table_name}")
+    started = time.perf_counter()
+    try:
+        for prepare in _prepare_hooks:
+            df = prepare(table_name, df)
+        call["bytes"] = int(df.memory_usage(deep=True).sum())
+        listener_errors = []
+        with get_pool().connection() as conn:
+            call["checkout_ms"] = (time.perf_counter() - started) * 1000
+            # listeners see each batch right after its commit, so derived state
+            # stays in step even if a later batch fails
+            report = bulk_insert(conn, df, table_name, batch_size=batch_size, load_data=load_data,
+                                 quarantine_path=quarantine_path, on_chunk=on_chunk, before_commit=before_commit,
+                                 on_commit=lambda committed: listener_errors.extend(
+                                     _notify_write(table_name, committed)))
+        report["listener_errors"] = listener_errors
+        call.update(rows=report["inserted"], execute_ms=report["seconds"] * 1000, failed=report["failed"])
+        if listener_errors:
+            call["error"] = f"{len(listener_errors)} write listener failure(s): {listener_errors[0]}"
+        return report
+    except Exception as e:
+        call["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        call["total_ms"] = (time.perf_counter() - started) * 1000
+        get_recorder().record(call)
@@ -0,0 +1,237 @@
+# db_schema.py
+"""Owns the checkpost_stops DDL, its indexes, and an EXPLAIN-based advisor.
+
+    python db_schema.py migrate     # create tables (incl. rollup) / add missing columns + indexes
+    python db_schema.py advise      # EXPLAIN every dashboard query, flag full scans (MySQL)
+"""
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+
+from db import DB_BACKEND, get_pool, run_query
+from queries import (ANALYTICS_QUERIES, REPEATED_VEHICLES_SQL, TABLE, analytics_sql, build_page_sql,
+                     build_summary_sql, filter_where)
+import ingest
+import rollups
+import violations
+
+
+# column -> MySQL type; `id` gives every stop a stable key for paging/feeds
+COLUMNS = {
+    "id": "BIGINT UNSIGNED NOT NULL AUTO_INCREMENT",
+    "stop_date": "DATE",
+    "stop_time": "TIME",
+    "country_name": "VARCHAR(64)",
+    "driver_gender": "VARCHAR(16)",
+    "driver_age_raw": "VARCHAR(16)",
+    "driver_age": "SMALLINT",
+    "driver_race": "VARCHAR(32)",
+    "violation_raw": "VARCHAR(128)",
+    "violation": "VARCHAR(64)",
+    "violation_id": "SMALLINT UNSIGNED",          # -> violations.violation_id (violations.py)
+    "search_conducted": "BOOLEAN",
+    "search_type": "VARCHAR(64)",
+    "stop_outcome": "VARCHAR(32)",
+    "is_arrested": "BOOLEAN",
+    "stop_duration": "VARCHAR(32)",
+    "drugs_related_stop": "BOOLEAN",
+    "vehicle_number": "VARCHAR(32)",
+    "needs_review": "BOOLEAN",
+}
+
+# index name -> columns, each matched to the dashboard queries in queries.py.
+# InnoDB appends the primary key (id) to every secondary index, so
+# idx_stop_date_time is effectively (stop_date, stop_time, id).
+INDEXES = {
+    # date range filter + keyset paging ORDER BY stop_date, stop_time, id (see pagination.py)
+    "idx_stop_date_time": ("stop_date", "stop_time"),
+    # repeated-vehicle alert: date range, GROUP BY vehicle_number (covering)
+    "idx_date_vehicle": ("stop_date", "vehicle_number"),
+    # plate lookup, then newest first
+    "idx_vehicle_date": ("vehicle_number", "stop_date", "stop_time"),
+    # gender / search filters combined with the date range
+    "idx_gender_date": ("driver_gender", "stop_date", "stop_time"),
+    "idx_search_date": ("search_conducted", "stop_date", "stop_time"),
+    # vehicle panels: WHERE flag = 1 GROUP BY vehicle_number (covering)
+    "idx_drugs_vehicle": ("drugs_related_stop", "vehicle_number"),
+    "idx_search_vehicle": ("search_conducted", "vehicle_number"),
+    # "Violation contains" (resolved to violation ids) + keyset paging
+    "idx_violation_date": ("violation_id", "stop_date", "stop_time"),
+    # country / violation GROUP BYs read only these columns (covering)
+    "idx_country_violation_id": ("country_name", "violation_id", "is_arrested", "search_conducted",
+                                 "drugs_related_stop"),
+    "idx_violation_id_flags": ("violation_id", "search_conducted", "is_arrested", "stop_duration"),
+}
+
+# indexes of earlier schema versions, dropped by migrate()
+OBSOLETE_INDEXES = ("idx_country_violation", "idx_violation_flags")
+
+
+def create_table_sql(table=TABLE):
+    cols = ",\n  ".join(f"{name} {ddl}" for name, ddl in COLUMNS.items())
+    idx = ",\n  ".join(f"KEY {name} ({', '.join(cols_)})" for name, cols_ in INDEXES.items())
+    return (f"CREATE TABLE IF NOT EXISTS {table} (\n  {cols},\n  PRIMARY KEY (id),\n  {idx}\n)"
+            " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+
+
+# existing column / index names of a table
+if DB_BACKEND == "sqlite":
+    COLUMNS_SQL = "SELECT name FROM pragma_table_info(%s)"
+    INDEXES_SQL = "SELECT name FROM pragma_index_list(%s)"
+else:
+    COLUMNS_SQL = ("SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+    INDEXES_SQL = ("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+
+
+def _existing(cursor, sql, table):
+    cursor.execute(sql, (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(table=TABLE, verbose=True):
+    """Create the table if needed, then add any missing columns and indexes.
+
+    Every step is idempotent; returns the list of statements executed.
+    """
+    done = []
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(create_table_sql(table))
+            done.append(f"CREATE TABLE IF NOT EXISTS {table}")
+
+            columns = _existing(cursor, COLUMNS_SQL, table)
+            for name, ddl in COLUMNS.items():
+                if name in columns:
+                    continue
+                if name == "id":
+                    stmt = f"ALTER TABLE {table} ADD COLUMN id {ddl} PRIMARY KEY FIRST"
+                else:
+                    stmt = f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"
+                cursor.execute(stmt)
+                done.append(stmt)
+
+            indexes = _existing(cursor, INDEXES_SQL, table)
+            for name, cols in INDEXES.items():
+                if name not in indexes:
+                    stmt = f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(cols)})"
+                    cursor.execute(stmt)
+                    done.append(stmt)
+            for name in OBSOLETE_INDEXES:
+                if name in indexes:
+                    stmt = f"ALTER TABLE {table} DROP INDEX {name}"
+                    cursor.execute(stmt)
+                    done.append(stmt)
+
+            # rollups of earlier versions were keyed by the violation name: recomputed below
+            stale_rollup = "violation" in _existing(cursor, COLUMNS_SQL, rollups.ROLLUP_TABLE)
+            if stale_rollup:
+                stmt = f"DROP TABLE {rollups.ROLLUP_TABLE}"
+                cursor.execute(stmt)
+                done.append(stmt)
+            conn.commit()
+        finally:
+            cursor.close()
+    rollups.ensure_table()
+    done.append(f"CREATE TABLE IF NOT EXISTS {rollups.ROLLUP_TABLE}")
+    violations.ensure_table()
+    done.append(f"CREATE TABLE IF NOT EXISTS {violations.VIOLATION_TABLE}")
+    ingest.ensure_table()
+    done.append(f"CREATE TABLE IF NOT EXISTS {ingest.CHECKPOINT_TABLE}")
+    if table == TABLE:
+        filled = violations.backfill()
+        if filled:
+            done.append(f"UPDATE {table} SET violation_id ... ({filled} rows)")
+    if stale_rollup:
+        rows = rollups.rebuild()
+        done.append(f"INSERT INTO {rollups.ROLLUP_TABLE} ... ({rows} rows, keyed by violation_id)")
+    if verbose:
+        for stmt in done:
+            print(stmt)
+    return done
+
+
+def dashboard_queries():
+    """(name, sql, params) for every statement the dashboard can run."""
+    end = date.today()
+    start = end - timedelta(days=365)
+    deep_cursor = (start, timedelta(hours=12), 10 ** 6)   # any mid-table cursor will do
+    out = [
+        ("Recent stops (first page)", *build_page_sql([], [], 50)),
+        ("Recent stops (deep page)", *build_page_sql([], [], 50, after=deep_cursor)),
+        ("Repeated vehicles (30 days)", REPEATED_VEHICLES_SQL, ()),
+    ]
+    filter_cases = {
+        "Filter: date range": {},
+        "Filter: gender": {"gender": "Male"},
+        "Filter: plate": {"plate": "TN09AB1234"},
+        "Filter: search conducted": {"search_flag": "True"},
+        "Filter: violation contains": {"violation_contains": "speed"},
+    }
+    for name, kwargs in filter_cases.items():
+        conditions, params = filter_where(start, end, **kwargs)
+        sql, page_params = build_page_sql(conditions, params, 50)
+        out.append((name, sql, tuple(page_params)))
+        sql, summary_params = build_summary_sql(conditions, params)
+        out.append((name.replace("Filter:", "Summary:"), sql, tuple(summary_params)))
+    out.extend((name, analytics_sql(name), ()) for name in ANALYTICS_QUERIES)
+    return out
+
+
+def explain(sql, params=()):
+    """Run EXPLAIN for `sql` and return the plan as a DataFrame."""
+    return run_query("EXPLAIN " + sql.strip().rstrip(";"), params, ttl=0)
+
+
+def advise(queries=None):
+    """EXPLAIN each dashboard query and flag scans of real tables.
+
+    type=ALL   -> full table scan (problem)
+    type=index -> full scan of an index (cheaper, but still grows with the table)
+    Scans of the rollup table are reported separately since its size is
+    bounded by the number of distinct keys rather than stops.
+    """
+    findings = []
+    for name, sql, params in (queries or dashboard_queries()):
+        try:
+            plan = explain(sql, params)
+        except Exception as e:
+            findings.append({"query": name, "table": None, "access": "error", "key": None,
+                             "rows": None, "extra": str(e), "verdict": "EXPLAIN failed"})
+            continue
+        for _, step in plan.iterrows():
+            table = step.get("table")
+            if table is None or str(table).startswith("<"):
+                continue   # derived tables / unions are covered by their inner steps
+            access = step.get("type")
+            if access in ("ALL", "index") and table != TABLE:
+                verdict = "summary table scan"   # e.g. the rollup: bounded by key count, not stops
+            elif access == "ALL":
+                verdict = "FULL TABLE SCAN"
+            elif access == "index":
+                verdict = "full index scan"
+            else:
+                verdict = "ok"
+            findings.append({"query": name, "table": table, "access": access, "key": step.get("key"),
+                             "rows": step.get("rows"), "extra": step.get("Extra"), "verdict": verdict})
+    return pd.DataFrame(findings, columns=["query", "table", "access", "key", "rows", "extra", "verdict"])
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "advise"
+    if command == "migrate":
+        migrate()
+    elif command == "advise":
+        report = advise()
+        with pd.option_context("display.max_rows", None, "display.width", 160):
+            print(report)
+        bad = report[report["verdict"] == "FULL TABLE SCAN"]
+        if not bad.empty:
+            print(f"\n{bad['query'].nunique()} dashboard queries do a full table scan.")
+            sys.exit(1)
+    else:
+        print(__doc__)
+        sys.exit(2)
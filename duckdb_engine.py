@@ -0,0 +1,193 @@
+# duckdb_engine.py
+"""Run the analytics panels on an embedded DuckDB engine instead of MySQL.
+
+With SECURECHECK_ANALYTICS_BACKEND=duckdb the panel queries (GROUP BYs over
+every stop) are answered by DuckDB's columnar engine. DuckDB reads
+checkpost_stops from a Parquet snapshot of the MySQL table plus the cold
+archive files (archive.py), exposed as one `checkpost_stops` view, so the
+panel SQL in queries.ANALYTICS_QUERIES runs unchanged after
+sql_dialect.translate(). Inserts, paging and alerts stay on MySQL.
+
+The snapshot is rewritten from MySQL (streamed, compact archive schema)
+when it is missing, and refreshed in the background once it is older than
+SECURECHECK_DUCKDB_SYNC_SECONDS and the table has been written to since;
+until then panels are answered from the previous snapshot.
+
+    python duckdb_engine.py sync      # write the snapshot now
+"""
+import logging
+import os
+import sys
+import threading
+import time
+
+import pyarrow.parquet as pq
+
+import archive
+from db import on_table_write
+from instrumentation import get_recorder, new_call, query_name
+from queries import TABLE
+from sql_dialect import translate
+from streaming import run_query_chunks
+from violations import VIOLATION_TABLE
+
+try:
+    import duckdb
+except ImportError:       # optional
+    duckdb = None
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get("SECURECHECK_DUCKDB_SNAPSHOT", "snapshot")
+SYNC_SECONDS = float(os.environ.get("SECURECHECK_DUCKDB_SYNC_SECONDS", "300"))
+DUCKDB_THREADS = int(os.environ.get("SECURECHECK_DUCKDB_THREADS", "0"))   # 0: DuckDB's default
+
+
+def snapshot_path():
+    return os.path.join(SNAPSHOT_DIR, f"{TABLE}.parquet")
+
+
+def write_snapshot(path=None, chunk_rows=archive.ARCHIVE_CHUNK_ROWS):
+    """Stream checkpost_stops into one Parquet file (replaced atomically). Returns the row count."""
+    path = path or snapshot_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(path + ".tmp", archive.ROW_SCHEMA) as writer:
+        for chunk in run_query_chunks(f"SELECT * FROM {TABLE}", chunk_rows=chunk_rows, name="DuckDB snapshot"):
+            writer.write_table(archive.to_archive_table(chunk))
+            rows += len(chunk)
+    os.replace(path + ".tmp", path)
+    return rows
+
+
+def _quote(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+class DuckDBEngine:
+    """An in-memory DuckDB database whose checkpost_stops view reads the Parquet files."""
+
+    def __init__(self, snapshot=None):
+        if duckdb is None:
+            raise RuntimeError("SECURECHECK_ANALYTICS_BACKEND=duckdb needs the duckdb package")
+        self.snapshot = snapshot or snapshot_path()
+        self._con = duckdb.connect()
+        if DUCKDB_THREADS:
+            self._con.execute(f"SET threads = {DUCKDB_THREADS}")
+        self._lock = threading.Lock()
+        self._syncing = None
+        self._dirty = False
+        self.synced_at = None
+
+    def attach(self, cold=None):
+        """(Re)point the view at the current snapshot and the given archive dataset's files."""
+        sources = [f"SELECT * FROM read_parquet({_quote(self.snapshot)})"]
+        if cold is not None:
+            files = ", ".join(_quote(f) for f in cold.files)
+            sources.append(f"SELECT * FROM read_parquet([{files}], hive_partitioning = true, "
+                           "hive_types = {'year': SMALLINT, 'month': TINYINT, 'country_name': VARCHAR})")
+        with self._lock:
+            # year/month are partition keys, not checkpost_stops columns (and
+            # would shadow the panels' `GROUP BY year` aliases)
+            self._con.execute(f"CREATE OR REPLACE VIEW {TABLE}_files AS SELECT * EXCLUDE (year, month) FROM ("
+                              + " UNION ALL BY NAME ".join(sources) + ")")
+            # older files have no violation_id and MySQL's dictionary is not
+            # here: number the names for the panels' joins instead
+            self._con.execute(f"CREATE OR REPLACE TABLE {VIOLATION_TABLE} AS "
+                              "SELECT CAST(row_number() OVER (ORDER BY name) AS SMALLINT) AS violation_id, name "
+                              f"FROM (SELECT DISTINCT violation AS name FROM {TABLE}_files WHERE violation IS NOT NULL)")
+            columns = {row[0] for row in self._con.execute(f"DESCRIBE {TABLE}_files").fetchall()}
+            exclude = " EXCLUDE (violation_id)" if "violation_id" in columns else ""
+            self._con.execute(f"CREATE OR REPLACE VIEW {TABLE} AS SELECT s.*{exclude}, v.violation_id "
+                              f"FROM {TABLE}_files s LEFT JOIN {VIOLATION_TABLE} v ON v.name = s.violation")
+            self.synced_at = os.path.getmtime(self.snapshot)
+
+    def sync(self):
+        self._dirty = False
+        # the archive as of before the snapshot: rows archived while it is
+        # written are still in it, so nothing is counted twice
+        cold = archive.cold_dataset()
+        rows = write_snapshot(self.snapshot)
+        self.attach(cold)
+        return rows
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def _sync_in_background(self):
+        def run():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.exception("DuckDB snapshot sync failed: %s", e)
+                self._dirty = True
+        self._syncing = threading.Thread(target=run, name="duckdb-sync", daemon=True)
+        self._syncing.start()
+
+    def ensure_fresh(self):
+        """Make sure there is a snapshot; start a background refresh when it is stale."""
+        if self.synced_at is None:
+            archived = archive.cold_generation() or 0
+            if os.path.exists(self.snapshot) and os.stat(self.snapshot).st_mtime_ns > archived:
+                self.attach(archive.cold_dataset())
+            else:
+                self.sync()
+        stale = time.time() - self.synced_at > SYNC_SECONDS
+        if stale and self._dirty and (self._syncing is None or not self._syncing.is_alive()):
+            self._sync_in_background()
+
+    def run_query(self, query, params=None, name=None):
+        """Execute a MySQL-dialect statement on DuckDB -> pandas DataFrame (instrumented)."""
+        call = new_call(query_name(query, name), query, params, engine="duckdb")
+        started = time.perf_counter()
+        try:
+            self.ensure_fresh()
+            sql = translate(query, "duckdb")
+            cursor = self._con.cursor()     # one cursor per call: scheduler threads run side by side
+            try:
+                mark = time.perf_counter()
+                result = cursor.execute(sql.rstrip().rstrip(";"), list(params or ()))
+                call["execute_ms"] = (time.perf_counter() - mark) * 1000
+                mark = time.perf_counter()
+                df = result.df()
+                call["frame_ms"] = (time.perf_counter() - mark) * 1000
+            finally:
+                cursor.close()
+            call["rows"] = len(df)
+            return df
+        except Exception as e:
+            call["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            call["total_ms"] = (time.perf_counter() - started) * 1000
+            get_recorder().record(call)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide engine, attaching (or writing) the snapshot on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            engine = DuckDBEngine()
+            engine.ensure_fresh()
+            _engine = engine
+    return _engine
+
+
+@on_table_write
+def _on_stops_written(table_name, inserted):
+    if table_name.lower() == TABLE and _engine is not None:
+        _engine.mark_dirty()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "sync":
+        engine = DuckDBEngine()
+        print(f"{engine.sync():,} rows written to {engine.snapshot}")
+    else:
+        print(__doc__)
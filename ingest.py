@@ -0,0 +1,230 @@
+# ingest.py
+"""Streaming CSV -> clean -> bulk insert pipeline.
+
+The CSV is read `chunk_rows` rows at a time; each chunk is cleaned with
+data_processing.load_and_clean and inserted before the next one is read, so
+peak memory is bounded by the chunk size rather than the file size.
+
+Progress is checkpointed in the ingest_checkpoints table, written inside
+the transaction of every insert batch: a batch's rows and the checkpoint
+that counts them commit (or roll back) together. Re-running the same file
+resumes right after the last committed row, so a crash at any point
+neither skips nor duplicates rows.
+"""
+import hashlib
+import os
+import time
+
+import pandas as pd
+
+from bulk_load import BULK_BATCH_SIZE
+from data_processing import load_and_clean
+from db import get_pool, insert_dataframe_to_table, run_query
+import rollups  # noqa: F401  (keeps checkpost_stops_daily in step with inserts)
+import violations  # noqa: F401  (fills checkpost_stops.violation_id on insert)
+
+
+INGEST_CHUNK_ROWS = int(os.environ.get("SECURECHECK_INGEST_CHUNK_ROWS", "50000"))
+CHECKPOINT_TABLE = "ingest_checkpoints"
+
+CHECKPOINT_DDL = f"""
+CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+  checkpoint_key CHAR(16) NOT NULL,
+  source VARCHAR(512) NOT NULL,
+  table_name VARCHAR(64) NOT NULL,
+  rows_done BIGINT NOT NULL DEFAULT 0,
+  rows_inserted BIGINT NOT NULL DEFAULT 0,
+  rows_failed BIGINT NOT NULL DEFAULT 0,
+  finished BOOLEAN NOT NULL DEFAULT FALSE,
+  PRIMARY KEY (checkpoint_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+SAVE_CHECKPOINT_SQL = (
+    f"INSERT INTO {CHECKPOINT_TABLE} (checkpoint_key, source, table_name, rows_done, rows_inserted, "
+    "rows_failed, finished) VALUES (%s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE "
+    "rows_done = VALUES(rows_done), rows_inserted = VALUES(rows_inserted), "
+    "rows_failed = VALUES(rows_failed), finished = VALUES(finished)"
+)
+LOAD_CHECKPOINT_SQL = (f"SELECT source, table_name, rows_done, rows_inserted, rows_failed, finished "
+                       f"FROM {CHECKPOINT_TABLE} WHERE checkpoint_key = %s")
+
+
+def _source_id(source):
+    """Stable identity for a path or uploaded file (name + size + first 64KB)."""
+    if isinstance(source, (str, os.PathLike)):
+        path = os.path.abspath(source)
+        with open(path, "rb") as fh:
+            head = fh.read(65536)
+        name, size = path, os.path.getsize(path)
+    else:
+        pos = source.tell()
+        source.seek(0)
+        head = source.read(65536)
+        source.seek(0, os.SEEK_END)
+        size = source.tell()
+        source.seek(pos)
+        name = getattr(source, "name", "upload")
+    digest = hashlib.sha1(head).hexdigest()
+    return f"{name}|{size}|{digest}", size
+
+
+def _checkpoint_key(source_key, table_name):
+    return hashlib.sha1(f"{source_key}|{table_name}".encode("utf-8")).hexdigest()[:16]
+
+
+def ensure_table():
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(CHECKPOINT_DDL)
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+def load_checkpoint(key):
+    """The stored progress for a checkpoint key, or None."""
+    rows = run_query(LOAD_CHECKPOINT_SQL, (key,), ttl=0, name="Ingest checkpoint")
+    if rows.empty:
+        return None
+    row = rows.iloc[0]
+    return {"source": row["source"], "table": row["table_name"], "rows_done": int(row["rows_done"]),
+            "rows_inserted": int(row["rows_inserted"]), "rows_failed": int(row["rows_failed"]),
+            "finished": bool(row["finished"])}
+
+
+def _save_checkpoint(cursor, key, state):
+    """Write `state` through `cursor`; it is committed with that cursor's transaction."""
+    cursor.execute(SAVE_CHECKPOINT_SQL, (key, state["source"], state["table"], state["rows_done"],
+                                         state["rows_inserted"], state["rows_failed"], bool(state["finished"])))
+
+
+def _save_checkpoint_now(key, state):
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            _save_checkpoint(cursor, key, state)
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+def dry_run(source, table_name, chunk_rows=INGEST_CHUNK_ROWS, resume=True, clean=True):
+    """Read and clean a CSV the way stream_csv_to_table would, inserting nothing.
+
+    Returns a dict of rows (data rows in the file), rows_to_insert (after
+    the checkpoint), resume_from, finished (already fully loaded),
+    needs_review (rows with neither date nor time), bad_dates and columns.
+    """
+    source_key, _ = _source_id(source)
+    ensure_table()
+    state = load_checkpoint(_checkpoint_key(source_key, table_name)) if resume else None
+    if not state or state.get("source") != source_key:
+        state = {"rows_done": 0, "finished": False}
+    report = {"rows": 0, "rows_to_insert": 0, "resume_from": state["rows_done"],
+              "finished": bool(state.get("finished")), "needs_review": 0, "bad_dates": 0, "columns": []}
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        start = report["rows"]
+        report["rows"] += len(chunk)
+        if report["finished"] or report["rows"] <= state["rows_done"]:
+            continue
+        chunk = chunk.iloc[max(state["rows_done"] - start, 0):]
+        report["rows_to_insert"] += len(chunk)
+        if clean:
+            chunk = load_and_clean(chunk)
+            if "needs_review" in chunk.columns:
+                report["needs_review"] += int(chunk["needs_review"].sum())
+            if "stop_date" in chunk.columns:
+                report["bad_dates"] += int(chunk["stop_date"].isna().sum())
+        report["columns"] = list(chunk.columns)
+    return report
+
+
+def stream_csv_to_table(source, table_name, chunk_rows=INGEST_CHUNK_ROWS, batch_size=BULK_BATCH_SIZE,
+                        resume=True, clean=True, on_progress=None, quarantine_path=None):
+    """Stream a CSV (path or binary file-like) into `table_name` chunk by chunk.
+
+    on_progress(progress) is called after every committed batch with a dict
+    of rows_done, rows_inserted, rows_failed, rows_per_sec, fraction (by
+    bytes read, 0..1 or None) and eta_seconds.
+
+    Returns the final progress dict, plus `resumed_from` (rows skipped).
+    """
+    source_key, total_bytes = _source_id(source)
+    ckpt_key = _checkpoint_key(source_key, table_name)
+    ensure_table()
+    state = load_checkpoint(ckpt_key) if resume else None
+    if not state or state.get("source") != source_key:
+        state = {"source": source_key, "table": table_name, "rows_done": 0,
+                 "rows_inserted": 0, "rows_failed": 0, "finished": False}
+    if state.get("finished"):
+        # a completed file is not re-inserted unless the checkpoint is removed
+        return {"rows_done": state["rows_done"], "rows_inserted": state["rows_inserted"],
+                "rows_failed": state["rows_failed"], "rows_per_sec": 0.0, "fraction": 1.0,
+                "eta_seconds": None, "resumed_from": state["rows_done"], "checkpoint": ckpt_key}
+    skip = state["rows_done"]
+    resumed_from = skip
+
+    own_handle = isinstance(source, (str, os.PathLike))
+    fh = open(source, "rb") if own_handle else source
+    if not own_handle:
+        fh.seek(0)
+    started = time.perf_counter()
+    progress = {}
+
+    def report(rows_done, inserted, failed, bytes_pos):
+        elapsed = time.perf_counter() - started
+        rate = (rows_done - resumed_from) / elapsed if elapsed > 0 else 0.0
+        fraction = min(bytes_pos / total_bytes, 1.0) if total_bytes else None
+        eta = None
+        if fraction and 0 < fraction < 1 and elapsed > 0:
+            eta = elapsed * (1 - fraction) / fraction
+        progress.update(rows_done=rows_done, rows_inserted=inserted,
+                        rows_failed=failed, rows_per_sec=rate,
+                        fraction=fraction, eta_seconds=eta)
+        if on_progress is not None:
+            on_progress(dict(progress))
+
+    try:
+        reader = pd.read_csv(
+            fh, chunksize=chunk_rows,
+            # skip already-committed data rows (row 0 is the header)
+            skiprows=(lambda i: 0 < i <= skip) if skip else None,
+        )
+        for chunk in reader:
+            base = state["rows_done"]
+            n = len(chunk)
+            if clean:
+                chunk = load_and_clean(chunk)
+            chunk.index = pd.RangeIndex(base, base + n)  # file row numbers for quarantine output
+
+            def progress_after(batch_report, base=base, n=n):
+                return {**state, "rows_done": base + min(batch_report["chunks"] * batch_size, n),
+                        "rows_inserted": state["rows_inserted"] + batch_report["inserted"],
+                        "rows_failed": state["rows_failed"] + batch_report["failed"]}
+
+            def checkpoint(cursor, batch_report):
+                # in the batch's own transaction: rows and checkpoint commit together
+                _save_checkpoint(cursor, ckpt_key, progress_after(batch_report))
+
+            def on_batch(batch_report):
+                done = progress_after(batch_report)
+                report(done["rows_done"], done["rows_inserted"], done["rows_failed"], fh.tell())
+
+            result = insert_dataframe_to_table(chunk, table_name, batch_size=batch_size,
+                                               quarantine_path=quarantine_path, on_chunk=on_batch,
+                                               before_commit=checkpoint)
+            state["rows_done"] = base + n
+            state["rows_inserted"] += result["inserted"]
+            state["rows_failed"] += result["failed"]
+        state["finished"] = True
+        _save_checkpoint_now(ckpt_key, state)
+    finally:
+        if own_handle:
+            fh.close()
+
+    report(state["rows_done"], state["rows_inserted"], state["rows_failed"], total_bytes)
+    progress["resumed_from"] = resumed_from
+    progress["checkpoint"] = ckpt_key
+    return progress
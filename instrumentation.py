@@ -0,0 +1,202 @@
+# instrumentation.py
+"""Per-call timings for run_query / insert_dataframe_to_table.
+
+Every call is recorded with a latency breakdown (connection checkout,
+execute, fetch, DataFrame build), row count and result size. Per query
+name the last SECURECHECK_STATS_WINDOW latencies are kept for rolling
+p50/p95/p99. Calls slower than SECURECHECK_SLOW_QUERY_MS are logged with
+their EXPLAIN plan, captured on a background thread so the slow caller is
+not delayed further. There is one such thread with a short queue, and a
+query name is explained at most once every SECURECHECK_EXPLAIN_INTERVAL
+seconds: when the database itself is slow, a rerun's slow panels must not
+each take a pooled connection for an EXPLAIN. Calls that are not
+explained are still logged, with the reason in plan_error.
+
+Everything lives in process memory; export() / export_json() dump it for
+offline analysis (the dashboard's Diagnostics page offers the download).
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from query_cache import is_cacheable, normalize_sql
+
+
+logger = logging.getLogger(__name__)
+
+STATS_WINDOW = int(os.environ.get("SECURECHECK_STATS_WINDOW", "500"))
+SLOW_QUERY_MS = float(os.environ.get("SECURECHECK_SLOW_QUERY_MS", "500"))
+EXPLAIN_INTERVAL = float(os.environ.get("SECURECHECK_EXPLAIN_INTERVAL", "300"))
+EXPLAIN_QUEUE_SIZE = 8
+RECENT_CALLS = 1000
+SLOW_LOG_SIZE = 100
+
+
+def query_name(sql, name=None):
+    """Name calls are grouped under: the caller's name, else the SQL head."""
+    if name:
+        return name
+    head = normalize_sql(sql)
+    return head if len(head) <= 80 else head[:77] + "..."
+
+
+def new_call(name, sql=None, params=None, engine="db"):
+    """Empty call record for Recorder.record; callers fill in the timings."""
+    return {"name": name, "at": time.time(), "engine": engine, "sql": sql,
+            "params": repr(params) if params else None, "raw_params": params,
+            "cache": "bypass", "rows": None, "bytes": None, "error": None,
+            "checkout_ms": 0.0, "execute_ms": 0.0, "fetch_ms": 0.0, "frame_ms": 0.0}
+
+
+class Recorder:
+    """Thread-safe store of recent calls, rolling latencies and the slow log."""
+
+    def __init__(self, window=STATS_WINDOW, slow_ms=SLOW_QUERY_MS, explain_interval=EXPLAIN_INTERVAL):
+        self.window = window
+        self.slow_ms = slow_ms
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._latencies = {}            # name -> deque of total ms
+        self._totals = {}               # name -> {"calls", "errors", "rows", "bytes", "cache_hits"}
+        self._recent = deque(maxlen=RECENT_CALLS)
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._explained = {}            # name -> time.monotonic() its last plan was queued
+        self._plans = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+        self._worker = None
+
+    def record(self, call):
+        """Store one call dict (see db.run_query for the fields)."""
+        name = call["name"]
+        with self._lock:
+            self._latencies.setdefault(name, deque(maxlen=self.window)).append(call["total_ms"])
+            totals = self._totals.setdefault(name, {"calls": 0, "errors": 0, "rows": 0, "bytes": 0,
+                                                    "cache_hits": 0})
+            totals["calls"] += 1
+            totals["errors"] += call.get("error") is not None
+            totals["rows"] += call.get("rows") or 0
+            totals["bytes"] += call.get("bytes") or 0
+            totals["cache_hits"] += call.get("cache") == "hit"
+            self._recent.append(call)
+        if (call["total_ms"] >= self.slow_ms and call.get("error") is None
+                and call.get("cache") != "hit" and call.get("sql") and is_cacheable(call["sql"])):
+            self._slow_call(call)
+
+    def _slow_call(self, call):
+        """Queue the call for an EXPLAIN, or log it straight away without one."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(call["name"])
+            if last is not None and now - last < self.explain_interval:
+                skipped = f"explained {now - last:.0f} s ago"
+            else:
+                try:
+                    self._plans.put_nowait(call)
+                except queue.Full:
+                    skipped = "EXPLAIN queue full"
+                else:
+                    self._explained[call["name"]] = now
+                    if self._worker is None:
+                        self._worker = threading.Thread(target=self._explain_loop, daemon=True,
+                                                        name="securecheck-explain")
+                        self._worker.start()
+                    return
+        self._log_slow(call, skipped)
+
+    def _explain_loop(self):
+        while True:
+            self._log_slow(self._plans.get())
+
+    def _log_slow(self, call, skipped=None):
+        entry = {"name": call["name"], "at": call["at"], "total_ms": call["total_ms"],
+                 "sql": call["sql"], "params": call.get("params"), "plan": None, "plan_error": skipped}
+        if skipped is None:
+            try:
+                if call.get("engine", "db") != "db":
+                    raise ValueError(f"no EXPLAIN for {call['engine']} queries")
+                entry["plan"] = explain_plan(call["sql"], call.get("raw_params"))
+            except Exception as e:
+                entry["plan_error"] = str(e)
+        logger.warning("Slow query %r: %.0f ms", call["name"], call["total_ms"])
+        with self._lock:
+            self._slow.append(entry)
+
+    def percentiles(self):
+        """{name: {calls, errors, p50, p95, p99, mean, max (ms), rows, bytes, cache_hits}}."""
+        with self._lock:
+            snapshot = {name: (np.array(lat, dtype=float), dict(self._totals[name]))
+                        for name, lat in self._latencies.items()}
+        out = {}
+        for name, (lat, totals) in snapshot.items():
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if len(lat) else (np.nan,) * 3
+            out[name] = {**totals, "p50": float(p50), "p95": float(p95), "p99": float(p99),
+                         "mean": float(lat.mean()) if len(lat) else np.nan,
+                         "max": float(lat.max()) if len(lat) else np.nan}
+        return out
+
+    def recent(self, errors_only=False):
+        with self._lock:
+            calls = list(self._recent)
+        if errors_only:
+            calls = [c for c in calls if c.get("error") is not None]
+        return [{k: v for k, v in c.items() if k != "raw_params"} for c in calls]
+
+    def slow_log(self):
+        with self._lock:
+            return list(self._slow)
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._totals.clear()
+            self._recent.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+
+def explain_plan(sql, params=None):
+    """EXPLAIN `sql` on a pooled connection -> list of plan row dicts."""
+    from db import get_pool
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("EXPLAIN " + sql.strip().rstrip(";"), params or ())
+            cols = [d[0] for d in cursor.description]
+            rows = [dict(zip(cols, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+        conn.commit()
+    return rows
+
+
+_recorder = Recorder()
+
+
+def get_recorder():
+    return _recorder
+
+
+def export(recorder=None):
+    """Everything recorded so far as a JSON-serialisable dict."""
+    recorder = recorder or _recorder
+    return {
+        "generated_at": time.time(),
+        "slow_query_ms": recorder.slow_ms,
+        "queries": recorder.percentiles(),
+        "recent": recorder.recent(),
+        "slow": recorder.slow_log(),
+    }
+
+
+def export_json(path=None, recorder=None):
+    """Serialise export(); also written to `path` when given."""
+    text = json.dumps(export(recorder), default=str, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    return text
@@ -0,0 +1,101 @@
+# pagination.py
+"""Keyset (cursor) pagination for the Recent Stops table.
+
+A page is addressed by the (stop_date, stop_time, id) of its first and last
+rows instead of an OFFSET, so page 1 and page 10,000 both cost one seek on
+idx_stop_date_time. The total shown next to the pager is an estimate taken
+from table statistics / the optimizer, never a COUNT(*).
+"""
+import logging
+import os
+
+import pandas as pd
+
+from arrow_fetch import run_query_arrow
+from db import DB_BACKEND, run_query
+from queries import PAGE_KEY, TABLE, build_page_sql
+
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = int(os.environ.get("SECURECHECK_PAGE_SIZE", "50"))
+# SELECT * pages go through the Arrow fetch path (see arrow_fetch.py)
+ARROW_PAGES = os.environ.get("SECURECHECK_ARROW_PAGES", "1") == "1"
+
+
+def cursor_of(row):
+    """(stop_date, stop_time, id) of a result row, as plain Python values."""
+    values = []
+    for col in PAGE_KEY:
+        value = row[col]
+        if pd.isna(value):
+            value = None
+        elif isinstance(value, pd.Timedelta):   # TIME columns; pymysql can't bind these
+            value = value.to_pytimedelta()
+        elif isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        elif hasattr(value, "item"):            # numpy scalar -> int
+            value = value.item()
+        values.append(value)
+    return tuple(values)
+
+
+def fetch_page(conditions, params, page_size=PAGE_SIZE, after=None, before=None):
+    """Fetch one page, newest first.
+
+    Pass `after` (last cursor of the current page) for the next page or
+    `before` (its first cursor) for the previous one. Returns a dict with
+    rows (DataFrame), first / last cursors, has_next and has_prev.
+    """
+    sql, sql_params = build_page_sql(conditions, params, page_size, after=after, before=before)
+    fetch = run_query_arrow if ARROW_PAGES else run_query
+    df = fetch(sql, tuple(sql_params), name="Recent stops page")
+    more = len(df) > page_size
+    df = df.iloc[:page_size]
+    if before is not None:
+        if df.empty:
+            # nothing newer any more (rows were deleted) -> back to the top
+            return fetch_page(conditions, params, page_size)
+        df = df.iloc[::-1]
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = after is not None, more
+    df = df.reset_index(drop=True)
+    return {
+        "rows": df,
+        "first": cursor_of(df.iloc[0]) if len(df) else None,
+        "last": cursor_of(df.iloc[-1]) if len(df) else None,
+        "has_next": has_next,
+        "has_prev": has_prev,
+    }
+
+
+def approx_count(conditions, params):
+    """Estimated number of matching stops (None if the server gives no estimate).
+
+    Unfiltered: InnoDB's TABLE_ROWS statistic. Filtered: the optimizer's
+    rows x filtered% from EXPLAIN. Both are metadata reads, so the cost does
+    not depend on the table size; expect the usual InnoDB error (~10-40%).
+    SQLite keeps no such statistics, so there the count is exact.
+    """
+    try:
+        if DB_BACKEND == "sqlite":
+            where = " WHERE " + " AND ".join(conditions) if conditions else ""
+            counted = run_query(f"SELECT COUNT(*) AS n FROM {TABLE}{where}", tuple(params), name="Row estimate")
+            return int(counted.iloc[0, 0])
+        if not conditions:
+            stats = run_query("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                              "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (TABLE,),
+                              name="Row estimate")
+            return int(stats.iloc[0, 0]) if len(stats) and stats.iloc[0, 0] is not None else None
+        plan = run_query(f"EXPLAIN SELECT id FROM {TABLE} WHERE " + " AND ".join(conditions),
+                         tuple(params), ttl=0, name="Row estimate")
+    except Exception as e:
+        logger.warning("Row estimate failed: %s", e)
+        return None
+    plan = plan[plan["table"] == TABLE]
+    if plan.empty or plan.iloc[0]["rows"] is None:
+        return None
+    filtered = plan.iloc[0].get("filtered")
+    filtered = 100.0 if filtered is None else float(filtered)
+    return int(float(plan.iloc[0]["rows"]) * filtered / 100.0)
@@ -0,0 +1,178 @@
+# panels.py
+"""Registry of the Advanced SQL Analytics panels and their memoized results.
+
+Each tab lists its panels (label from queries.ANALYTICS_QUERIES, heading and
+how to draw it). The dashboard only loads the panel that is currently
+selected in the open tab; results are memoized per panel until
+checkpost_stops is written to (or the user asks for a refresh). Writes
+from other processes (securecheck.py ingest, another dashboard) are
+noticed through MAX(id), checked every SECURECHECK_PANEL_CHECK seconds;
+deletes made elsewhere show once the memo entry is PANEL_TTL old. Once stops
+have been archived, panels over the raw table merge the hot table with the
+cold Parquet tier (archive.py). With SECURECHECK_ANALYTICS_BACKEND=duckdb
+every panel runs its raw-table SQL on DuckDB instead (duckdb_engine.py).
+"""
+import os
+import threading
+import time
+
+import pandas as pd
+
+import archive
+import duckdb_engine
+from db import on_table_write, run_query
+from query_cache import get_cache
+from queries import ANALYTICS_BACKEND, ANALYTICS_QUERIES, TABLE, analytics_sql
+import rollups  # its listener must run before the version bump below
+
+
+PANEL_TTL = 300
+PANEL_CHECK_SECONDS = float(os.environ.get("SECURECHECK_PANEL_CHECK", "5"))
+
+
+class Panel:
+    """One analytics query and how to draw it (optional bar chart, then table).
+
+    stream=True marks panels whose result can be large: they are read in
+    chunks (streaming.run_query_chunks) instead of loaded and memoized.
+    """
+
+    def __init__(self, label, title, chart=None, table=True, stream=False):
+        self.label = label
+        self.title = title
+        self.chart = chart          # (x, y) columns for st.bar_chart, or None
+        self.table = table
+        self.stream = stream
+
+
+class AnalyticsTab:
+    def __init__(self, key, name, heading, panels):
+        self.key = key              # session_state key of the tab's selectbox
+        self.name = name
+        self.heading = heading
+        self.panels = panels
+
+    def labels(self):
+        return [p.label for p in self.panels]
+
+
+TABS = [
+    AnalyticsTab("vehicle_q", "🚗 Vehicle-Based", "Vehicle-Based Analytics", [
+        Panel("Top 10 vehicles in drug-related stops", "🚗 Top 10 Drug-Related Vehicle Plates"),
+        Panel("Vehicles most frequently searched", "🚓 Vehicles Most Frequently Searched"),
+    ]),
+    AnalyticsTab("demo_q", "🧑 Demographic-Based", "Demographic-Based Analytics", [
+        Panel("Age group with highest arrest rate", "🧑 Age Group with Highest Arrest Rate",
+              chart=("age_group", "arrest_rate_pct")),
+        Panel("Gender distribution per country", "🧍 Gender Distribution by Country"),
+        Panel("Race + Gender with highest search rate", "🧑 Race × Gender Search Rate"),
+    ]),
+    AnalyticsTab("time_q", "⏱ Time & Duration Based", "Time & Duration Based Analytics", [
+        Panel("Hour of day with most stops", "🕒 Traffic Stops by Hour of Day",
+              chart=("hour_of_day", "stops"), table=False),
+        Panel("Average stop duration per violation", "⏱ Avg Stop Duration by Violation"),
+        Panel("Are night stops more likely to lead to arrests?", "🌙 Night Arrest Probability",
+              chart=("period", "arrest_rate_pct")),
+    ]),
+    AnalyticsTab("violation_q", "⚖️ Violation-Based", "Violation-Based Analytics", [
+        Panel("Violations linked to searches/arrests", "⚖️ Search & Arrest Rates by Violation"),
+        Panel("Violations common among <25 drivers", "👦 Violations Among Drivers <25"),
+        Panel("Violations with almost no searches/arrests", "🟢 Safe Violations (Rarely lead to search/arrest)"),
+    ]),
+    AnalyticsTab("location_q", "🌍 Location-Based", "Location-Based Analytics", [
+        Panel("Countries with highest drug-related stops", "🌍 Drug-Related Stop Rates by Country"),
+        Panel("Arrest rate by country and violation", "⚖️ Arrest Rate by Country & Violation"),
+        Panel("Countries with most searches", "🔍 Search Volume by Country"),
+    ]),
+    AnalyticsTab("complex_q", "🔬 Complex Analytics", "Complex Analytics", [
+        Panel("Yearly stops & arrests by country", "📅 Yearly Stops & Arrests by Country"),
+        Panel("Violation trends by age & race", "📈 Violation Trends (Age × Race)", stream=True),
+        Panel("Time period analysis (Year/Month/Hour)", "⏱ Time Period Analysis", stream=True),
+        Panel("High search/arrest rate violations", "🔥 High Search/Arrest Rate Violations"),
+        Panel("Driver demographics by country", "👥 Driver Demographics by Country"),
+        Panel("Top 5 violations by arrest rate", "🚨 Top 5 High-Arrest Violations"),
+    ]),
+]
+
+PANELS = {p.label: p for tab in TABS for p in tab.panels}
+
+
+def tab_named(name):
+    return next((t for t in TABS if t.name == name), TABS[0])
+
+
+def streams(label):
+    """Read this panel in chunks? Only on MySQL, and not when it is merged with the archive."""
+    return PANELS[label].stream and ANALYTICS_BACKEND == "mysql" and not archive.serves(label)
+
+
+# ---- memoized results ------------------------------------------------
+_version = 0
+_memo = {}                  # label -> (data version, loaded at, DataFrame)
+_memo_lock = threading.Lock()
+_mark = None                # MAX(checkpost_stops.id) when last checked
+_checked_at = None
+
+MARK_SQL = f"SELECT MAX(id) AS top FROM {TABLE}"
+
+
+def data_version():
+    return _version
+
+
+def _invalidate():
+    global _version
+    with _memo_lock:
+        _version += 1
+        _memo.clear()
+
+
+@on_table_write
+def _bump_version(table_name, inserted):
+    if table_name.lower() == TABLE:
+        _invalidate()
+
+
+def _check_mark():
+    """Invalidate when another process has added stops (MAX(id) moved)."""
+    global _mark, _checked_at
+    now = time.monotonic()
+    with _memo_lock:
+        if _checked_at is not None and now - _checked_at < PANEL_CHECK_SECONDS:
+            return
+        _checked_at = now
+    top = run_query(MARK_SQL, ttl=0, name="Panel data mark")["top"].iloc[0]
+    top = None if pd.isna(top) else int(top)
+    with _memo_lock:
+        moved, _mark = _mark is not None and top != _mark, top
+    if moved:
+        # their write listeners ran in the other process: drop our cached reads too
+        get_cache().invalidate_table(TABLE)
+        get_cache().invalidate_table(rollups.ROLLUP_TABLE)
+        _invalidate()
+
+
+def load_panel(label, refresh=False):
+    """Result DataFrame for a panel, reused until checkpost_stops changes.
+
+    refresh=True bypasses both the memo and the query cache.
+    """
+    _check_mark()
+    with _memo_lock:
+        version = _version
+        hit = _memo.get(label)
+    if (hit is not None and hit[0] == version and time.monotonic() - hit[1] < PANEL_TTL
+            and not refresh):
+        return hit[2].copy(deep=False)
+    ttl = 0 if refresh else PANEL_TTL
+    if ANALYTICS_BACKEND == "duckdb":
+        # the snapshot already covers both tiers and has no rollup table
+        df = duckdb_engine.get_engine().run_query(ANALYTICS_QUERIES[label], name=label)
+    elif archive.serves(label):
+        df = archive.load_merged(label, ttl=ttl)
+    else:
+        df = run_query(analytics_sql(label), ttl=ttl, name=label)
+    with _memo_lock:
+        if _version == version:      # drop results that raced with a write
+            _memo[label] = (version, time.monotonic(), df)
+    return df.copy(deep=False)
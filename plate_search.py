@@ -0,0 +1,297 @@
+# plate_search.py
+"""In-memory trigram index for partial / misread vehicle plates.
+
+The "Vehicle plate" filter is an exact `vehicle_number = %s` lookup; an
+officer with "TN09?B12" or half a plate needs the candidates first. The
+index holds every distinct plate once (stops and last stop date alongside)
+and, for each trigram of the plate, a sorted array of plate ids. Plates
+are matched on their normalised form (upper case, letters and digits
+only) padded as "^PLATE$", so "^TN" grams anchor prefixes.
+
+search(query) returns, ranked exact > prefix > substring > edit distance 1
+and then by number of stops:
+
+    prefix / substring   intersect the postings of the query's grams
+    edit distance 1      one edit removes at most 3 of the query's padded
+                         grams, so every match contains one of any 4 of
+                         them: candidates come from the 4 rarest,
+                         keeping plates of a near length that share
+                         all but 3 grams
+    "?" in the query     matches any one character (its grams are skipped;
+                         with fewer than 4 grams left the edit-distance
+                         pass scans the plates of a near length)
+    no trigram at all    a query like "A1" or "?09?B": the other passes
+                         scan every plate
+
+Candidates are always verified against the plate, so the grams only
+narrow the search. The index is loaded from checkpost_stops on first use
+(one GROUP BY over idx_vehicle_date), recording the highest stop id read.
+get_plate_index() then folds in the stops with `id` above that mark, at
+most every SECURECHECK_PLATE_CHECK seconds, whichever process inserted
+them (this dashboard, securecheck.py ingest / backfill, another
+dashboard); inserts made here skip the wait. Deletes and archiving
+(db.notify_table_changed) make the next call reload.
+"""
+import os
+import re
+import threading
+import time
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from db import on_table_write, run_query
+from queries import TABLE
+from streaming import run_query_chunks
+
+
+PLATE_SEARCH_LIMIT = int(os.environ.get("SECURECHECK_PLATE_SEARCH_LIMIT", "20"))
+PLATE_CHECK_SECONDS = float(os.environ.get("SECURECHECK_PLATE_CHECK", "5"))
+WILDCARD = "?"
+MATCH_RANK = {"exact": 0, "prefix": 1, "substring": 2, "fuzzy": 3}
+
+MAX_ID_SQL = f"SELECT MAX(id) AS top FROM {TABLE}"
+
+# per-plate counts for the stops with low < id <= high
+LOAD_SQL = f"""
+SELECT vehicle_number, COUNT(*) AS cnt, MAX(stop_date) AS last_seen
+FROM {TABLE}
+WHERE id > %s AND id <= %s
+  AND vehicle_number IS NOT NULL AND vehicle_number <> ''
+GROUP BY vehicle_number
+"""
+
+_STRIP = re.compile(r"[^0-9A-Z]")
+_STRIP_QUERY = re.compile(r"[^0-9A-Z?]")
+
+
+def normalize(plate):
+    """'tn-09 ab 1234' -> 'TN09AB1234'."""
+    return _STRIP.sub("", str(plate).upper())
+
+
+def _grams(padded):
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _usable(grams):
+    return [g for g in grams if WILDCARD not in g]
+
+
+def _same(q, c):
+    return q == c or q == WILDCARD
+
+
+def _matched(a, b):
+    """Length of the common prefix of a and b, WILDCARD in `a` matching anything."""
+    n = 0
+    for qa, cb in zip(a, b):
+        if not _same(qa, cb):
+            break
+        n += 1
+    return n
+
+
+def _within_one(q, key):
+    """Levenshtein distance(q, key) <= 1, WILDCARD in `q` matching any character.
+
+    With P / S the matched prefix / suffix lengths and m the shorter length:
+    one substitution leaves P + S >= m - 1, one insertion or deletion P + S >= m.
+    """
+    m = min(len(q), len(key))
+    if abs(len(q) - len(key)) > 1:
+        return False
+    prefix = _matched(q, key)
+    if prefix == len(q) == len(key):
+        return True
+    suffix = _matched(q[::-1], key[::-1])
+    return prefix + suffix >= (m - 1 if len(q) == len(key) else m)
+
+
+def _intersect(postings):
+    """Ids present in every sorted id array (probes the shortest into the others)."""
+    postings = sorted(postings, key=len)
+    ids = np.array(postings[0])
+    for other in postings[1:]:
+        if not len(ids):
+            break
+        pos = np.minimum(np.searchsorted(other, ids), len(other) - 1)
+        ids = ids[other[pos] == ids]
+    return ids
+
+
+class PlateIndex:
+    """Distinct plates with their stop counts, searchable by trigram."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plates = []                 # id -> plate as stored
+        self._keys = []                   # id -> normalised plate
+        self._ids = {}                    # plate -> id
+        self._stops = array("q")          # id -> number of stops
+        self._lengths = array("h")        # id -> len(normalised plate)
+        self._last_seen = []              # id -> latest stop_date
+        self._postings = {}               # trigram -> array("i") of ids, ascending
+        self.high_water = None            # highest checkpost_stops.id folded in
+        self.checked_at = None            # time.monotonic() of the last MAX(id) probe
+        self.stale = False
+
+    def __len__(self):
+        return len(self._plates)
+
+    # ---- writes ------------------------------------------------------
+    def add(self, counts):
+        """Fold {plate: (stops, last_seen)} into the index."""
+        with self._lock:
+            for plate, (n, last_seen) in counts.items():
+                pid = self._ids.get(plate)
+                if pid is None:
+                    key = normalize(plate)
+                    if not key:
+                        continue
+                    pid = len(self._plates)
+                    self._ids[plate] = pid
+                    self._plates.append(plate)
+                    self._keys.append(key)
+                    self._stops.append(0)
+                    self._lengths.append(len(key))
+                    self._last_seen.append(None)
+                    for gram in _grams(f"^{key}$"):
+                        self._postings.setdefault(gram, array("i")).append(pid)
+                self._stops[pid] += int(n)
+                seen = self._last_seen[pid]
+                if last_seen is not None and (seen is None or last_seen > seen):
+                    self._last_seen[pid] = last_seen
+
+    def add_frame(self, df):
+        """Fold (vehicle_number, cnt, last_seen) rows, as read by LOAD_SQL."""
+        last = pd.to_datetime(df["last_seen"], errors="coerce").dt.date
+        self.add({str(p): (n, None if pd.isna(d) else d)
+                  for p, n, d in zip(df["vehicle_number"], df["cnt"], last)})
+
+    @staticmethod
+    def _max_id():
+        top = run_query(MAX_ID_SQL, ttl=0, name="Plate index mark")["top"].iloc[0]
+        return 0 if pd.isna(top) else int(top)
+
+    def _read(self, low, high, name):
+        for chunk in run_query_chunks(LOAD_SQL, (low, high), chunk_rows=100_000, name=name):
+            self.add_frame(chunk)
+
+    def load(self):
+        """Read every distinct plate from checkpost_stops (streamed). Returns the plate count."""
+        top = self._max_id()
+        self._read(0, top, "Plate index load")
+        self.high_water = top
+        self.checked_at = time.monotonic()
+        return len(self)
+
+    def catch_up(self):
+        """Fold in the stops above the high-water mark. Returns the new high-water mark."""
+        top = self._max_id()
+        if top > self.high_water:
+            self._read(self.high_water, top, "Plate index catch-up")
+            self.high_water = top
+        self.checked_at = time.monotonic()
+        return top
+
+    # ---- reads -------------------------------------------------------
+    def _posting(self, gram):
+        ids = self._postings.get(gram)
+        return np.frombuffer(ids, dtype=np.int32) if ids else np.empty(0, dtype=np.int32)
+
+    def _candidates(self, grams):
+        """Ids whose plate has every gram (every id when there is no gram to narrow by)."""
+        grams = _usable(grams)
+        if not grams:
+            # e.g. "A1" or "?09?B": nothing to narrow by, scan (candidates are verified)
+            return np.arange(len(self._plates))
+        return _intersect([self._posting(g) for g in grams])
+
+    def _fuzzy_candidates(self, q):
+        grams = _usable(_grams(f"^{q}$"))
+        lengths = np.frombuffer(self._lengths, dtype=np.int16)
+        if len(grams) < 4:
+            # too few grams to rule anything out (short or mostly "?"): scan
+            return np.flatnonzero(np.abs(lengths - len(q)) <= 1)
+        postings = sorted((self._posting(g) for g in grams), key=len)
+        ids = np.unique(np.concatenate(postings[:4]))
+        ids = ids[np.abs(lengths[ids] - len(q)) <= 1]
+        # a match still has all but 3 of the grams
+        shared = np.zeros(len(ids), dtype=np.int16)
+        for posting in postings:
+            if not len(posting):
+                continue
+            pos = np.minimum(np.searchsorted(posting, ids), len(posting) - 1)
+            shared += posting[pos] == ids
+        return ids[shared >= len(grams) - 3]
+
+    def _ranked(self, ids, accept, limit):
+        """Up to `limit` of `ids` passing accept(key), most stops first."""
+        if not len(ids):
+            return []
+        stops = np.frombuffer(self._stops, dtype=np.int64)[ids]
+        found = []
+        for pid in ids[np.argsort(-stops, kind="stable")].tolist():
+            if accept(self._keys[pid]):
+                found.append(pid)
+                if len(found) == limit:
+                    break
+        return found
+
+    def search(self, query, limit=PLATE_SEARCH_LIMIT):
+        """Ranked plates matching `query` -> list of dicts (plate, match, stops, last_seen)."""
+        q = _STRIP_QUERY.sub("", str(query).upper())
+        if len(q.replace(WILDCARD, "")) < 2:
+            return []
+        pattern = re.compile("".join("." if c == WILDCARD else re.escape(c) for c in q))
+        best = {}
+        with self._lock:
+            searches = [
+                ("exact", self._candidates(_grams(f"^{q}$")), pattern.fullmatch),
+                ("prefix", self._candidates(_grams(f"^{q}")), pattern.match),
+                ("substring", self._candidates(_grams(q)), pattern.search),
+                ("fuzzy", self._fuzzy_candidates(q), lambda key: _within_one(q, key)),
+            ]
+            for kind, ids, accept in searches:
+                for pid in self._ranked(ids, accept, limit):
+                    best.setdefault(pid, kind)
+            hits = [{"plate": self._plates[pid], "match": kind, "stops": int(self._stops[pid]),
+                     "last_seen": self._last_seen[pid]} for pid, kind in best.items()]
+        hits.sort(key=lambda h: (MATCH_RANK[h["match"]], -h["stops"], h["plate"]))
+        return hits[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {"plates": len(self._plates), "grams": len(self._postings),
+                    "postings": sum(len(p) for p in self._postings.values())}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_plate_index():
+    """Return the process-wide index, loaded on first use and after deletes, else caught up."""
+    global _index
+    with _index_lock:
+        if _index is None or _index.stale:
+            index = PlateIndex()
+            index.load()
+            _index = index
+        elif _index.checked_at is None or time.monotonic() - _index.checked_at >= PLATE_CHECK_SECONDS:
+            _index.catch_up()
+    return _index
+
+
+@on_table_write
+def _on_stops_written(table_name, inserted):
+    # inserts are read back by id in catch_up(), whichever process made them;
+    # deletes / archiving (an empty frame) can only be redone from the table
+    if table_name.lower() != TABLE or _index is None:
+        return
+    if inserted.empty:
+        _index.stale = True
+    else:
+        _index.checked_at = None              # ours: catch up on the next call, not in 5 s
@@ -0,0 +1,659 @@
+# queries.py
+"""SQL used by the dashboard, kept in one place so tools (index advisor,
+benchmarks) can run the same statements as str_app.py."""
+import os
+
+
+TABLE = "checkpost_stops"
+
+# read the analytics panels from the checkpost_stops_daily rollup (rollups.py)
+USE_ROLLUPS = os.environ.get("SECURECHECK_USE_ROLLUPS", "1") == "1"
+# "mysql" or "duckdb" (embedded columnar engine over a Parquet snapshot, duckdb_engine.py)
+ANALYTICS_BACKEND = os.environ.get("SECURECHECK_ANALYTICS_BACKEND", "mysql")
+
+REPEATED_VEHICLES_SQL = """
+SELECT vehicle_number, COUNT(*) as cnt
+FROM checkpost_stops
+WHERE vehicle_number IS NOT NULL
+  AND vehicle_number <> ''
+  AND stop_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+GROUP BY vehicle_number
+HAVING cnt >= 2
+ORDER BY cnt DESC
+LIMIT 50;
+"""
+
+
+def filter_where(start_date=None, end_date=None, gender="All", violation_contains="", plate="",
+                 search_flag="All"):
+    """WHERE conditions for the sidebar filters -> (list of SQL conditions, params).
+
+    With no start/end date the date range is left open (the unfiltered view).
+    """
+    conditions, params = [], []
+    if start_date is not None and end_date is not None:
+        conditions.append("stop_date BETWEEN %s AND %s")
+        params.extend([start_date, end_date])
+    if gender != "All":
+        conditions.append("driver_gender = %s")
+        params.append(gender)
+    if violation_contains.strip() != "":
+        # resolved to violation ids in memory first (violations.py imports this module)
+        from violations import get_dictionary
+        ids = get_dictionary().resolve(violation_contains)
+        if ids:
+            conditions.append(f"violation_id IN ({', '.join(['%s'] * len(ids))})")
+            params.extend(ids)
+        else:
+            conditions.append("1 = 0")
+    if plate.strip() != "":
+        conditions.append("vehicle_number = %s")
+        params.append(plate.strip())
+    if search_flag in ("True", "False"):
+        conditions.append("search_conducted = %s")
+        params.append(True if search_flag == "True" else False)
+    return conditions, params
+
+
+# Recent Stops is paged on (stop_date, stop_time, id): idx_stop_date_time
+# carries id as its implicit suffix, so every page is an index seek.
+PAGE_KEY = ("stop_date", "stop_time", "id")
+
+
+def _beyond(cursor, descending):
+    """Condition for rows strictly past `cursor` in the given sort direction.
+
+    Written as expanded ORs rather than a row comparison, which MySQL can
+    turn into index ranges. NULL sorts lowest, as in MySQL's ORDER BY.
+    """
+    (col, value), rest = cursor[0], cursor[1:]
+    if not rest:                                   # id: the primary key, never NULL
+        return (f"{col} < %s" if descending else f"{col} > %s"), [value]
+    if value is None:
+        past, params = (None, []) if descending else (f"{col} IS NOT NULL", [])
+        same, same_params = f"{col} IS NULL", []
+    else:
+        past = f"({col} < %s OR {col} IS NULL)" if descending else f"{col} > %s"
+        params = [value]
+        same, same_params = f"{col} = %s", [value]
+    inner, inner_params = _beyond(rest, descending)
+    tail = f"({same} AND {inner})"
+    if past is None:
+        return tail, same_params + inner_params
+    return f"({past} OR {tail})", params + same_params + inner_params
+
+
+def build_page_sql(conditions, params, page_size, after=None, before=None):
+    """Keyset page of Recent Stops, newest first -> (sql, params).
+
+    after:   cursor (stop_date, stop_time, id) of the last row shown; returns
+             the next (older) page.
+    before:  cursor of the first row shown; returns the previous (newer)
+             page in *ascending* order, so the caller must reverse it.
+    One extra row is fetched so the caller can tell if another page exists.
+    """
+    conditions, params = list(conditions), list(params)
+    descending = before is None
+    cursor = after if after is not None else before
+    if cursor is not None:
+        cond, cond_params = _beyond(list(zip(PAGE_KEY, cursor)), descending)
+        conditions.append(cond)
+        params.extend(cond_params)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    direction = "DESC" if descending else "ASC"
+    order = ", ".join(f"{col} {direction}" for col in PAGE_KEY)
+    sql = f"SELECT * FROM {TABLE}{where} ORDER BY {order} LIMIT %s"
+    return sql, params + [int(page_size) + 1]
+
+
+def build_feed_sql(conditions, params, after_id, limit):
+    """Newest stops (by arrival, i.e. id) past `after_id` -> (sql, params); see change_feed.py."""
+    conditions, params = list(conditions), list(params)
+    if after_id is not None:
+        conditions.append("id > %s")
+        params.append(int(after_id))
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return f"SELECT * FROM {TABLE}{where} ORDER BY id DESC LIMIT %s", params + [int(limit)]
+
+
+# Prediction Summary / Key Insights / Quick Metrics over the whole filtered
+# set in one round trip; the CTE is materialized once and read by every
+# "most common" subquery.
+SUMMARY_SQL = """
+WITH f AS (
+  SELECT driver_age, driver_gender, violation_id, stop_duration, stop_outcome,
+         search_conducted, is_arrested, drugs_related_stop
+  FROM checkpost_stops
+  {where}
+)
+SELECT
+  (SELECT COUNT(*) FROM f) AS total,
+  (SELECT AVG(driver_age) FROM f) AS avg_age,
+  (SELECT COALESCE(SUM(is_arrested = 1), 0) FROM f) AS arrests,
+  (SELECT COALESCE(SUM(search_conducted = 1), 0) FROM f) AS searches,
+  (SELECT COALESCE(SUM(drugs_related_stop = 1), 0) FROM f) AS drug_stops,
+  (SELECT COALESCE(SUM(search_conducted = 1 AND is_arrested = 1), 0) FROM f) AS high_risk,
+  COALESCE((SELECT name FROM violations WHERE violation_id = (
+     SELECT violation_id FROM f GROUP BY violation_id ORDER BY COUNT(*) DESC LIMIT 1)), 'Unknown') AS top_violation,
+  (SELECT driver_gender FROM f WHERE driver_gender IS NOT NULL
+     GROUP BY driver_gender ORDER BY COUNT(*) DESC LIMIT 1) AS top_gender,
+  (SELECT COUNT(*) FROM f WHERE driver_gender = (
+     SELECT driver_gender FROM f WHERE driver_gender IS NOT NULL
+     GROUP BY driver_gender ORDER BY COUNT(*) DESC LIMIT 1)) AS top_gender_stops,
+  (SELECT COALESCE(stop_duration, 'Unknown') FROM f GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1) AS top_duration,
+  (SELECT COALESCE(stop_outcome, 'Unknown') FROM f GROUP BY 1 ORDER BY COUNT(*) DESC LIMIT 1) AS top_outcome
+"""
+
+
+def build_summary_sql(conditions, params):
+    """Summary metrics for the same predicates as the Recent Stops pages -> (sql, params)."""
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return SUMMARY_SQL.format(where=where), list(params)
+
+
+# The summary's counts per (violation, gender, duration, outcome): a few
+# hundred rows that can be added to the same partial over the archive
+# (summary.py merges the two once stops have been archived).
+SUMMARY_PARTIAL_SQL = """
+SELECT violation_id, driver_gender, stop_duration, stop_outcome,
+       COUNT(*) AS total,
+       COALESCE(SUM(driver_age), 0) AS age_sum,
+       COUNT(driver_age) AS age_count,
+       COALESCE(SUM(is_arrested = 1), 0) AS arrests,
+       COALESCE(SUM(search_conducted = 1), 0) AS searches,
+       COALESCE(SUM(drugs_related_stop = 1), 0) AS drug_stops,
+       COALESCE(SUM(search_conducted = 1 AND is_arrested = 1), 0) AS high_risk
+FROM checkpost_stops
+{where}
+GROUP BY violation_id, driver_gender, stop_duration, stop_outcome
+"""
+
+
+def build_summary_partial_sql(conditions, params):
+    """SUMMARY_PARTIAL_SQL for the given predicates -> (sql, params)."""
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return SUMMARY_PARTIAL_SQL.format(where=where), list(params)
+
+
+# Advanced SQL Analytics panels: selectbox label -> SQL. The violation
+# panels aggregate on checkpost_stops.violation_id and join the names from
+# the violations dictionary afterwards (see violations.py).
+ANALYTICS_QUERIES = {
+    "Top 10 vehicles in drug-related stops": """
+    SELECT vehicle_number,
+           COUNT(*) AS drug_stop_count
+    FROM checkpost_stops
+    WHERE drugs_related_stop = 1
+    GROUP BY vehicle_number
+    ORDER BY drug_stop_count DESC
+    LIMIT 10;
+""",
+    "Vehicles most frequently searched": """
+    SELECT vehicle_number,
+           COUNT(*) AS searches
+    FROM checkpost_stops
+    WHERE search_conducted = 1
+    GROUP BY vehicle_number
+    ORDER BY searches DESC
+    LIMIT 20;
+""",
+    "Age group with highest arrest rate": """
+    SELECT age_group,
+           total_stops,
+           arrests,
+           ROUND(100.0 * arrests / NULLIF(total_stops,0), 2) AS arrest_rate_pct
+    FROM (
+      SELECT
+        CASE
+          WHEN driver_age < 18 THEN '<18'
+          WHEN driver_age BETWEEN 18 AND 24 THEN '18-24'
+          WHEN driver_age BETWEEN 25 AND 34 THEN '25-34'
+          WHEN driver_age BETWEEN 35 AND 44 THEN '35-44'
+          WHEN driver_age >= 45 THEN '45+'
+          ELSE 'Unknown'
+        END AS age_group,
+
+
+        COUNT(*) AS total_stops,
+        SUM(is_arrested = 1) AS arrests
+      FROM checkpost_stops
+      WHERE driver_age IS NOT NULL
+      GROUP BY age_group
+    ) t
+    ORDER BY arrest_rate_pct DESC;
+""",
+    "Gender distribution per country": """
+    SELECT country_name,
+           driver_gender,
+           COUNT(*) AS stops
+    FROM checkpost_stops
+    GROUP BY country_name, driver_gender
+    ORDER BY country_name, stops DESC;
+""",
+    "Race + Gender with highest search rate": """
+    SELECT driver_race, driver_gender,
+           COUNT(*) AS total_stops,
+           SUM(search_conducted = 1) AS searches,
+           ROUND(100.0 * SUM(search_conducted = 1) / NULLIF(COUNT(*),0),2) AS search_rate_pct
+    FROM checkpost_stops
+    GROUP BY driver_race, driver_gender
+    HAVING total_stops >= 10
+    ORDER BY search_rate_pct DESC;
+""",
+    "Hour of day with most stops": """
+    SELECT HOUR(stop_time) AS hour_of_day,
+           COUNT(*) AS stops
+    FROM checkpost_stops
+    GROUP BY hour_of_day
+    ORDER BY stops DESC;
+""",
+    "Average stop duration per violation": """
+    SELECT v.name AS violation, t.stops, t.avg_duration
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS stops,
+             ROUND(AVG(
+               CASE stop_duration
+                   WHEN '<5 minutes' THEN 2.5
+                   WHEN '6-15 minutes' THEN 10
+                   WHEN '16-30 minutes' THEN 23
+                   ELSE NULL
+               END
+             ),1) AS avg_duration
+      FROM checkpost_stops
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id;
+""",
+    "Are night stops more likely to lead to arrests?": """
+    SELECT period,
+           total_stops,
+           arrests,
+           ROUND(100.0 * arrests / NULLIF(total_stops,0),2) AS arrest_rate_pct
+    FROM (
+      SELECT
+        CASE WHEN HOUR(stop_time) BETWEEN 20 AND 23
+                  OR HOUR(stop_time) BETWEEN 0 AND 5 THEN 'Night'
+             ELSE 'Day'
+        END AS period,
+        COUNT(*) AS total_stops,
+        SUM(is_arrested = 1) AS arrests
+      FROM checkpost_stops
+      GROUP BY period
+    ) t;
+""",
+    "Violations linked to searches/arrests": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests, t.search_rate_pct, t.arrest_rate_pct
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS total_stops,
+             SUM(search_conducted = 1) AS searches,
+             SUM(is_arrested = 1) AS arrests,
+             ROUND(100.0 * SUM(search_conducted = 1) / NULLIF(COUNT(*),0),2) AS search_rate_pct,
+             ROUND(100.0 * SUM(is_arrested = 1) / NULLIF(COUNT(*),0),2) AS arrest_rate_pct
+      FROM checkpost_stops
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.search_rate_pct DESC;
+""",
+    "Violations common among <25 drivers": """
+    SELECT v.name AS violation, t.stops_under_25
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS stops_under_25
+      FROM checkpost_stops
+      WHERE driver_age < 25
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.stops_under_25 DESC;
+""",
+    "Violations with almost no searches/arrests": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS total_stops,
+             SUM(search_conducted = 1) AS searches,
+             SUM(is_arrested = 1) AS arrests
+      FROM checkpost_stops
+      GROUP BY violation_id
+      HAVING total_stops >= 20
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.searches ASC, t.arrests ASC;
+""",
+    "Countries with highest drug-related stops": """
+    SELECT country_name,
+           COUNT(*) AS total_stops,
+           SUM(drugs_related_stop = 1) AS drug_stops,
+           ROUND(100.0 * SUM(drugs_related_stop = 1) / NULLIF(COUNT(*),0),2) AS drug_rate
+    FROM checkpost_stops
+    GROUP BY country_name
+    ORDER BY drug_rate DESC;
+""",
+    "Arrest rate by country and violation": """
+    SELECT t.country_name, v.name AS violation, t.total_stops, t.arrests, t.arrest_rate
+    FROM (
+      SELECT country_name, violation_id,
+             COUNT(*) AS total_stops,
+             SUM(is_arrested = 1) AS arrests,
+             ROUND(100.0 * SUM(is_arrested = 1) / NULLIF(COUNT(*),0),2) AS arrest_rate
+      FROM checkpost_stops
+      GROUP BY country_name, violation_id
+      HAVING total_stops >= 10
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.arrest_rate DESC;
+""",
+    "Countries with most searches": """
+    SELECT country_name,
+           COUNT(*) AS total_stops,
+           SUM(search_conducted = 1) AS searches
+    FROM checkpost_stops
+    GROUP BY country_name
+    ORDER BY searches DESC;
+""",
+    "Yearly stops & arrests by country": """
+    WITH yearly AS (
+      SELECT
+        country_name,
+        YEAR(stop_date) AS year,
+        COUNT(*) AS stops,
+        SUM(is_arrested = 1) AS arrests
+      FROM checkpost_stops
+      GROUP BY country_name, YEAR(stop_date)
+    )
+    SELECT
+      country_name, year, stops, arrests,
+      ROUND(100.0 * arrests / NULLIF(stops,0),2) AS arrest_rate
+    FROM yearly
+    ORDER BY country_name, year DESC;
+""",
+    "Violation trends by age & race": """
+    SELECT t.driver_age, t.driver_race, v.name AS violation, t.cnt
+    FROM (
+      SELECT driver_age, driver_race, violation_id, COUNT(*) AS cnt
+      FROM checkpost_stops
+      WHERE driver_age IS NOT NULL
+      GROUP BY driver_age, driver_race, violation_id
+      ORDER BY cnt DESC
+      LIMIT 200
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.cnt DESC;
+""",
+    "Time period analysis (Year/Month/Hour)": """
+    SELECT YEAR(stop_date) AS year,
+           MONTH(stop_date) AS month,
+           HOUR(stop_time) AS hour,
+           COUNT(*) AS stops
+    FROM checkpost_stops
+    GROUP BY year, month, hour
+    ORDER BY year DESC, month DESC, hour;
+""",
+    "High search/arrest rate violations": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests, t.search_rate, t.arrest_rate
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS total_stops,
+             SUM(search_conducted = 1) AS searches,
+             SUM(is_arrested = 1) AS arrests,
+             ROUND(100.0 * SUM(search_conducted = 1)/COUNT(*),2) AS search_rate,
+             ROUND(100.0 * SUM(is_arrested = 1)/COUNT(*),2) AS arrest_rate
+      FROM checkpost_stops
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.search_rate DESC, t.arrest_rate DESC;
+""",
+    "Driver demographics by country": """
+    SELECT country_name,
+           COUNT(*) AS stops,
+           ROUND(AVG(driver_age),1) AS avg_age,
+           SUM(driver_gender='Male') AS male,
+           SUM(driver_gender='Female') AS female
+    FROM checkpost_stops
+    GROUP BY country_name
+    ORDER BY stops DESC;
+""",
+    "Top 5 violations by arrest rate": """
+    SELECT v.name AS violation, t.total_stops, t.arrests, t.arrest_rate
+    FROM (
+      SELECT violation_id,
+             COUNT(*) AS total_stops,
+             SUM(is_arrested = 1) AS arrests,
+             ROUND(100.0 * SUM(is_arrested = 1)/COUNT(*),2) AS arrest_rate
+      FROM checkpost_stops
+      GROUP BY violation_id
+      ORDER BY arrest_rate DESC
+      LIMIT 5
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.arrest_rate DESC;
+""",
+}
+
+
+# The same panels answered from the checkpost_stops_daily rollup (see
+# rollups.py). Sentinel key values are mapped back to NULL so results match
+# the raw queries, and violations are grouped by violation_id and named from
+# the violations dictionary like the raw panels. Panels that need per-plate
+# or exact-age detail ("Top 10 vehicles...", "Vehicles most frequently
+# searched", "Violation trends by age & race") have no rollup and stay on the
+# raw table.
+ROLLUP_QUERIES = {
+    "Age group with highest arrest rate": """
+    SELECT age_group,
+           total_stops,
+           arrests,
+           ROUND(100.0 * arrests / NULLIF(total_stops,0), 2) AS arrest_rate_pct
+    FROM (
+      SELECT age_bucket AS age_group,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests
+      FROM checkpost_stops_daily
+      WHERE age_bucket <> 'Unknown'
+      GROUP BY age_bucket
+    ) t
+    ORDER BY arrest_rate_pct DESC;
+    """,
+    "Gender distribution per country": """
+    SELECT NULLIF(country_name,'') AS country_name,
+           NULLIF(driver_gender,'') AS driver_gender,
+           CAST(SUM(n_stops) AS SIGNED) AS stops
+    FROM checkpost_stops_daily
+    GROUP BY country_name, driver_gender
+    ORDER BY country_name, stops DESC;
+    """,
+    "Race + Gender with highest search rate": """
+    SELECT NULLIF(driver_race,'') AS driver_race, NULLIF(driver_gender,'') AS driver_gender,
+           CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+           CAST(SUM(n_searches) AS SIGNED) AS searches,
+           ROUND(100.0 * SUM(n_searches) / NULLIF(SUM(n_stops),0),2) AS search_rate_pct
+    FROM checkpost_stops_daily
+    GROUP BY driver_race, driver_gender
+    HAVING total_stops >= 10
+    ORDER BY search_rate_pct DESC;
+    """,
+    "Hour of day with most stops": """
+    SELECT NULLIF(stop_hour,-1) AS hour_of_day,
+           CAST(SUM(n_stops) AS SIGNED) AS stops
+    FROM checkpost_stops_daily
+    GROUP BY stop_hour
+    ORDER BY stops DESC;
+    """,
+    "Average stop duration per violation": """
+    SELECT v.name AS violation, t.stops, t.avg_duration
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS stops,
+             ROUND(SUM(duration_sum) * 1.0 / NULLIF(SUM(duration_count),0),1) AS avg_duration
+      FROM checkpost_stops_daily
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id;
+    """,
+    "Are night stops more likely to lead to arrests?": """
+    SELECT period,
+           total_stops,
+           arrests,
+           ROUND(100.0 * arrests / NULLIF(total_stops,0),2) AS arrest_rate_pct
+    FROM (
+      SELECT
+        CASE WHEN stop_hour BETWEEN 20 AND 23
+                  OR stop_hour BETWEEN 0 AND 5 THEN 'Night'
+             ELSE 'Day'
+        END AS period,
+        CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+        CAST(SUM(n_arrests) AS SIGNED) AS arrests
+      FROM checkpost_stops_daily
+      GROUP BY period
+    ) t;
+    """,
+    "Violations linked to searches/arrests": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests, t.search_rate_pct, t.arrest_rate_pct
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_searches) AS SIGNED) AS searches,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests,
+             ROUND(100.0 * SUM(n_searches) / NULLIF(SUM(n_stops),0),2) AS search_rate_pct,
+             ROUND(100.0 * SUM(n_arrests) / NULLIF(SUM(n_stops),0),2) AS arrest_rate_pct
+      FROM checkpost_stops_daily
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.search_rate_pct DESC;
+    """,
+    "Violations common among <25 drivers": """
+    SELECT v.name AS violation, t.stops_under_25
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS stops_under_25
+      FROM checkpost_stops_daily
+      WHERE age_bucket IN ('<18', '18-24')
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.stops_under_25 DESC;
+    """,
+    "Violations with almost no searches/arrests": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_searches) AS SIGNED) AS searches,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests
+      FROM checkpost_stops_daily
+      GROUP BY violation_id
+      HAVING total_stops >= 20
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.searches ASC, t.arrests ASC;
+    """,
+    "Countries with highest drug-related stops": """
+    SELECT NULLIF(country_name,'') AS country_name,
+           CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+           CAST(SUM(n_drug_stops) AS SIGNED) AS drug_stops,
+           ROUND(100.0 * SUM(n_drug_stops) / NULLIF(SUM(n_stops),0),2) AS drug_rate
+    FROM checkpost_stops_daily
+    GROUP BY country_name
+    ORDER BY drug_rate DESC;
+    """,
+    "Arrest rate by country and violation": """
+    SELECT NULLIF(t.country_name,'') AS country_name, v.name AS violation,
+           t.total_stops, t.arrests, t.arrest_rate
+    FROM (
+      SELECT country_name, violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests,
+             ROUND(100.0 * SUM(n_arrests) / NULLIF(SUM(n_stops),0),2) AS arrest_rate
+      FROM checkpost_stops_daily
+      GROUP BY country_name, violation_id
+      HAVING total_stops >= 10
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.arrest_rate DESC;
+    """,
+    "Countries with most searches": """
+    SELECT NULLIF(country_name,'') AS country_name,
+           CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+           CAST(SUM(n_searches) AS SIGNED) AS searches
+    FROM checkpost_stops_daily
+    GROUP BY country_name
+    ORDER BY searches DESC;
+    """,
+    "Yearly stops & arrests by country": """
+    WITH yearly AS (
+      SELECT
+        country_name,
+        YEAR(NULLIF(stop_date, '1000-01-01')) AS year,
+        CAST(SUM(n_stops) AS SIGNED) AS stops,
+        CAST(SUM(n_arrests) AS SIGNED) AS arrests
+      FROM checkpost_stops_daily
+      GROUP BY country_name, YEAR(NULLIF(stop_date, '1000-01-01'))
+    )
+    SELECT
+      NULLIF(country_name,'') AS country_name, year, stops, arrests,
+      ROUND(100.0 * arrests / NULLIF(stops,0),2) AS arrest_rate
+    FROM yearly
+    ORDER BY country_name, year DESC;
+    """,
+    "Time period analysis (Year/Month/Hour)": """
+    SELECT YEAR(NULLIF(stop_date, '1000-01-01')) AS year,
+           MONTH(NULLIF(stop_date, '1000-01-01')) AS month,
+           NULLIF(stop_hour,-1) AS hour,
+           CAST(SUM(n_stops) AS SIGNED) AS stops
+    FROM checkpost_stops_daily
+    GROUP BY year, month, hour
+    ORDER BY year DESC, month DESC, hour;
+    """,
+    "High search/arrest rate violations": """
+    SELECT v.name AS violation, t.total_stops, t.searches, t.arrests, t.search_rate, t.arrest_rate
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_searches) AS SIGNED) AS searches,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests,
+             ROUND(100.0 * SUM(n_searches)/SUM(n_stops),2) AS search_rate,
+             ROUND(100.0 * SUM(n_arrests)/SUM(n_stops),2) AS arrest_rate
+      FROM checkpost_stops_daily
+      GROUP BY violation_id
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.search_rate DESC, t.arrest_rate DESC;
+    """,
+    "Driver demographics by country": """
+    SELECT NULLIF(country_name,'') AS country_name,
+           CAST(SUM(n_stops) AS SIGNED) AS stops,
+           ROUND(SUM(age_sum) * 1.0 / NULLIF(SUM(age_count),0),1) AS avg_age,
+           CAST(SUM(CASE WHEN driver_gender='Male' THEN n_stops ELSE 0 END) AS SIGNED) AS male,
+           CAST(SUM(CASE WHEN driver_gender='Female' THEN n_stops ELSE 0 END) AS SIGNED) AS female
+    FROM checkpost_stops_daily
+    GROUP BY country_name
+    ORDER BY stops DESC;
+    """,
+    "Top 5 violations by arrest rate": """
+    SELECT v.name AS violation, t.total_stops, t.arrests, t.arrest_rate
+    FROM (
+      SELECT violation_id,
+             CAST(SUM(n_stops) AS SIGNED) AS total_stops,
+             CAST(SUM(n_arrests) AS SIGNED) AS arrests,
+             ROUND(100.0 * SUM(n_arrests)/SUM(n_stops),2) AS arrest_rate
+      FROM checkpost_stops_daily
+      GROUP BY violation_id
+      ORDER BY arrest_rate DESC
+      LIMIT 5
+    ) t
+    LEFT JOIN violations v ON v.violation_id = t.violation_id
+    ORDER BY t.arrest_rate DESC;
+    """,
+}
+
+
+def analytics_sql(label):
+    """SQL for an analytics panel: the rollup version when enabled and available."""
+    if USE_ROLLUPS and label in ROLLUP_QUERIES:
+        return ROLLUP_QUERIES[label]
+    return ANALYTICS_QUERIES[label]
@@ -0,0 +1,129 @@
+# query_cache.py
+"""Result cache for run_query.
+
+Entries are keyed on whitespace-normalized SQL plus the parameters, expire
+after a per-query TTL, and are evicted least-recently-used once the cached
+DataFrames exceed a byte budget. Writing to a table (see
+db.insert_dataframe_to_table) drops every entry that reads from it.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_TTL = float(os.environ.get("SECURECHECK_CACHE_TTL", "60"))
+CACHE_MAX_BYTES = int(os.environ.get("SECURECHECK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_QUOTED_OR_SPACE = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")|\s+")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace outside string literals and drop a trailing ';'."""
+    out = _QUOTED_OR_SPACE.sub(lambda m: m.group(1) or " ", sql).strip()
+    return out.rstrip(";").rstrip()
+
+
+def tables_in(sql):
+    """Lower-cased names of the tables a statement reads or writes."""
+    return {name.lower() for name in _TABLE_REF.findall(sql)}
+
+
+def is_cacheable(sql):
+    head = normalize_sql(sql).split(" ", 1)[0].upper()
+    return head in ("SELECT", "WITH")
+
+
+class QueryCache:
+    """Thread-safe TTL + byte-bounded LRU of query result DataFrames."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, default_ttl=CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()   # key -> (df, expires_at, nbytes, tables)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(sql, params=None):
+        return normalize_sql(sql), repr(tuple(params) if params is not None else ())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            df, expires_at, nbytes, _ = entry
+            if time.monotonic() >= expires_at:
+                self._drop(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        # shallow copy: callers can add/drop columns without touching the cache
+        return df.copy(deep=False)
+
+    def put(self, key, df, ttl=None, tables=(), nbytes=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        if nbytes is None:
+            nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, time.monotonic() + ttl, nbytes, frozenset(tables))
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def _drop(self, key):
+        _, _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def invalidate_table(self, table_name):
+        """Drop every entry whose SQL references `table_name`."""
+        table_name = table_name.lower()
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if table_name in e[3]]
+            for key in stale:
+                self._drop(key)
+            self._stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["entries"] = len(self._entries)
+            out["bytes"] = self._bytes
+            out["max_bytes"] = self.max_bytes
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        return out
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide query cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QueryCache()
+    return _cache
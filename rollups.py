@@ -0,0 +1,227 @@
+# rollups.py
+"""Daily summary table for the analytics panels, maintained on insert.
+
+checkpost_stops_daily holds one row per (date, country, violation_id,
+gender, race, age bucket, hour) with counts of stops, searches, arrests and drug
+stops plus the sums needed for average age / duration. Every batch that
+db.insert_dataframe_to_table commits into checkpost_stops is aggregated in
+pandas and upserted here, so the panel queries in queries.ROLLUP_QUERIES
+read a table whose size does not grow with the raw stop count.
+
+Key columns are NOT NULL (they form the primary key); missing values are
+stored as sentinels and turned back into NULL by the panel queries:
+date -> 1000-01-01, text -> '', violation_id -> 0, hour -> -1, age -> bucket
+'Unknown'. Violation names come from the violations dictionary (violations.py).
+
+    python rollups.py rebuild     # recompute from checkpost_stops (+ the Parquet archive)
+"""
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from archive import scan_cold
+from data_processing import to_boolean
+from db import get_pool, on_table_write
+from queries import TABLE
+from violations import get_dictionary
+
+
+ROLLUP_TABLE = "checkpost_stops_daily"
+NULL_DATE = date(1000, 1, 1)
+KEY_COLUMNS = ["stop_date", "country_name", "violation_id", "driver_gender", "driver_race",
+               "age_bucket", "stop_hour"]
+MEASURES = ["n_stops", "n_searches", "n_arrests", "n_drug_stops", "age_sum", "age_count",
+            "duration_sum", "duration_count"]
+
+# same buckets / minute values as the dashboard's CASE expressions
+DURATION_MINUTES = {'<5 minutes': 2.5, '6-15 minutes': 10, '16-30 minutes': 23}
+
+ROLLUP_DDL = f"""
+CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+  stop_date DATE NOT NULL,
+  country_name VARCHAR(64) NOT NULL,
+  violation_id SMALLINT UNSIGNED NOT NULL,
+  driver_gender VARCHAR(16) NOT NULL,
+  driver_race VARCHAR(32) NOT NULL,
+  age_bucket VARCHAR(8) NOT NULL,
+  stop_hour TINYINT NOT NULL,
+  n_stops INT UNSIGNED NOT NULL DEFAULT 0,
+  n_searches INT UNSIGNED NOT NULL DEFAULT 0,
+  n_arrests INT UNSIGNED NOT NULL DEFAULT 0,
+  n_drug_stops INT UNSIGNED NOT NULL DEFAULT 0,
+  age_sum BIGINT NOT NULL DEFAULT 0,
+  age_count INT UNSIGNED NOT NULL DEFAULT 0,
+  duration_sum DECIMAL(16,1) NOT NULL DEFAULT 0,
+  duration_count INT UNSIGNED NOT NULL DEFAULT 0,
+  PRIMARY KEY (stop_date, country_name, violation_id, driver_gender, driver_race, age_bucket, stop_hour),
+  KEY idx_rollup_country (country_name, violation_id),
+  KEY idx_rollup_violation (violation_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+_AGE_BUCKET_SQL = """CASE
+      WHEN driver_age < 18 THEN '<18'
+      WHEN driver_age BETWEEN 18 AND 24 THEN '18-24'
+      WHEN driver_age BETWEEN 25 AND 34 THEN '25-34'
+      WHEN driver_age BETWEEN 35 AND 44 THEN '35-44'
+      WHEN driver_age >= 45 THEN '45+'
+      ELSE 'Unknown'
+    END"""
+
+_DURATION_SQL = ("CASE stop_duration " + " ".join(f"WHEN '{k}' THEN {v}" for k, v in DURATION_MINUTES.items())
+                 + " ELSE NULL END")
+
+REBUILD_SQL = f"""
+INSERT INTO {ROLLUP_TABLE} ({', '.join(KEY_COLUMNS + MEASURES)})
+SELECT COALESCE(stop_date, '1000-01-01'),
+       COALESCE(country_name, ''),
+       COALESCE(violation_id, 0),
+       COALESCE(driver_gender, ''),
+       COALESCE(driver_race, ''),
+       {_AGE_BUCKET_SQL},
+       COALESCE(HOUR(stop_time), -1),
+       COUNT(*),
+       COALESCE(SUM(search_conducted = 1), 0),
+       COALESCE(SUM(is_arrested = 1), 0),
+       COALESCE(SUM(drugs_related_stop = 1), 0),
+       COALESCE(SUM(driver_age), 0),
+       COUNT(driver_age),
+       COALESCE(SUM({_DURATION_SQL}), 0),
+       COUNT({_DURATION_SQL})
+FROM {TABLE}
+GROUP BY 1, 2, 3, 4, 5, 6, 7
+"""
+
+UPSERT_SQL = (
+    f"INSERT INTO {ROLLUP_TABLE} ({', '.join(KEY_COLUMNS + MEASURES)}) "
+    f"VALUES ({', '.join(['%s'] * (len(KEY_COLUMNS) + len(MEASURES)))}) "
+    "ON DUPLICATE KEY UPDATE " + ", ".join(f"{m} = {m} + VALUES({m})" for m in MEASURES)
+)
+
+
+def _hours(s):
+    """Hour of day from timedelta / time / datetime / string columns (NaN if unknown)."""
+    if s.dtype.kind == "m":
+        return s.dt.components.hours.where(s.notna())
+    if s.dtype.kind == "M":
+        return s.dt.hour
+    codes, uniques = pd.factorize(s)
+    hours = []
+    for v in uniques:
+        if hasattr(v, "hour"):
+            hours.append(v.hour)
+        elif hasattr(v, "components"):          # pd.Timedelta
+            hours.append(v.components.hours)
+        else:
+            ts = pd.to_datetime(str(v), errors="coerce")
+            hours.append(np.nan if pd.isna(ts) else ts.hour)
+    lookup = np.append(np.array(hours, dtype=float), np.nan)
+    return pd.Series(lookup[codes], index=s.index)
+
+
+def _flag(df, col):
+    if col not in df.columns:
+        return pd.Series(0, index=df.index)
+    return to_boolean(df[col]).fillna(False).astype(int)
+
+
+def aggregate(df):
+    """Aggregate raw stop rows into rollup rows (keys + measures DataFrame)."""
+    n = len(df)
+    empty = pd.Series([None] * n, index=df.index, dtype=object)
+    keys = pd.DataFrame(index=df.index)
+    dates = pd.to_datetime(df["stop_date"], errors="coerce") if "stop_date" in df.columns else empty
+    keys["stop_date"] = pd.Series(pd.DatetimeIndex(dates).date, index=df.index).where(dates.notna(), NULL_DATE)
+    for col in ["country_name", "driver_gender", "driver_race"]:
+        values = df[col].astype(object) if col in df.columns else empty
+        keys[col] = values.where(values.notna(), "")
+    if "violation" in df.columns:
+        df = get_dictionary().fill_ids(df)      # e.g. archive files written before the column
+    ids = pd.to_numeric(df["violation_id"], errors="coerce") if "violation_id" in df.columns else \
+        pd.Series(np.nan, index=df.index)
+    keys["violation_id"] = ids.fillna(0).astype(int)
+    age = pd.to_numeric(df["driver_age"], errors="coerce") if "driver_age" in df.columns else \
+        pd.Series(np.nan, index=df.index)
+    keys["age_bucket"] = np.select(
+        [age < 18, age.between(18, 24), age.between(25, 34), age.between(35, 44), age >= 45],
+        ["<18", "18-24", "25-34", "35-44", "45+"], default="Unknown")
+    hours = _hours(df["stop_time"]) if "stop_time" in df.columns else pd.Series(np.nan, index=df.index)
+    keys["stop_hour"] = hours.fillna(-1).astype(int)
+
+    duration = df["stop_duration"].map(DURATION_MINUTES) if "stop_duration" in df.columns else \
+        pd.Series(np.nan, index=df.index)
+    measures = pd.DataFrame({
+        "n_stops": 1,
+        "n_searches": _flag(df, "search_conducted"),
+        "n_arrests": _flag(df, "is_arrested"),
+        "n_drug_stops": _flag(df, "drugs_related_stop"),
+        "age_sum": age.fillna(0),
+        "age_count": age.notna().astype(int),
+        "duration_sum": pd.to_numeric(duration, errors="coerce").fillna(0),
+        "duration_count": duration.notna().astype(int),
+    }, index=df.index)
+    out = pd.concat([keys, measures], axis=1).groupby(KEY_COLUMNS, sort=False).sum().reset_index()
+    return out
+
+
+def apply_rows(df):
+    """Upsert the rollup rows for newly inserted raw stops."""
+    if df.empty:
+        return 0
+    agg = aggregate(df)
+    rows = [tuple(v.item() if hasattr(v, "item") else v for v in row)
+            for row in agg[KEY_COLUMNS + MEASURES].itertuples(index=False, name=None)]
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(UPSERT_SQL, rows)
+            conn.commit()
+        finally:
+            cursor.close()
+    return len(rows)
+
+
+@on_table_write
+def _on_stops_inserted(table_name, inserted):
+    if table_name.lower() == TABLE:
+        apply_rows(inserted)
+
+
+def ensure_table():
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(ROLLUP_DDL)
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+def rebuild():
+    """Recompute the rollup from scratch (after bulk fixes or a failed listener).
+
+    Archived stops are folded back in from the cold tier (archive.scan_cold).
+    """
+    ensure_table()
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"DELETE FROM {ROLLUP_TABLE}")
+            cursor.execute(REBUILD_SQL)
+            conn.commit()
+            rows = cursor.rowcount
+        finally:
+            cursor.close()
+    # stops moved to the archive are gone from checkpost_stops but still counted
+    for table in scan_cold():
+        rows += apply_rows(table.to_pandas())
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        print(f"{rebuild()} rollup rows written to {ROLLUP_TABLE}")
+    else:
+        print(__doc__)
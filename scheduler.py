@@ -0,0 +1,90 @@
+# scheduler.py
+"""Run the independent queries of one dashboard rerun concurrently.
+
+A QueryScheduler is created per rerun: the script submits every query it
+is going to need up front, then asks for each result where it renders it.
+Work runs on one process-wide thread pool no larger than the DB connection
+pool, so concurrent reruns queue for a worker instead of for a connection.
+Each task is timed (queued / started / finished, relative to the
+scheduler's creation) so the slowest chain is visible.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db import POOL_SIZE
+
+
+SCHEDULER_WORKERS = int(os.environ.get("SECURECHECK_SCHEDULER_WORKERS", str(POOL_SIZE)))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide worker pool."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SCHEDULER_WORKERS,
+                                               thread_name_prefix="securecheck-query")
+    return _executor
+
+
+class QueryScheduler:
+    """Named, timed futures for the queries of a single rerun."""
+
+    def __init__(self, executor=None):
+        self.executor = executor or get_executor()
+        self.started = time.perf_counter()
+        self._futures = {}
+        self._timings = {}
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) under `name` (re-submitting a name is a no-op)."""
+        if name in self._futures:
+            return self._futures[name]
+        timing = {"name": name, "queued": time.perf_counter() - self.started,
+                  "start": None, "end": None, "status": "queued"}
+        self._timings[name] = timing
+
+        def task():
+            timing["start"] = time.perf_counter() - self.started
+            timing["status"] = "running"
+            try:
+                result = fn(*args, **kwargs)
+                timing["status"] = "ok"
+                return result
+            except Exception:
+                timing["status"] = "error"
+                raise
+            finally:
+                timing["end"] = time.perf_counter() - self.started
+
+        self._futures[name] = self.executor.submit(task)
+        return self._futures[name]
+
+    def result(self, name, timeout=None):
+        """Block until `name` is done; re-raises the task's exception."""
+        return self._futures[name].result(timeout=timeout)
+
+    def timings(self):
+        """Per-task timings in seconds: queued/start/end offsets, wait and run time."""
+        rows = []
+        for t in self._timings.values():
+            row = dict(t)
+            row["wait"] = (t["start"] - t["queued"]) if t["start"] is not None else None
+            row["seconds"] = (t["end"] - t["start"]) if t["end"] is not None else None
+            rows.append(row)
+        return sorted(rows, key=lambda r: r["queued"])
+
+    def summary(self):
+        """wall (first queue -> last finish), sum of run times, and the task that finished last."""
+        done = [t for t in self.timings() if t["seconds"] is not None]
+        if not done:
+            return {"wall": 0.0, "serial": 0.0, "critical": None}
+        wall = max(t["end"] for t in done) - min(t["queued"] for t in done)
+        last = max(done, key=lambda t: t["end"])
+        return {"wall": wall, "serial": sum(t["seconds"] for t in done), "critical": last["name"]}
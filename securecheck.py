@@ -0,0 +1,186 @@
+# securecheck.py
+"""Headless SecureCheck command line: load stop logs without the dashboard.
+
+    python securecheck.py migrate                               # create / update the tables first
+    python securecheck.py ingest exports/*.csv                  # clean + bulk insert, resumable
+    python securecheck.py ingest exports/*.csv --jobs 4         # four files at a time
+    python securecheck.py ingest exports/*.csv --dry-run        # read + clean only, insert nothing
+    python securecheck.py ingest big.csv --restart              # ignore big.csv's checkpoint
+    python securecheck.py backfill exports/*.csv --out cleaned.parquet   # see backfill.py
+
+`ingest` streams every file through ingest.stream_csv_to_table: read in
+chunks, cleaned with load_and_clean, bulk inserted in committed batches,
+each committed together with its checkpoint row. An interrupted run picks
+up after the last committed row when started again, and a finished file is
+not loaded twice (--restart ignores the checkpoints of the given files).
+With --jobs N, N files load at once, each in its own process with its own
+connection.
+
+Nothing here imports Streamlit or Altair, and the pandas / database
+modules are only imported once a command runs, so --help is instant.
+The database is chosen by the usual SECURECHECK_* variables.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+DEFAULT_TABLE = "checkpost_stops"
+PROGRESS_SECONDS = float(os.environ.get("SECURECHECK_CLI_PROGRESS", "5"))
+
+
+def _say(message):
+    print(f"{time.strftime('%H:%M:%S')} {message}", flush=True)
+
+
+def _ingest_file(path, table, chunk_rows, batch_size, resume, clean, quarantine_dir):
+    """Load one file (runs in a worker process with --jobs). Returns the final progress dict."""
+    from ingest import stream_csv_to_table
+
+    name = os.path.basename(path)
+    last = [0.0]
+
+    def show(p):
+        now = time.monotonic()
+        if now - last[0] < PROGRESS_SECONDS:
+            return
+        last[0] = now
+        fraction = f"{p['fraction']:.0%}" if p["fraction"] is not None else "?"
+        eta = f", ETA {p['eta_seconds']:.0f}s" if p["eta_seconds"] is not None else ""
+        _say(f"{name}: {fraction} · {p['rows_done']:,} rows · {p['rows_per_sec']:,.0f} rows/sec{eta}")
+
+    quarantine = os.path.join(quarantine_dir, f"{name}.rejected.csv") if quarantine_dir else None
+    return stream_csv_to_table(path, table, chunk_rows=chunk_rows, batch_size=batch_size, resume=resume,
+                               clean=clean, on_progress=show, quarantine_path=quarantine)
+
+
+def _dry_run(args, paths):
+    from ingest import dry_run
+
+    for path in paths:
+        r = dry_run(path, args.table, chunk_rows=args.chunk_rows, resume=not args.restart, clean=not args.raw)
+        if r["finished"]:
+            plan = "already loaded, would be skipped"
+        elif r["resume_from"]:
+            plan = f"would resume after row {r['resume_from']:,} and insert {r['rows_to_insert']:,}"
+        else:
+            plan = f"would insert {r['rows_to_insert']:,}"
+        _say(f"{path}: {r['rows']:,} rows, {plan}; {r['needs_review']:,} need review, "
+             f"{r['bad_dates']:,} without a date")
+    return 0
+
+
+def cmd_ingest(args):
+    from bulk_load import BULK_BATCH_SIZE
+    from ingest import INGEST_CHUNK_ROWS
+
+    paths = list(dict.fromkeys(args.paths))          # a file given twice is loaded once
+    missing = [p for p in paths if not os.path.isfile(p)]
+    if missing:
+        _say(f"no such file: {', '.join(missing)}")
+        return 2
+    args.chunk_rows = args.chunk_rows or INGEST_CHUNK_ROWS
+    args.batch_size = args.batch_size or BULK_BATCH_SIZE
+    if args.dry_run:
+        return _dry_run(args, paths)
+    if args.quarantine:
+        os.makedirs(args.quarantine, exist_ok=True)
+
+    job = (args.table, args.chunk_rows, args.batch_size, not args.restart, not args.raw, args.quarantine)
+    started = time.perf_counter()
+    results, errors = {}, {}
+    if args.jobs > 1 and len(paths) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(paths))) as pool:
+            futures = {pool.submit(_ingest_file, path, *job): path for path in paths}
+            for fut in as_completed(futures):
+                path = futures[fut]
+                try:
+                    results[path] = fut.result()
+                except Exception as e:
+                    errors[path] = e
+                    _say(f"{path}: FAILED {type(e).__name__}: {e}")
+                else:
+                    _report_file(path, results[path])
+    else:
+        for path in paths:
+            try:
+                results[path] = _ingest_file(path, *job)
+            except Exception as e:
+                errors[path] = e
+                _say(f"{path}: FAILED {type(e).__name__}: {e}")
+            else:
+                _report_file(path, results[path])
+
+    seconds = time.perf_counter() - started
+    # progress counts are per file, across runs; this run read rows_done - resumed_from of them
+    rows = sum(r["rows_done"] - r["resumed_from"] for r in results.values())
+    skipped = sum(1 for r in results.values() if r["rows_done"] == r["resumed_from"])
+    _say(f"{len(results)}/{len(paths)} files done ({skipped} already loaded), {rows:,} rows read and inserted "
+         f"in {seconds:.1f}s ({rows / seconds if seconds else 0:,.0f} rows/sec)")
+    if errors:
+        _say("re-run the same command to resume the failed files from their last committed batch")
+    return 1 if errors else 0
+
+
+def _report_file(path, p):
+    if p["rows_done"] == p["resumed_from"]:
+        _say(f"{path}: already loaded ({p['rows_inserted']:,} rows), skipped; --restart to load it again")
+        return
+    resumed = f", resumed after row {p['resumed_from']:,}" if p["resumed_from"] else ""
+    rejected = f", {p['rows_failed']:,} rejected" if p["rows_failed"] else ""
+    _say(f"{path}: {p['rows_inserted']:,} rows inserted{rejected}{resumed}")
+
+
+def cmd_migrate(args):
+    from db_schema import migrate
+    migrate(args.table)
+    return 0
+
+
+def cmd_backfill(args):
+    import backfill
+    backfill.main(args.rest, prog="securecheck backfill")
+    return 0
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="securecheck", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    mig = sub.add_parser("migrate", help="create the tables and add missing columns / indexes (db_schema.py)")
+    mig.add_argument("--table", default=DEFAULT_TABLE)
+    mig.set_defaults(func=cmd_migrate)
+
+    ingest = sub.add_parser("ingest", help="clean CSV files and bulk insert them into the stops table")
+    ingest.add_argument("paths", nargs="+", help="CSV files")
+    ingest.add_argument("--table", default=DEFAULT_TABLE)
+    ingest.add_argument("--jobs", type=int, default=1, help="files loaded at once (one process each)")
+    ingest.add_argument("--chunk-rows", type=int, help="rows read and cleaned at a time")
+    ingest.add_argument("--batch-size", type=int, help="rows per committed INSERT batch")
+    ingest.add_argument("--dry-run", action="store_true", help="read and clean only; show what would be inserted")
+    ingest.add_argument("--restart", action="store_true", help="ignore existing checkpoints and load from the top "
+                        "(rows already in the table are inserted again)")
+    ingest.add_argument("--raw", action="store_true", help="insert rows as read, without load_and_clean")
+    ingest.add_argument("--quarantine", metavar="DIR", help="write rejected rows to DIR/<file>.rejected.csv")
+    ingest.set_defaults(func=cmd_ingest)
+
+    bf = sub.add_parser("backfill", add_help=False, help="re-clean CSV exports in parallel (backfill.py)")
+    bf.add_argument("rest", nargs=argparse.REMAINDER)
+    bf.set_defaults(func=cmd_backfill)
+    return ap
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["backfill"]:
+        # handed over as given: REMAINDER would reject a leading --option (backfill --scaling ...)
+        return cmd_backfill(argparse.Namespace(rest=argv[1:]))
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
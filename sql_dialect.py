@@ -0,0 +1,201 @@
+# sql_dialect.py
+"""Rewrite the dashboard's MySQL SQL for the embedded engines (DuckDB, SQLite).
+
+queries.py stays written in MySQL; translate(sql, dialect) applies the few
+rewrites the other engines need:
+
+    %s placeholders                    -> ?
+    SUM(<comparison>)                  -> SUM(CASE WHEN <comparison> THEN 1 ELSE 0 END)
+    DATE_SUB(CURDATE(), INTERVAL n DAY)-> CURRENT_DATE - INTERVAL n DAY / date('now', '-n day')
+    CAST(x AS SIGNED)                  -> CAST(x AS BIGINT) / CAST(ROUND(x) AS INTEGER)
+    HOUR/YEAR/MONTH(x)                 -> strftime (SQLite only; DuckDB has them)
+    LIKE                               -> ILIKE (DuckDB; MySQL's collation is case-insensitive)
+
+and, for SQLite as the primary database (sqlite_backend.py), the write and
+DDL statements the app issues:
+
+    ON DUPLICATE KEY UPDATE m = m + VALUES(m) -> ON CONFLICT DO UPDATE SET m = m + excluded.m
+    DELETE FROM t WHERE ... LIMIT n           -> DELETE ... WHERE rowid IN (SELECT rowid ... LIMIT n)
+    ALTER TABLE t ADD INDEX i (cols)          -> CREATE INDEX IF NOT EXISTS i ON t (cols)
+    ALTER TABLE t DROP INDEX i                -> DROP INDEX IF EXISTS i
+    BIGINT UNSIGNED NOT NULL AUTO_INCREMENT   -> INTEGER NOT NULL (rowid alias with PRIMARY KEY (id))
+    ENGINE=... DEFAULT CHARSET=...            -> dropped
+    EXPLAIN                                   -> EXPLAIN QUERY PLAN
+    [UNIQUE] KEY i (cols) inside CREATE TABLE -> separate CREATE [UNIQUE] INDEX (split_indexes)
+
+It is a token-level rewriter for the statements in this repo, not a general
+SQL parser: string literals are left alone and function arguments are
+matched by parenthesis depth.
+"""
+import re
+
+
+DIALECTS = ("mysql", "duckdb", "sqlite")
+
+_COMPARISON = re.compile(r"(<>|!=|<=|>=|=|<|>|\bBETWEEN\b|\bIS\b|\bLIKE\b|\bIN\b)", re.IGNORECASE)
+_DATE_SUB = re.compile(r"DATE_SUB\(\s*CURDATE\(\)\s*,\s*INTERVAL\s+(\d+)\s+DAY\s*\)", re.IGNORECASE)
+_SIGNED = re.compile(r"\bAS\s+SIGNED\b", re.IGNORECASE)
+_SIGNED_TAIL = re.compile(r"\bAS\s+SIGNED\s*$", re.IGNORECASE)
+_LIKE = re.compile(r"(?<!I)\bLIKE\b", re.IGNORECASE)
+_STRFTIME = {"HOUR": "%H", "YEAR": "%Y", "MONTH": "%m"}
+_UPSERT = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_DELETE_LIMIT = re.compile(r"^\s*DELETE\s+FROM\s+(\w+)\s+(WHERE\s+.*?)\s+LIMIT\s+(\d+)\s*;?\s*$",
+                           re.IGNORECASE | re.DOTALL)
+_ADD_INDEX = re.compile(r"^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+INDEX\s+(\w+)\s*(\(.*\))\s*;?\s*$",
+                        re.IGNORECASE | re.DOTALL)
+_DROP_INDEX = re.compile(r"^\s*ALTER\s+TABLE\s+\w+\s+DROP\s+INDEX\s+(\w+)\s*;?\s*$", re.IGNORECASE)
+_AUTO_INCREMENT = re.compile(r"\b\w*INT\s+(UNSIGNED\s+)?NOT\s+NULL\s+AUTO_INCREMENT\b", re.IGNORECASE)
+_TABLE_OPTIONS = re.compile(r"\)\s*ENGINE\s*=.*$", re.IGNORECASE | re.DOTALL)
+_EXPLAIN = re.compile(r"^\s*EXPLAIN\s+(?!QUERY\s+PLAN)", re.IGNORECASE)
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+_KEY_CLAUSE = re.compile(r",\s*(UNIQUE\s+)?KEY\s+(\w+)\s*\(([^)]*)\)", re.IGNORECASE)
+
+
+def _code_spans(sql):
+    """Yield (is_code, text) pieces, string literals kept as separate pieces."""
+    i = start = 0
+    while i < len(sql):
+        if sql[i] == "'":
+            if start < i:
+                yield True, sql[start:i]
+            j = i + 1
+            while j < len(sql):
+                if sql[j] == "'" and not (j + 1 < len(sql) and sql[j + 1] == "'"):
+                    break
+                j += 2 if sql[j] == "'" else 1
+            yield False, sql[i:j + 1]
+            i = start = j + 1
+        else:
+            i += 1
+    if start < len(sql):
+        yield True, sql[start:]
+
+
+def _in_code(sql, fn):
+    return "".join(fn(text) if code else text for code, text in _code_spans(sql))
+
+
+def _closing(sql, open_at):
+    """Index of the parenthesis closing the one at `open_at` (quotes respected)."""
+    depth, quoted = 0, False
+    for i in range(open_at, len(sql)):
+        c = sql[i]
+        if c == "'":
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"unbalanced parentheses in: {sql[open_at:open_at + 60]!r}")
+
+
+def _top_level(text):
+    """`text` with nested parenthesised parts and literals blanked out."""
+    out, depth, quoted = [], 0, False
+    for c in text:
+        if c == "'":
+            quoted = not quoted
+        if quoted or depth or c in "()'":
+            out.append(" ")
+        else:
+            out.append(c)
+        if not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+    return "".join(out)
+
+
+def _rewrite_calls(sql, name, rewrite):
+    """Replace every NAME(args) call with rewrite(args) (innermost calls rewritten too)."""
+    pattern = re.compile(rf"\b{name}\s*\(", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        m = pattern.search(sql, pos)
+        if m is None:
+            out.append(sql[pos:])
+            return "".join(out)
+        if sql[:m.start()].count("'") % 2:      # inside a string literal
+            out.append(sql[pos:m.end()])
+            pos = m.end()
+            continue
+        end = _closing(sql, m.end() - 1)
+        args = _rewrite_calls(sql[m.end():end], name, rewrite)
+        out.append(sql[pos:m.start()])
+        out.append(rewrite(args))
+        pos = end + 1
+
+
+def _sum_of_comparison(args):
+    if _COMPARISON.search(_top_level(args)) and not args.strip().upper().startswith("CASE"):
+        return f"SUM(CASE WHEN {args.strip()} THEN 1 ELSE 0 END)"
+    return f"SUM({args})"
+
+
+def _cast_signed_sqlite(args):
+    # MySQL rounds to the nearest integer here; SQLite's CAST would truncate
+    m = _SIGNED_TAIL.search(_top_level(args))
+    if m is None:
+        return f"CAST({args})"
+    return f"CAST(ROUND({args[:m.start()].strip()}) AS INTEGER)"
+
+
+def translate(sql, dialect):
+    """MySQL statement from queries.py -> the same statement for `dialect`."""
+    if dialect not in DIALECTS:
+        raise ValueError(f"unknown SQL dialect: {dialect!r}")
+    if dialect == "mysql":
+        return sql
+    sql = _in_code(sql, lambda t: t.replace("%s", "?"))
+    sql = _rewrite_calls(sql, "SUM", _sum_of_comparison)
+    if dialect == "duckdb":
+        sql = _in_code(sql, lambda t: _DATE_SUB.sub(r"(CURRENT_DATE - INTERVAL \1 DAY)", t))
+        sql = _in_code(sql, lambda t: _SIGNED.sub("AS BIGINT", t))
+        sql = _in_code(sql, lambda t: _LIKE.sub("ILIKE", t))
+    else:
+        sql = _in_code(sql, lambda t: _DATE_SUB.sub(r"date('now', '-\1 day')", t))
+        sql = _rewrite_calls(sql, "CAST", _cast_signed_sqlite)
+        for fn, fmt in _STRFTIME.items():
+            sql = _rewrite_calls(sql, fn, lambda args, fmt=fmt: f"CAST(strftime('{fmt}', {args}) AS INTEGER)")
+        sql = _sqlite_statement(sql)
+    return sql
+
+
+def _sqlite_statement(sql):
+    m = _UPSERT.search(sql)
+    if m:
+        sql = sql[:m.start()] + "ON CONFLICT DO UPDATE SET" + _VALUES_REF.sub(r"excluded.\1", sql[m.end():])
+    m = _DELETE_LIMIT.match(sql)
+    if m:
+        table, where, limit = m.groups()
+        sql = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} {where} LIMIT {limit})"
+    m = _ADD_INDEX.match(sql)
+    if m:
+        table, index, cols = m.groups()
+        sql = f"CREATE INDEX IF NOT EXISTS {index} ON {table} {cols}"
+    m = _DROP_INDEX.match(sql)
+    if m:
+        sql = f"DROP INDEX IF EXISTS {m.group(1)}"
+    if _CREATE_TABLE.match(sql):
+        sql = _AUTO_INCREMENT.sub("INTEGER NOT NULL", sql)
+        sql = _TABLE_OPTIONS.sub(")", sql)
+    return _EXPLAIN.sub("EXPLAIN QUERY PLAN ", sql)
+
+
+def split_indexes(sql):
+    """SQLite CREATE TABLE -> (statement without KEY clauses, [CREATE INDEX statements]).
+
+    MySQL declares secondary indexes inside CREATE TABLE; SQLite needs them
+    as separate statements (index names are per database there, which the
+    repo's idx_* names already are).
+    """
+    m = _CREATE_TABLE.match(sql)
+    if not m:
+        return sql, []
+    table = m.group(1)
+    indexes = [f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({cols})"
+               for unique, name, cols in _KEY_CLAUSE.findall(sql)]
+    return _KEY_CLAUSE.sub("", sql), indexes
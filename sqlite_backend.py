@@ -0,0 +1,170 @@
+# sqlite_backend.py
+"""SQLite stand-in for the MySQL server (SECURECHECK_DB_BACKEND=sqlite).
+
+connect() returns a connection that looks like the pymysql one the rest of
+the app uses: cursors take MySQL SQL with %s placeholders and rewrite it
+through sql_dialect.translate(..., "sqlite"), cursor(SSCursor) is accepted,
+and ping() / thread_id() exist for the pool and streaming. Values round
+trip like they do from MySQL: DATE columns come back as datetime.date and
+TIME columns as datetime.timedelta.
+
+With a file path in SECURECHECK_SQLITE_PATH the dashboard, ingest, rollups
+and benchmarks run without a database server:
+
+    SECURECHECK_DB_BACKEND=sqlite python db_schema.py migrate
+    SECURECHECK_DB_BACKEND=sqlite python synth.py load --rows 1000000
+    SECURECHECK_DB_BACKEND=sqlite streamlit run str_app.py
+"""
+import datetime
+import re
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from sql_dialect import split_indexes, translate
+
+
+_CREATE_IF_MISSING = re.compile(r"^\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def _adapt_date(d):
+    return d.isoformat()
+
+
+def _adapt_datetime(dt):
+    # DATE columns get date-only strings, as MySQL would truncate them
+    if dt.hour == dt.minute == dt.second == dt.microsecond == 0:
+        return dt.strftime("%Y-%m-%d")
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _adapt_timedelta(td):
+    seconds = int(td.total_seconds())
+    sign = "-" if seconds < 0 else ""
+    seconds = abs(seconds)
+    return f"{sign}{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _convert_date(value):
+    return datetime.date.fromisoformat(value[:10].decode())
+
+
+def _convert_time(value):
+    h, m, s = value.decode().lstrip("-").split(":")
+    td = datetime.timedelta(hours=int(h), minutes=int(m), seconds=float(s))
+    return -td if value.startswith(b"-") else td
+
+
+sqlite3.register_adapter(datetime.date, _adapt_date)
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_adapter(pd.Timestamp, _adapt_datetime)
+sqlite3.register_adapter(datetime.timedelta, _adapt_timedelta)
+sqlite3.register_adapter(pd.Timedelta, _adapt_timedelta)
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.float64, float)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_converter("DATE", _convert_date)
+sqlite3.register_converter("TIME", _convert_time)
+
+_ids = iter(range(1, 1 << 62))
+_ids_lock = threading.Lock()
+
+
+class SQLiteCursor:
+    """DB-API cursor taking MySQL-dialect statements."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn.cursor()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=None):
+        sql, indexes = split_indexes(translate(query, "sqlite"))
+        if sql.lstrip()[:9].upper() == "SAVEPOINT" and not self._conn.in_transaction:
+            # outside a transaction SQLite's SAVEPOINT opens one that RELEASE
+            # commits; in MySQL it stays open until COMMIT / ROLLBACK
+            self._cursor.execute("BEGIN")
+        existing = _CREATE_IF_MISSING.match(sql) if indexes else None
+        if existing:
+            # as in MySQL, an existing table is left alone, indexes included
+            # (its KEYs may name columns that a later migration adds)
+            self._cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                 (existing.group(1),))
+            if self._cursor.fetchone():
+                indexes = []
+        self._cursor.execute(sql, tuple(params or ()))
+        for index in indexes:
+            self._cursor.execute(index)
+        return self._cursor.rowcount
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(translate(query, "sqlite"), rows)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """The subset of pymysql.Connection that db.py, streaming.py and bulk_load.py use."""
+
+    def __init__(self, path, timeout=30.0):
+        self._conn = sqlite3.connect(path, timeout=timeout, detect_types=sqlite3.PARSE_DECLTYPES,
+                                     check_same_thread=False)    # the pool hands it between threads
+        self._conn.execute("PRAGMA journal_mode=WAL")            # readers don't block the writer
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with _ids_lock:
+            self._id = next(_ids)
+
+    def cursor(self, cursorclass=None):
+        # every sqlite3 cursor already reads rows lazily, so SSCursor needs nothing extra
+        return SQLiteCursor(self._conn)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def thread_id(self):
+        return self._id
+
+    def interrupt(self):
+        """Abort the statement running on this connection (MySQL: KILL QUERY)."""
+        self._conn.interrupt()
+
+
+def connect(path):
+    return SQLiteConnection(path)
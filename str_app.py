@@ -1,55 +1,36 @@
-import pymysql
+import os
+import re
+import tempfile
+from contextlib import closing
+
 import pandas as pd
 import streamlit as st
 from datetime import date
 import altair as alt
 
-
-def run_query(query, params=None):
-    """Execute SQL and return a pandas DataFrame."""
-    conn = pymysql.connect(
-        host="localhost",
-        user="root",
-        password="Rtx3090ti",
-        database="mydb",
-    )
-    try:
-        cursor = conn.cursor()
-        cursor.execute(query, params or ())
-        rows = cursor.fetchall()
-        cols = [desc[0] for desc in cursor.description] if cursor.description else []
-        return pd.DataFrame(rows, columns=cols)
-    finally:
-        conn.close()
-
-
-def insert_dataframe_to_table(df, table_name):
-    """Insert a pandas DataFrame into a database table."""
-    conn = pymysql.connect(
-        host="localhost",
-        user="root",
-        password="Rtx3090ti",
-        database="mydb",
-    )
-    try:
-        cursor = conn.cursor()
-        cols = ', '.join(df.columns)
-        placeholders = ', '.join(['%s'] * len(df.columns))
-        insert_sql = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
-        
-        inserted = 0
-        for idx, row in df.iterrows():
-            try:
-                cursor.execute(insert_sql, tuple(row))
-                inserted += 1
-            except Exception as e:
-                print(f"Row {idx} failed: {e}")
-        
-        conn.commit()
-        return inserted
-    finally:
-        cursor.close()
-        conn.close()
+import archive
+from alerts import get_alert_engine
+from bulk_load import BULK_BATCH_SIZE
+from change_feed import FEED_REFRESH_SECONDS, ChangeFeed
+from db import get_pool, run_query
+from instrumentation import export_json, get_recorder
+from query_cache import get_cache
+from scheduler import QueryScheduler
+from streaming import export_query, run_query_chunks
+from summary import SUMMARY_MODE, summarize, summarize_frame
+from pagination import PAGE_SIZE, approx_count, fetch_page
+from panels import PANELS, TABS, load_panel, streams, tab_named
+from plate_search import get_plate_index
+from queries import REPEATED_VEHICLES_SQL, analytics_sql, filter_where
+import rollups  # noqa: F401  (keeps checkpost_stops_daily in step with inserts)
+from violations import get_dictionary
+from ingest import INGEST_CHUNK_ROWS, stream_csv_to_table
+
+# Aggregate panels change only when new stops are loaded (which invalidates
+# the cache), so they can be cached longer than the default query TTL.
+ANALYTICS_TTL = 300
+# streamed panels stop reading after this many rows (exports still get everything)
+STREAM_DISPLAY_ROWS = 5000
 
 
 st.set_page_config(
@@ -103,6 +84,52 @@ st.markdown("""
 
 st.markdown('<h1 class="main-header">🚔 Police Checkpost Dashboard</h1>', unsafe_allow_html=True)
 
+# ---------------------- Diagnostics (hidden: open with ?diagnostics=1) ----------------------
+if st.query_params.get("diagnostics") == "1":
+    recorder = get_recorder()
+    st.header("🩺 Diagnostics")
+    st.caption("Timings recorded by this server process since start (or the last reset).")
+
+    latency = pd.DataFrame.from_dict(recorder.percentiles(), orient="index")
+    st.subheader("Latency per query (ms, rolling)")
+    if latency.empty:
+        st.info("No queries recorded yet.")
+    else:
+        cols = ["calls", "errors", "cache_hits", "p50", "p95", "p99", "mean", "max", "rows", "bytes"]
+        st.dataframe(latency[cols].sort_values("p95", ascending=False).round(1), use_container_width=True)
+
+    st.subheader("Recent calls")
+    recent = pd.DataFrame(recorder.recent()[-200:][::-1])
+    if not recent.empty:
+        cols = ["name", "total_ms", "checkout_ms", "execute_ms", "fetch_ms", "frame_ms", "rows", "bytes",
+                "cache", "error"]
+        recent["at"] = pd.to_datetime(recent["at"], unit="s")
+        st.dataframe(recent[["at"] + cols].round(1), use_container_width=True)
+
+    errors = recorder.recent(errors_only=True)
+    st.subheader(f"Errors ({len(errors)})")
+    for call in errors[::-1][:50]:
+        st.error(f"{call['name']}: {call['error']}")
+
+    slow = recorder.slow_log()
+    st.subheader(f"Slow queries (≥ {recorder.slow_ms:.0f} ms)")
+    for entry in slow[::-1]:
+        with st.expander(f"{entry['name']} — {entry['total_ms']:.0f} ms"):
+            st.code(entry["sql"], language="sql")
+            if entry["params"]:
+                st.write(f"params: {entry['params']}")
+            if entry["plan"] is not None:
+                st.dataframe(pd.DataFrame(entry["plan"]), use_container_width=True)
+            else:
+                st.warning(f"EXPLAIN failed: {entry['plan_error']}")
+
+    st.download_button("Download JSON export", export_json(), file_name="securecheck-diagnostics.json",
+                       mime="application/json")
+    if st.button("Reset counters"):
+        recorder.reset()
+        st.rerun()
+    st.stop()
+
 # ---------------------- CSV load & insert UI ----------------------
 st.sidebar.markdown("---")
 st.sidebar.header("CSV → DB")
@@ -110,26 +137,46 @@ csv_path_default = ""
 csv_path = st.sidebar.text_input("CSV path (or leave blank to upload)", value=csv_path_default)
 upload = st.sidebar.file_uploader("Or upload CSV file", type=["csv"]) 
 table_name = st.sidebar.text_input("Target DB table", value="checkpost_stops")
+batch_size = st.sidebar.number_input("Insert batch size", min_value=100, max_value=100000,
+                                     value=BULK_BATCH_SIZE, step=500)
+chunk_rows = st.sidebar.number_input("Rows per chunk", min_value=1000, max_value=1000000,
+                                     value=INGEST_CHUNK_ROWS, step=10000)
+confirm = st.sidebar.checkbox("Confirm insert into DB table '" + table_name + "'", value=False)
 insert_button = st.sidebar.button("Load & Insert CSV")
 
 if insert_button:
     try:
+        source = upload if upload is not None else csv_path
+        # preview only the head; the full file is streamed below
+        preview = pd.read_csv(source, nrows=5)
         if upload is not None:
-            df_upload = pd.read_csv(upload)
-        else:
-            df_upload = pd.read_csv(csv_path)
+            upload.seek(0)
+        st.sidebar.write("Preview (first rows):")
+        st.sidebar.dataframe(preview)
 
-        st.sidebar.write(f"Preview ({len(df_upload)} rows):")
-        st.sidebar.dataframe(df_upload.head())
-
-        confirm = st.sidebar.checkbox("Confirm insert into DB table '" + table_name + "'", value=False)
         if confirm:
-            with st.spinner("Inserting rows into DB — this may take a moment..."):
-                inserted = insert_dataframe_to_table(df_upload, table_name)
-            st.sidebar.success(f"Inserted {inserted} rows into `{table_name}`")
+            bar = st.sidebar.progress(0.0, text="Starting ingest...")
+
+            def show_progress(p):
+                eta = f"{p['eta_seconds']:.0f}s" if p['eta_seconds'] is not None else "?"
+                bar.progress(p['fraction'] or 0.0,
+                             text=f"{p['rows_done']:,} rows · {p['rows_per_sec']:,.0f} rows/sec · ETA {eta}")
+
+            progress = stream_csv_to_table(source, table_name, chunk_rows=int(chunk_rows),
+                                           batch_size=int(batch_size), on_progress=show_progress)
+            if progress['resumed_from']:
+                st.sidebar.info(f"Resumed after {progress['resumed_from']:,} already-committed rows.")
+            st.sidebar.success(
+                f"Inserted {progress['rows_inserted']:,} rows into `{table_name}` "
+                f"({progress['rows_per_sec']:,.0f} rows/sec)"
+            )
+            if progress['rows_failed']:
+                st.sidebar.warning(f"{progress['rows_failed']} rows rejected and quarantined.")
             st.sidebar.write("Consider validating inserted rows in the table before re-running.")
+        else:
+            st.sidebar.info("Tick the confirm box and press the button again to insert.")
     except Exception as e:
-        st.sidebar.error(f"Insert failed: {e}")
+        st.sidebar.error(f"Insert failed: {e} — re-run to resume from the last committed chunk.")
 
 # ------------------------------------------------------------------
 
@@ -139,88 +186,166 @@ with st.sidebar:
     start_date = st.date_input("Start date", value=date(2015, 1, 1))
     end_date = st.date_input("End date", value=date.today())
     gender = st.selectbox("Driver gender", options=["All", "Male", "Female", "Unknown"])
-    violation_contains = st.text_input("Violation contains (substring)")
-    plate = st.text_input("Vehicle plate (exact)")
+    violation_contains = st.text_input("Violation contains (name or keyword)")
+    if violation_contains.strip():
+        violation_names = get_dictionary().names()
+        matched = [violation_names[i] for i in get_dictionary().resolve(violation_contains)]
+        st.caption("Matches: " + (", ".join(matched) if matched else "no violation"))
+    plate_query = st.text_input("Vehicle plate (prefix, part or misread; ? = any character)")
+    plate = ""
+    if plate_query.strip():
+        matches = get_plate_index().search(plate_query)
+        if matches:
+            st.dataframe(pd.DataFrame(matches), hide_index=True, use_container_width=True)
+            plate = st.selectbox("Filter on plate", [m["plate"] for m in matches])
+        else:
+            st.caption("No matching plates")
     search_flag = st.selectbox("Search conducted", options=["All", "True", "False"])
+    page_size = st.number_input("Rows per page", min_value=10, max_value=1000, value=PAGE_SIZE, step=10)
+    live_feed = st.checkbox("Live feed (newest arrivals, fetches only new stops)")
+    live_every = st.number_input("Live feed refresh every (seconds, 0 = on rerun only)", min_value=0,
+                                 max_value=3600, value=FEED_REFRESH_SECONDS, step=5, disabled=not live_feed)
     run = st.button("Run query")
 
-# Build SQL + params (safe)
-base_sql = "SELECT * FROM checkpost_stops WHERE stop_date BETWEEN %s AND %s"
-params = [start_date, end_date]
-
-if gender != "All":
-    base_sql += " AND driver_gender = %s"
-    params.append(gender)
-if violation_contains.strip() != "":
-    base_sql += " AND violation LIKE %s"
-    params.append(f"%{violation_contains.strip()}%")
-if plate.strip() != "":
-    base_sql += " AND vehicle_number = %s"
-    params.append(plate.strip())
-if search_flag in ("True", "False"):
-    base_sql += " AND search_conducted = %s"
-    params.append(True if search_flag == "True" else False)
-
-base_sql += " ORDER BY stop_date DESC, stop_time DESC LIMIT 1000"
-sql_to_run = base_sql
-
-# Fetch data - automatically fetch if violation_contains is filled or run button clicked
+# Connection pool counters (shared by every rerun in this server process)
+with st.sidebar.expander("DB connection pool"):
+    pool_stats = get_pool().stats()
+    st.write(f"Connections: {pool_stats['in_use']} in use / {pool_stats['idle']} idle (max {pool_stats['size']})")
+    st.write(f"Hits: {pool_stats['hits']} · Misses: {pool_stats['misses']} · Hit rate: {pool_stats['hit_rate']:.0%}")
+    st.write(f"Waits: {pool_stats['waits']} · Avg wait: {pool_stats['avg_wait']*1000:.1f} ms · Max wait: {pool_stats['wait_time_max']*1000:.1f} ms")
+    st.write(f"Evicted idle: {pool_stats['evicted_idle']} · Failed health checks: {pool_stats['failed_health_checks']}")
+
+with st.sidebar.expander("Query cache"):
+    cache_stats = get_cache().stats()
+    st.write(f"Hit rate: {cache_stats['hit_rate']:.0%} ({cache_stats['hits']} hits / {cache_stats['misses']} misses)")
+    st.write(f"Cached: {cache_stats['entries']} results · {cache_stats['bytes']/2**20:.1f} / {cache_stats['max_bytes']/2**20:.0f} MiB")
+    st.write(f"Evictions: {cache_stats['evictions']} · Expired: {cache_stats['expired']} · Invalidated: {cache_stats['invalidations']}")
+    if st.button("Clear query cache"):
+        get_cache().clear()
+
+# Filters only apply once "Run query" is pressed (or a violation substring is
+# typed); they are kept in session_state so paging reruns keep them.
+filters = (start_date, end_date, gender, violation_contains, plate, search_flag)
 if run or violation_contains.strip() != "":
-    df = run_query(sql_to_run, tuple(params))
-else:
-    df = run_query("SELECT * FROM checkpost_stops ORDER BY stop_date DESC, stop_time DESC LIMIT 200")
+    st.session_state["applied_filters"] = filters
+applied = st.session_state.get("applied_filters")
+conditions, params = filter_where(*applied) if applied is not None else ([], [])
+
+# Keyset pager: restart at the newest stops whenever the query or page size changes
+pager_key = (applied, int(page_size))
+if st.session_state.get("pager_key") != pager_key:
+    st.session_state["pager_key"] = pager_key
+    st.session_state["pager"] = {"after": None, "before": None, "page_no": 1}
+pager = st.session_state["pager"]
+
+# Every query this rerun needs is independent of the others: start them all
+# now on the shared worker pool and collect each result where it is drawn.
+sched = QueryScheduler()
+if not live_feed:
+    sched.submit("Recent stops page", fetch_page, conditions, params, int(page_size),
+                 after=pager["after"], before=pager["before"])
+sched.submit("Row estimate", approx_count, conditions, params)
+if SUMMARY_MODE != "pandas":
+    sched.submit("Summary", summarize, conditions, params, ttl=ANALYTICS_TTL, filters=applied or ())
+sched.submit("Alert engine", get_alert_engine)
+# only the open analytics tab's selected panel is loaded (see panels.py)
+open_tab = tab_named(st.session_state.get("analytics_tab", TABS[0].name))
+open_label = st.session_state.get(open_tab.key, open_tab.labels()[0])
+if not streams(open_label):
+    sched.submit(open_label, load_panel, open_label, refresh=st.session_state.get("panel_refresh", False))
+
+def displayed(frame):
+    # Hide vehicle_plate / the violation dictionary id if they exist
+    return frame.drop(columns=[c for c in ('vehicle_plate', 'violation_id') if c in frame.columns])
+
 
 st.subheader("Recent Stops")
-st.write(f"Showing {len(df)} rows (filtered).")
-# Hide vehicle_plate column if it exists
-if 'vehicle_plate' in df.columns:
-    df_display = df.drop(columns=['vehicle_plate'])
+archived_before = archive.archived_before()
+if archived_before:
+    st.caption(f"Stops before {archived_before} have been archived (archive.py): the summary and the "
+               "analytics panels include them, this list only pages through the newer ones.")
+estimate = sched.result("Row estimate")
+total = f" of ~{estimate:,}" if estimate is not None else ""
+if live_feed:
+    # Incremental mode (change_feed.py): the session's frame only asks for
+    # stops past its high-water id; the fragment re-runs on its own timer
+    feed_key = (applied, int(page_size))
+    if st.session_state.get("feed_key") != feed_key:
+        st.session_state["feed_key"] = feed_key
+        st.session_state["feed"] = ChangeFeed(conditions, params, max_rows=int(page_size))
+    feed = st.session_state["feed"]
+
+    @st.fragment(run_every=live_every or None)
+    def live_stops():
+        result = feed.refresh()
+        st.write(f"Live feed · newest {len(result['rows'])} arrivals{total} "
+                 f"({'filtered' if applied else 'all stops'}) · {result['new_rows']} new since the last refresh "
+                 f"· high-water id {result['high_water'] or 0:,} · {result['seconds'] * 1000:.0f} ms")
+        st.dataframe(displayed(result["rows"]), use_container_width=True)
+        if st.button("Reset feed"):
+            feed.reset()
+            st.rerun(scope="fragment")
+
+    live_stops()
+    df = feed.rows
 else:
-    df_display = df
-st.dataframe(df_display, use_container_width=True)
+    page = sched.result("Recent stops page")
+    df = page["rows"]
+    st.write(f"Page {pager['page_no']} · showing {len(df)} rows{total} ({'filtered' if applied else 'all stops'}).")
+    st.dataframe(displayed(df), use_container_width=True)
+
+    prev_col, next_col, _ = st.columns([1, 1, 6])
+    if prev_col.button("◀ Newer", disabled=not page["has_prev"]):
+        pager.update(after=None, before=page["first"], page_no=max(pager["page_no"] - 1, 1))
+        st.rerun()
+    if next_col.button("Older ▶", disabled=not page["has_next"]):
+        pager.update(after=page["last"], before=None, page_no=pager["page_no"] + 1)
+        st.rerun()
 
 # ============================================================
-# 📊 PREDICTION SUMMARY - Based on query results
+# 📊 PREDICTION SUMMARY - over the whole filtered set (one SQL aggregate)
 # ============================================================
-if len(df) > 0:
+summary_scope = "filtered"
+if SUMMARY_MODE == "pandas":
+    metrics = summarize_frame(df)
+    summary_scope = "shown"
+else:
+    try:
+        metrics = sched.result("Summary")
+    except Exception as e:
+        st.warning(f"Summary query failed ({e}); showing metrics for the rows on this page only.")
+        metrics = summarize_frame(df)
+        summary_scope = "shown"
+
+
+def pct(count):
+    return count / metrics['total'] * 100 if metrics['total'] else 0
+
+
+if metrics['total'] > 0:
     st.subheader("🔮 Prediction Summary")
     
     col1, col2, col3, col4 = st.columns(4)
     
     # Prediction 1: Average age of stopped drivers
     with col1:
-        if 'driver_age' in df.columns:
-            avg_age = df['driver_age'].replace('Unknown', pd.NA).apply(pd.to_numeric, errors='coerce').mean()
-            if not pd.isna(avg_age):
-                st.metric("Avg Driver Age", f"{avg_age:.1f} years")
-            else:
-                st.metric("Avg Driver Age", "N/A")
+        if metrics['avg_age'] is not None:
+            st.metric("Avg Driver Age", f"{metrics['avg_age']:.1f} years")
         else:
             st.metric("Avg Driver Age", "N/A")
     
     # Prediction 2: Arrest likelihood
     with col2:
-        if 'is_arrested' in df.columns:
-            arrest_count = pd.to_numeric(df['is_arrested'], errors='coerce').fillna(0).sum()
-            arrest_rate = (arrest_count / len(df) * 100) if len(df) > 0 else 0
-            st.metric("Arrest Rate", f"{arrest_rate:.1f}%")
-        else:
-            st.metric("Arrest Rate", "N/A")
+        st.metric("Arrest Rate", f"{pct(metrics['arrests']):.1f}%")
     
     # Prediction 3: Search likelihood
     with col3:
-        if 'search_conducted' in df.columns:
-            search_count = pd.to_numeric(df['search_conducted'], errors='coerce').fillna(0).sum()
-            search_rate = (search_count / len(df) * 100) if len(df) > 0 else 0
-            st.metric("Search Rate", f"{search_rate:.1f}%")
-        else:
-            st.metric("Search Rate", "N/A")
+        st.metric("Search Rate", f"{pct(metrics['searches']):.1f}%")
     
     # Prediction 4: Most common violation
     with col4:
-        if 'violation' in df.columns:
-            top_violation = df['violation'].fillna('Unknown').value_counts().idxmax()
-            st.metric("Top Violation", top_violation[:20])
+        if metrics['top_violation'] is not None:
+            st.metric("Top Violation", metrics['top_violation'][:20])
         else:
             st.metric("Top Violation", "N/A")
     
@@ -231,38 +356,23 @@ if len(df) > 0:
     insights = []
     
     # Insight 1: Gender distribution
-    if 'driver_gender' in df.columns:
-        gender_counts = df['driver_gender'].value_counts()
-        if len(gender_counts) > 0:
-            top_gender = gender_counts.idxmax()
-            insights.append(f"👥 Most stopped drivers are **{top_gender}** ({gender_counts[top_gender]} stops)")
+    if metrics['top_gender'] is not None:
+        insights.append(f"👥 Most stopped drivers are **{metrics['top_gender']}** ({metrics['top_gender_stops']} stops)")
     
     # Insight 2: Drug-related stops
-    if 'drugs_related_stop' in df.columns:
-        drug_count = pd.to_numeric(df['drugs_related_stop'], errors='coerce').fillna(0).sum()
-        drug_pct = (drug_count / len(df) * 100) if len(df) > 0 else 0
-        insights.append(f"💊 Drug-related stops: **{drug_pct:.1f}%** of filtered results")
+    insights.append(f"💊 Drug-related stops: **{pct(metrics['drug_stops']):.1f}%** of {summary_scope} results")
     
     # Insight 3: Stop duration
-    if 'stop_duration' in df.columns:
-        duration_counts = df['stop_duration'].fillna('Unknown').value_counts()
-        if len(duration_counts) > 0:
-            top_duration = duration_counts.idxmax()
-            insights.append(f"⏱️ Most common stop duration: **{top_duration}**")
+    if metrics['top_duration'] is not None:
+        insights.append(f"⏱️ Most common stop duration: **{metrics['top_duration']}**")
     
     # Insight 4: Citation vs Arrest
-    if 'stop_outcome' in df.columns:
-        outcome_counts = df['stop_outcome'].fillna('Unknown').value_counts()
-        if len(outcome_counts) > 0:
-            top_outcome = outcome_counts.idxmax()
-            insights.append(f"📋 Most common outcome: **{top_outcome}**")
+    if metrics['top_outcome'] is not None:
+        insights.append(f"📋 Most common outcome: **{metrics['top_outcome']}**")
     
     # Insight 5: High-risk profile
-    if 'is_arrested' in df.columns and 'search_conducted' in df.columns:
-        high_risk = df[(pd.to_numeric(df['search_conducted'], errors='coerce').fillna(0) == 1) & 
-                       (pd.to_numeric(df['is_arrested'], errors='coerce').fillna(0) == 1)]
-        if len(high_risk) > 0:
-            insights.append(f"🚨 High-risk stops (searched & arrested): **{len(high_risk)}** ({len(high_risk)/len(df)*100:.1f}%)")
+    if metrics['high_risk'] > 0:
+        insights.append(f"🚨 High-risk stops (searched & arrested): **{metrics['high_risk']}** ({pct(metrics['high_risk']):.1f}%)")
     
     if insights:
         for insight in insights:
@@ -274,25 +384,15 @@ st.subheader("📊 Quick Metrics")
 c1, c2, c3 = st.columns(3)
 with c1:
     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-    st.metric("Total (shown)", len(df))
+    st.metric(f"Total ({summary_scope})", metrics['total'])
     st.markdown('</div>', unsafe_allow_html=True)
 with c2:
-    if 'is_arrested' in df.columns and not df.empty:
-        # Convert to numeric, handling boolean and string values
-        arrests = pd.to_numeric(df['is_arrested'], errors='coerce').fillna(0).astype(int).sum()
-    else:
-        arrests = 0
     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-    st.metric("Arrests (shown)", arrests)
+    st.metric(f"Arrests ({summary_scope})", metrics['arrests'])
     st.markdown('</div>', unsafe_allow_html=True)
 with c3:
-    if 'search_conducted' in df.columns and not df.empty:
-        # Convert to numeric, handling boolean and string values
-        searches = pd.to_numeric(df['search_conducted'], errors='coerce').fillna(0).astype(int).sum()
-    else:
-        searches = 0
     st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-    st.metric("Searches (shown)", searches)
+    st.metric(f"Searches ({summary_scope})", metrics['searches'])
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Violation distribution (fixed)
@@ -324,26 +424,27 @@ if 'stop_date' in df.columns and len(df) > 0:
 
 # Alerts: repeated vehicles (SQL-level)
 st.subheader("Automated Alerts")
-rep_sql = """
-SELECT vehicle_number, COUNT(*) as cnt
-FROM checkpost_stops
-WHERE vehicle_number IS NOT NULL
-  AND vehicle_number <> ''
-  AND stop_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-GROUP BY vehicle_number
-HAVING cnt >= 2
-ORDER BY cnt DESC
-LIMIT 50;
-"""
 try:
-    repeated = run_query(rep_sql)
-    if not repeated.empty:
-        st.warning("Repeated vehicle stops in last 30 days")
-        st.table(repeated)
-    else:
-        st.info("No repeated vehicle alerts in last 30 days")
-except Exception as e:
-    st.warning(f"Could not fetch repeated vehicle data: {e}")
+    # in-memory sliding windows, caught up by stop id on every rerun (see alerts.py)
+    engine = sched.result("Alert engine")
+    for rule in engine.rules():
+        repeated = engine.alerts(rule.name)
+        if not repeated.empty:
+            st.warning(f"Vehicles stopped {rule.min_count}+ times in last {rule.window_days} days")
+            st.table(repeated)
+        else:
+            st.info(f"No vehicles stopped {rule.min_count}+ times in last {rule.window_days} days")
+except Exception:
+    # engine could not warm-start: fall back to the SQL version
+    try:
+        repeated = run_query(REPEATED_VEHICLES_SQL, ttl=ANALYTICS_TTL)
+        if not repeated.empty:
+            st.warning("Repeated vehicle stops in last 30 days")
+            st.table(repeated)
+        else:
+            st.info("No repeated vehicle alerts in last 30 days")
+    except Exception as e:
+        st.warning(f"Could not fetch repeated vehicle data: {e}")
 
 # High-risk: searches that led to arrests
 try:
@@ -369,442 +470,68 @@ st.divider()
 
 st.header("📊 Advanced SQL Analytics Panels")
 
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-    "🚗 Vehicle-Based",
-    "🧑 Demographic-Based",
-    "⏱ Time & Duration Based",
-    "⚖️ Violation-Based",
-    "🌍 Location-Based",
-    "🔬 Complex Analytics"
-])
-
-with tab1:
-    st.subheader("Vehicle-Based Analytics")
-    q = st.selectbox("Choose query:", [
-        "Top 10 vehicles in drug-related stops",
-        "Vehicles most frequently searched"
-    ], key="vehicle_q")
-
-    if q == "Top 10 vehicles in drug-related stops":
-        sql = """
-        SELECT vehicle_number,
-               COUNT(*) AS drug_stop_count
-        FROM checkpost_stops
-        WHERE drugs_related_stop = 1
-        GROUP BY vehicle_number
-        ORDER BY drug_stop_count DESC
-        LIMIT 10;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🚗 Top 10 Drug-Related Vehicle Plates")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Vehicles most frequently searched":
-        sql = """
-        SELECT vehicle_number,
-               COUNT(*) AS searches
-        FROM checkpost_stops
-        WHERE search_conducted = 1
-        GROUP BY vehicle_number
-        ORDER BY searches DESC
-        LIMIT 20;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🚓 Vehicles Most Frequently Searched")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-with tab2:
-    st.subheader("Demographic-Based Analytics")
-    q = st.selectbox("Choose query:", [
-        "Age group with highest arrest rate",
-        "Gender distribution per country",
-        "Race + Gender with highest search rate"
-    ], key="demo_q")
-
-    if q == "Age group with highest arrest rate":
-        sql = """
-        SELECT age_group,
-               total_stops,
-               arrests,
-               ROUND(100.0 * arrests / NULLIF(total_stops,0), 2) AS arrest_rate_pct
-        FROM (
-          SELECT
-            CASE
-              WHEN driver_age < 18 THEN '<18'
-              WHEN driver_age BETWEEN 18 AND 24 THEN '18-24'
-              WHEN driver_age BETWEEN 25 AND 34 THEN '25-34'
-              WHEN driver_age BETWEEN 35 AND 44 THEN '35-44'
-              WHEN driver_age >= 45 THEN '45+'
-              ELSE 'Unknown'
-            END AS age_group,
-
-            
-            COUNT(*) AS total_stops,
-            SUM(is_arrested = 1) AS arrests
-          FROM checkpost_stops
-          WHERE driver_age IS NOT NULL
-          GROUP BY age_group
-        ) t
-        ORDER BY arrest_rate_pct DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🧑 Age Group with Highest Arrest Rate")
-            st.bar_chart(df2, x="age_group", y="arrest_rate_pct")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Gender distribution per country":
-        sql = """
-        SELECT country_name,
-               driver_gender,
-               COUNT(*) AS stops
-        FROM checkpost_stops
-        GROUP BY country_name, driver_gender
-        ORDER BY country_name, stops DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🧍 Gender Distribution by Country")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Race + Gender with highest search rate":
-        sql = """
-        SELECT driver_race, driver_gender,
-               COUNT(*) AS total_stops,
-               SUM(search_conducted = 1) AS searches,
-               ROUND(100.0 * SUM(search_conducted = 1) / NULLIF(COUNT(*),0),2) AS search_rate_pct
-        FROM checkpost_stops
-        GROUP BY driver_race, driver_gender
-        HAVING total_stops >= 10
-        ORDER BY search_rate_pct DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🧑 Race × Gender Search Rate")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-with tab3:
-    st.subheader("Time & Duration Based Analytics")
-    q = st.selectbox("Choose query:", [
-        "Hour of day with most stops",
-        "Average stop duration per violation",
-        "Are night stops more likely to lead to arrests?"
-    ], key="time_q")
-
-    if q == "Hour of day with most stops":
-        sql = """
-        SELECT HOUR(stop_time) AS hour_of_day,
-               COUNT(*) AS stops
-        FROM checkpost_stops
-        GROUP BY hour_of_day
-        ORDER BY stops DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🕒 Traffic Stops by Hour of Day")
-            st.bar_chart(df2, x="hour_of_day", y="stops")
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Average stop duration per violation":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS stops,
-               ROUND(AVG(
-                 CASE stop_duration
-                     WHEN '<5 minutes' THEN 2.5
-                     WHEN '6-15 minutes' THEN 10
-                     WHEN '16-30 minutes' THEN 23
-                     ELSE NULL
-                 END
-               ),1) AS avg_duration
-        FROM checkpost_stops
-        GROUP BY violation;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("⏱ Avg Stop Duration by Violation")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Are night stops more likely to lead to arrests?":
-        sql = """
-        SELECT period,
-               total_stops,
-               arrests,
-               ROUND(100.0 * arrests / NULLIF(total_stops,0),2) AS arrest_rate_pct
-        FROM (
-          SELECT
-            CASE WHEN HOUR(stop_time) BETWEEN 20 AND 23
-                      OR HOUR(stop_time) BETWEEN 0 AND 5 THEN 'Night'
-                 ELSE 'Day'
-            END AS period,
-            COUNT(*) AS total_stops,
-            SUM(is_arrested = 1) AS arrests
-          FROM checkpost_stops
-          GROUP BY period
-        ) t;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🌙 Night Arrest Probability")
-            st.bar_chart(df2, x="period", y="arrest_rate_pct")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-with tab4:
-    st.subheader("Violation-Based Analytics")
-    q = st.selectbox("Choose query:", [
-        "Violations linked to searches/arrests",
-        "Violations common among <25 drivers",
-        "Violations with almost no searches/arrests"
-    ], key="violation_q")
-
-    if q == "Violations linked to searches/arrests":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS total_stops,
-               SUM(search_conducted = 1) AS searches,
-               SUM(is_arrested = 1) AS arrests,
-               ROUND(100.0 * SUM(search_conducted = 1) / NULLIF(COUNT(*),0),2) AS search_rate_pct,
-               ROUND(100.0 * SUM(is_arrested = 1) / NULLIF(COUNT(*),0),2) AS arrest_rate_pct
-        FROM checkpost_stops
-        GROUP BY violation
-        ORDER BY search_rate_pct DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("⚖️ Search & Arrest Rates by Violation")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Violations common among <25 drivers":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS stops_under_25
-        FROM checkpost_stops
-        WHERE driver_age < 25
-        GROUP BY violation
-        ORDER BY stops_under_25 DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("👦 Violations Among Drivers <25")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Violations with almost no searches/arrests":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS total_stops,
-               SUM(search_conducted = 1) AS searches,
-               SUM(is_arrested = 1) AS arrests
-        FROM checkpost_stops
-        GROUP BY violation
-        HAVING total_stops >= 20
-        ORDER BY searches ASC, arrests ASC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🟢 Safe Violations (Rarely lead to search/arrest)")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-with tab5:
-    st.subheader("Location-Based Analytics")
-    q = st.selectbox("Choose query:", [
-        "Countries with highest drug-related stops",
-        "Arrest rate by country and violation",
-        "Countries with most searches"
-    ], key="location_q")
-
-    if q == "Countries with highest drug-related stops":
-        sql = """
-        SELECT country_name,
-               COUNT(*) AS total_stops,
-               SUM(drugs_related_stop = 1) AS drug_stops,
-               ROUND(100.0 * SUM(drugs_related_stop = 1) / NULLIF(COUNT(*),0),2) AS drug_rate
-        FROM checkpost_stops
-        GROUP BY country_name
-        ORDER BY drug_rate DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🌍 Drug-Related Stop Rates by Country")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Arrest rate by country and violation":
-        sql = """
-        SELECT country_name, violation,
-               COUNT(*) AS total_stops,
-               SUM(is_arrested = 1) AS arrests,
-               ROUND(100.0 * SUM(is_arrested = 1) / NULLIF(COUNT(*),0),2) AS arrest_rate
-        FROM checkpost_stops
-        GROUP BY country_name, violation
-        HAVING total_stops >= 10
-        ORDER BY arrest_rate DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("⚖️ Arrest Rate by Country & Violation")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Countries with most searches":
-        sql = """
-        SELECT country_name,
-               COUNT(*) AS total_stops,
-               SUM(search_conducted = 1) AS searches
-        FROM checkpost_stops
-        GROUP BY country_name
-        ORDER BY searches DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🔍 Search Volume by Country")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-with tab6:
-    st.subheader("Complex Analytics")
-    q = st.selectbox("Choose query:", [
-        "Yearly stops & arrests by country",
-        "Violation trends by age & race",
-        "Time period analysis (Year/Month/Hour)",
-        "High search/arrest rate violations",
-        "Driver demographics by country",
-        "Top 5 violations by arrest rate"
-    ], key="complex_q")
-
-    if q == "Yearly stops & arrests by country":
-        sql = """
-        WITH yearly AS (
-          SELECT
-            country_name,
-            YEAR(stop_date) AS year,
-            COUNT(*) AS stops,
-            SUM(is_arrested = 1) AS arrests
-          FROM checkpost_stops
-          GROUP BY country_name, YEAR(stop_date)
-        )
-        SELECT
-          country_name, year, stops, arrests,
-          ROUND(100.0 * arrests / NULLIF(stops,0),2) AS arrest_rate
-        FROM yearly
-        ORDER BY country_name, year DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("📅 Yearly Stops & Arrests by Country")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Violation trends by age & race":
-        sql = """
-        SELECT driver_age, driver_race, violation, COUNT(*) AS cnt
-        FROM checkpost_stops
-        WHERE driver_age IS NOT NULL
-        GROUP BY driver_age, driver_race, violation
-        ORDER BY cnt DESC
-        LIMIT 200;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("📈 Violation Trends (Age × Race)")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Time period analysis (Year/Month/Hour)":
-        sql = """
-        SELECT YEAR(stop_date) AS year,
-               MONTH(stop_date) AS month,
-               HOUR(stop_time) AS hour,
-               COUNT(*) AS stops
-        FROM checkpost_stops
-        GROUP BY year, month, hour
-        ORDER BY year DESC, month DESC, hour;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("⏱ Time Period Analysis")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "High search/arrest rate violations":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS total_stops,
-               SUM(search_conducted = 1) AS searches,
-               SUM(is_arrested = 1) AS arrests,
-               ROUND(100.0 * SUM(search_conducted = 1)/COUNT(*),2) AS search_rate,
-               ROUND(100.0 * SUM(is_arrested = 1)/COUNT(*),2) AS arrest_rate
-        FROM checkpost_stops
-        GROUP BY violation
-        ORDER BY search_rate DESC, arrest_rate DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🔥 High Search/Arrest Rate Violations")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Driver demographics by country":
-        sql = """
-        SELECT country_name,
-               COUNT(*) AS stops,
-               ROUND(AVG(driver_age),1) AS avg_age,
-               SUM(driver_gender='Male') AS male,
-               SUM(driver_gender='Female') AS female
-        FROM checkpost_stops
-        GROUP BY country_name
-        ORDER BY stops DESC;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("👥 Driver Demographics by Country")
-            st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
-
-    if q == "Top 5 violations by arrest rate":
-        sql = """
-        SELECT violation,
-               COUNT(*) AS total_stops,
-               SUM(is_arrested = 1) AS arrests,
-               ROUND(100.0 * SUM(is_arrested = 1)/COUNT(*),2) AS arrest_rate
-        FROM checkpost_stops
-        GROUP BY violation
-        ORDER BY arrest_rate DESC
-        LIMIT 5;
-        """
-        try:
-            df2 = run_query(sql)
-            st.subheader("🚨 Top 5 High-Arrest Violations")
+# One panel group at a time: unlike st.tabs, only the chosen group's body runs
+active = st.radio("Panel group", [t.name for t in TABS], horizontal=True, key="analytics_tab",
+                  label_visibility="collapsed")
+tab = tab_named(active)
+st.subheader(tab.heading)
+q = st.selectbox("Choose query:", tab.labels(), key=tab.key)
+st.button("↻ Refresh panel", key="panel_refresh",
+          help="Re-run this query now instead of reusing the result from the last data change")
+panel = PANELS[q]
+if streams(q):
+    # large results: render chunks as they arrive, stop reading (and kill the
+    # server query) once STREAM_DISPLAY_ROWS are on screen; exports get all rows
+    st.subheader(panel.title)
+    status, table_slot = st.empty(), st.empty()
+    shown = pd.DataFrame()
+    try:
+        with closing(run_query_chunks(analytics_sql(q), name=q)) as chunks:
+            for chunk in chunks:
+                shown = pd.concat([shown, chunk], ignore_index=True) if len(shown) else chunk
+                table_slot.dataframe(shown, use_container_width=True)
+                status.caption(f"{len(shown):,} rows loaded…")
+                if len(shown) >= STREAM_DISPLAY_ROWS:
+                    status.caption(f"Showing the first {len(shown):,} rows — export for the full result.")
+                    break
+            else:
+                status.caption(f"{len(shown):,} rows.")
+    except Exception as e:
+        st.warning(f"Query failed: {e}")
+    csv_col, parquet_col, _ = st.columns([1, 1, 4])
+    for fmt, col in (("csv", csv_col), ("parquet", parquet_col)):
+        if col.button(f"Export {fmt.upper()}", key=f"export_{fmt}"):
+            path = os.path.join(tempfile.gettempdir(),
+                                f"securecheck-{re.sub(r'[^a-z0-9]+', '-', q.lower()).strip('-')}.{fmt}")
+            try:
+                n = export_query(analytics_sql(q), path, name=f"export:{q}")
+                with open(path, "rb") as fh:
+                    col.download_button(f"Download {n:,} rows", fh, file_name=os.path.basename(path),
+                                        key=f"download_{fmt}")
+            except Exception as e:
+                st.warning(f"Export failed: {e}")
+else:
+    try:
+        sched.submit(q, load_panel, q)   # no-op unless the selection changed mid-rerun
+        df2 = sched.result(q)
+        st.subheader(panel.title)
+        if panel.chart is not None:
+            st.bar_chart(df2, x=panel.chart[0], y=panel.chart[1])
+        if panel.table:
             st.table(df2)
-        except Exception as e:
-            st.warning(f"Query failed: {e}")
+    except Exception as e:
+        st.warning(f"Query failed: {e}")
+
+# Where this rerun's time went: queries ran side by side, so the page waits
+# for the slowest one rather than the sum of all of them.
+with st.expander("⏱ Query timings (this rerun)"):
+    timing_summary = sched.summary()
+    st.write(f"Wall time {timing_summary['wall']*1000:.0f} ms vs {timing_summary['serial']*1000:.0f} ms "
+             f"if run one after another · finished last: {timing_summary['critical']}")
+    timings = pd.DataFrame(sched.timings())
+    if not timings.empty:
+        for col in ["queued", "start", "end", "wait", "seconds"]:
+            timings[col] = (timings[col] * 1000).round(1)
+        st.dataframe(timings.rename(columns={"queued": "queued_ms", "start": "start_ms", "end": "end_ms",
+                                             "wait": "wait_ms", "seconds": "run_ms"}),
+                     use_container_width=True)
@@ -0,0 +1,138 @@
+# streaming.py
+"""Stream large result sets in chunks instead of fetchall().
+
+run_query_chunks() reads through an unbuffered (server-side) pymysql
+cursor and yields one DataFrame per `chunk_rows` rows, so at most one chunk
+is in client memory. If the consumer stops early (generator closed, or
+the Streamlit script is interrupted by a rerun / navigation) the running
+statement is cancelled with KILL QUERY from a separate connection and the
+streaming connection is dropped rather than returned to the pool half-read.
+
+export_query() writes a result to CSV or Parquet chunk by chunk on top of
+the same cursor.
+"""
+import logging
+import os
+import time
+
+import pandas as pd
+import pymysql
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from arrow_fetch import iter_record_batches
+from db import DB_CONFIG, get_pool
+from instrumentation import get_recorder, new_call, query_name
+
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_ROWS = int(os.environ.get("SECURECHECK_STREAM_CHUNK_ROWS", "10000"))
+
+
+def cancel_query(thread_id):
+    """KILL QUERY on another connection (the streaming one is busy reading)."""
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("KILL QUERY %s", (thread_id,))
+    finally:
+        conn.close()
+
+
+def _stream(query, params, name, read):
+    """Run `query` on an unbuffered cursor and yield from read(cursor)."""
+    call = new_call(query_name(query, name), query, params)
+    started = time.perf_counter()
+    pool = get_pool()
+    conn = pool.acquire()
+    call["checkout_ms"] = (time.perf_counter() - started) * 1000
+    executing = finished = discard = False
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        mark = time.perf_counter()
+        executing = True
+        cursor.execute(query, params or ())
+        call["execute_ms"] = (time.perf_counter() - mark) * 1000
+        rows = 0
+        for item in read(cursor):
+            rows += item.num_rows if isinstance(item, pa.RecordBatch) else len(item)
+            call["rows"] = rows
+            yield item
+        finished = True
+    except GeneratorExit:
+        call["error"] = "cancelled"
+        raise
+    except Exception as e:
+        call["error"] = f"{type(e).__name__}: {e}"
+        discard = True
+        raise
+    finally:
+        if not finished:
+            # stopped part-way: stop the server from producing the rest, and
+            # don't let cursor.close() drain the remaining rows
+            discard = True
+            if executing:
+                try:
+                    if hasattr(conn, "interrupt"):      # sqlite_backend
+                        conn.interrupt()
+                    else:
+                        cancel_query(conn.thread_id())
+                except Exception as e:
+                    logger.warning("KILL QUERY failed, the statement may run on: %s", e)
+        else:
+            cursor.close()
+            conn.commit()
+        pool.release(conn, discard=discard)
+        call["total_ms"] = (time.perf_counter() - started) * 1000
+        call["fetch_ms"] = call["total_ms"] - call["checkout_ms"] - call["execute_ms"]
+        get_recorder().record(call)
+
+
+def run_query_chunks(query, params=None, chunk_rows=STREAM_CHUNK_ROWS, name=None):
+    """Yield the result of `query` as DataFrames of up to `chunk_rows` rows.
+
+    Close the generator (or use contextlib.closing) to stop early; the
+    server-side statement is then killed.
+    """
+    def read(cursor):
+        cols = [d[0] for d in cursor.description] if cursor.description else []
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=cols)
+
+    return _stream(query, params, name, read)
+
+
+def export_query(query, path, params=None, fmt=None, chunk_rows=STREAM_CHUNK_ROWS, name=None):
+    """Write the result of `query` to `path` (CSV or Parquet) without holding it in memory.
+
+    fmt defaults to the file extension. Returns the number of rows written
+    (an empty result leaves an empty CSV and writes no Parquet file).
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"unsupported export format: {fmt!r}")
+    rows = 0
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            for i, chunk in enumerate(run_query_chunks(query, params, chunk_rows, name)):
+                chunk.to_csv(fh, index=False, header=(i == 0))
+                rows += len(chunk)
+        return rows
+
+    writer = None
+    try:
+        for batch in _stream(query, params, name, lambda cursor: iter_record_batches(cursor, chunk_rows)):
+            if writer is None:
+                schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in batch.schema])
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(pa.Table.from_batches([batch]).cast(writer.schema))
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
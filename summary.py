@@ -0,0 +1,115 @@
+# summary.py
+"""Summary metrics (Prediction Summary, Key Insights, Quick Metrics).
+
+The metrics are computed by one aggregate query over the full filtered set
+(queries.SUMMARY_SQL). Once stops have been archived, the hot table is read
+as counts per (violation, gender, duration, outcome) instead and added to
+the same counts over the matching archived stops (archive.summary_partial).
+summarize_frame() computes the same dict from a DataFrame and is used in
+offline mode (SECURECHECK_SUMMARY=pandas) or when the aggregate query fails;
+it then only sees the rows that were fetched.
+"""
+import os
+
+import pandas as pd
+
+import archive
+from data_processing import to_boolean
+from db import run_query
+from queries import build_summary_partial_sql, build_summary_sql
+from violations import get_dictionary
+
+
+SUMMARY_MODE = os.environ.get("SECURECHECK_SUMMARY", "sql")
+
+COUNT_FIELDS = ("total", "arrests", "searches", "drug_stops", "high_risk", "top_gender_stops")
+
+
+def _empty():
+    out = dict.fromkeys(COUNT_FIELDS, 0)
+    out.update(avg_age=None, top_violation=None, top_gender=None, top_duration=None, top_outcome=None)
+    return out
+
+
+def summarize(conditions, params, ttl=None, filters=None):
+    """Run the aggregate query -> metrics dict (counts as int, avg_age float or None).
+
+    filters: the queries.filter_where() arguments `conditions` were built
+    from; when given and the archive has stops, the matching archived stops
+    are counted too.
+    """
+    if filters is not None and archive.cold_dataset() is not None:
+        sql, sql_params = build_summary_partial_sql(conditions, params)
+        hot = run_query(sql, tuple(sql_params), ttl=ttl, name="Summary (hot)")
+        return summarize_partial(pd.concat([hot, archive.summary_partial(archive.filter_expression(*filters))],
+                                           ignore_index=True))
+    sql, sql_params = build_summary_sql(conditions, params)
+    row = run_query(sql, tuple(sql_params), ttl=ttl, name="Summary").iloc[0]
+    out = _empty()
+    for field in COUNT_FIELDS:
+        out[field] = int(row[field] or 0)
+    out["avg_age"] = None if pd.isna(row["avg_age"]) else float(row["avg_age"])
+    for field in ("top_violation", "top_gender", "top_duration", "top_outcome"):
+        out[field] = None if pd.isna(row[field]) else str(row[field])
+    return out
+
+
+def _mode(s):
+    counts = s.value_counts()
+    return (counts.index[0], int(counts.iloc[0])) if len(counts) else (None, 0)
+
+
+def summarize_partial(partial):
+    """Metrics dict from per-group counts (queries.SUMMARY_PARTIAL_SQL rows, any number of parts)."""
+    out = _empty()
+    if partial.empty:
+        return out
+    sums = partial[["total", "age_sum", "age_count", "arrests", "searches", "drug_stops", "high_risk"]] \
+        .apply(pd.to_numeric).sum()
+    for field in ("total", "arrests", "searches", "drug_stops", "high_risk"):
+        out[field] = int(sums[field])
+    out["avg_age"] = float(sums["age_sum"] / sums["age_count"]) if sums["age_count"] else None
+    totals = pd.to_numeric(partial["total"])
+
+    def top(col):
+        keys = partial[col].astype(object).where(partial[col].notna(), None)
+        counts = totals.groupby(keys, dropna=False).sum().sort_values(ascending=False, kind="stable")
+        return counts.index[0], int(counts.iloc[0])
+
+    vid, _ = top("violation_id")
+    out["top_violation"] = get_dictionary().names().get(int(vid), "Unknown") if pd.notna(vid) else "Unknown"
+    for col, field in (("stop_duration", "top_duration"), ("stop_outcome", "top_outcome")):
+        value, _ = top(col)
+        out[field] = "Unknown" if value is None or pd.isna(value) else str(value)
+    genders = partial[partial["driver_gender"].notna()]
+    if len(genders):
+        counts = pd.to_numeric(genders["total"]).groupby(genders["driver_gender"].astype(object)).sum() \
+            .sort_values(ascending=False, kind="stable")
+        out["top_gender"], out["top_gender_stops"] = str(counts.index[0]), int(counts.iloc[0])
+    return out
+
+
+def summarize_frame(df):
+    """Same metrics as summarize(), computed in pandas from `df` (offline fallback)."""
+    out = _empty()
+    out["total"] = len(df)
+    if df.empty:
+        return out
+    if "driver_age" in df.columns:
+        avg_age = pd.to_numeric(df["driver_age"], errors="coerce").mean()
+        out["avg_age"] = None if pd.isna(avg_age) else float(avg_age)
+    flags = {}
+    for col, field in (("is_arrested", "arrests"), ("search_conducted", "searches"),
+                       ("drugs_related_stop", "drug_stops")):
+        if col in df.columns:
+            flags[col] = to_boolean(df[col]).fillna(False).astype(bool)
+            out[field] = int(flags[col].sum())
+    if "search_conducted" in flags and "is_arrested" in flags:
+        out["high_risk"] = int((flags["search_conducted"] & flags["is_arrested"]).sum())
+    for col, field in (("violation", "top_violation"), ("stop_duration", "top_duration"),
+                       ("stop_outcome", "top_outcome")):
+        if col in df.columns:
+            out[field] = _mode(df[col].astype(object).fillna("Unknown"))[0]
+    if "driver_gender" in df.columns:
+        out["top_gender"], out["top_gender_stops"] = _mode(df["driver_gender"])
+    return out
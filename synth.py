@@ -0,0 +1,110 @@
+# synth.py
+"""Synthetic traffic-stop rows shaped like the cleaned check-post CSV.
+
+Used by the benchmarks, and to fill a database or a CSV of any size
+without real data. Large sets are generated in chunks (each from its own
+seed) so 10M+ rows never sit in memory at once:
+
+    python synth.py csv stops.csv --rows 10000000
+    python synth.py load --rows 10000000          # into checkpost_stops (any DB backend)
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# values in the dashboard's vocabulary: the gender filter offers Male / Female
+# and the duration averages only know the three CASE buckets (queries.py)
+COUNTRIES = ["Canada", "India", "USA"]
+GENDERS = ["Male", "Female"]
+RACES = ["Asian", "Black", "Hispanic", "Other", "White"]
+VIOLATIONS = ["Speeding", "DUI", "Seatbelt", "Equipment", "Other"]
+OUTCOMES = ["Citation", "Warning", "Arrest", "Ticket"]
+DURATIONS = ["<5 minutes", "6-15 minutes", "16-30 minutes"]
+SEARCH_TYPES = ["Vehicle Search", "Frisk"]
+
+
+def _hhmmss(seconds):
+    parts = [seconds // 3600, seconds // 60 % 60, seconds % 60]
+    padded = [np.char.zfill(p.astype(str), 2) for p in parts]
+    return np.char.add(np.char.add(np.char.add(padded[0], ":"), np.char.add(padded[1], ":")), padded[2])
+
+
+SYNTH_CHUNK_ROWS = 500_000
+
+
+def make_stops(n, seed=0, plates=None):
+    """Return a DataFrame of `n` synthetic (already clean) stop rows.
+
+    Plates are drawn from `plates` distinct values (default n // 3), so
+    repeated vehicles show up at every size.
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2020-01-01")
+    days = rng.integers(0, 5 * 365, n)
+    seconds = rng.integers(0, 24 * 3600, n)
+    searched = rng.random(n) < 0.1
+    df = pd.DataFrame({
+        "stop_date": (start + days).astype(str),
+        "stop_time": _hhmmss(seconds),
+        "country_name": rng.choice(COUNTRIES, n),
+        "driver_gender": rng.choice(GENDERS, n),
+        "driver_age": rng.integers(16, 80, n),
+        "driver_race": rng.choice(RACES, n),
+        "violation": rng.choice(VIOLATIONS, n),
+        "search_conducted": searched,
+        "search_type": np.where(searched, rng.choice(SEARCH_TYPES, n), None),
+        "stop_outcome": rng.choice(OUTCOMES, n),
+        "is_arrested": rng.random(n) < 0.05,
+        "stop_duration": rng.choice(DURATIONS, n),
+        "drugs_related_stop": rng.random(n) < 0.03,
+        "vehicle_number": np.char.add("TN", rng.integers(10_000, 10_000 + (plates or max(n // 3, 10)), n).astype(str)),
+    })
+    return df
+
+
+def iter_stops(n, chunk_rows=SYNTH_CHUNK_ROWS, seed=0):
+    """Yield `n` synthetic stops as DataFrames of up to `chunk_rows` rows.
+
+    The plate pool is sized for the whole set, not per chunk.
+    """
+    plates = max(n // 3, 10)
+    for i, start in enumerate(range(0, n, chunk_rows)):
+        yield make_stops(min(chunk_rows, n - start), seed=seed + i, plates=plates)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("command", choices=["csv", "load"])
+    ap.add_argument("path", nargs="?", help="csv: output file")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--chunk-rows", type=int, default=SYNTH_CHUNK_ROWS)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--table", default="checkpost_stops")
+    args = ap.parse_args()
+    if args.command == "csv" and not args.path:
+        ap.error("csv needs an output path")
+
+    started = time.perf_counter()
+    done = 0
+    if args.command == "csv":
+        with open(args.path, "w", newline="", encoding="utf-8") as fh:
+            for i, chunk in enumerate(iter_stops(args.rows, args.chunk_rows, args.seed)):
+                chunk.to_csv(fh, index=False, header=(i == 0))
+                done += len(chunk)
+                print(f"{done:,} / {args.rows:,} rows", end="\r")
+    else:
+        from db import insert_dataframe_to_table    # only the load needs a database
+        import rollups  # noqa: F401  (its write listener keeps the daily rollup in step)
+        import violations  # noqa: F401  (fills violation_id on insert)
+        for chunk in iter_stops(args.rows, args.chunk_rows, args.seed):
+            done += insert_dataframe_to_table(chunk, args.table)["inserted"]
+            print(f"{done:,} / {args.rows:,} rows", end="\r")
+    seconds = time.perf_counter() - started
+    print(f"\n{done:,} rows in {seconds:.1f}s ({done / seconds:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
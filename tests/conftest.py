@@ -0,0 +1,71 @@
+# tests/conftest.py
+"""Shared fixtures: every test that touches the database gets a fresh SQLite file.
+
+The app modules read SECURECHECK_* at import time, so the backend is set
+here before any of them is imported; `sqlite_db` then points db.py at a
+per-test file and drops the process-wide singletons (pool, query cache,
+violation dictionary, plate index, alert engine) so no state leaks
+between tests.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["SECURECHECK_DB_BACKEND"] = "sqlite"
+os.environ["SECURECHECK_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="securecheck-tests-"), "unused.sqlite")
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Migrated, empty SQLite database; yields its path."""
+    import alerts
+    import db
+    import db_schema
+    import plate_search
+    import query_cache
+    import violations
+
+    path = str(tmp_path / "securecheck.sqlite")
+    monkeypatch.setattr(db, "SQLITE_PATH", path)
+    monkeypatch.setattr(db, "_pool", None)
+    monkeypatch.setattr(query_cache, "_cache", None)
+    monkeypatch.setattr(violations, "_dictionary", None)
+    monkeypatch.setattr(plate_search, "_index", None)
+    monkeypatch.setattr(alerts, "_engine", None)
+    db_schema.migrate(verbose=False)
+    yield path
+    db.get_pool().close_all()
+
+
+@pytest.fixture
+def stops():
+    """make(n, seed=0) -> n cleaned synthetic stops (compact schema)."""
+    from data_processing import load_and_clean
+    from synth import make_stops
+
+    def make(n, seed=0, **kwargs):
+        return load_and_clean(make_stops(n, seed=seed, **kwargs))
+    return make
+
+
+def run_in_other_process(db_path, code):
+    """Run `code` in a fresh interpreter against the same SQLite file (a second app process)."""
+    import subprocess
+    import textwrap
+
+    env = dict(os.environ, SECURECHECK_DB_BACKEND="sqlite", SECURECHECK_SQLITE_PATH=db_path)
+    script = f"import sys; sys.path.insert(0, {ROOT!r})\n" + textwrap.dedent(code)
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, cwd=ROOT)
+
+
+INSERT_SYNTH_STOPS = """
+    import ingest  # noqa: F401  (registers the rollup / violation write hooks like the CLI)
+    from data_processing import load_and_clean
+    from db import insert_dataframe_to_table
+    from synth import make_stops
+    insert_dataframe_to_table(load_and_clean(make_stops({n}, seed={seed})), "checkpost_stops")
+"""
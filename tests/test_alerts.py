@@ -0,0 +1,65 @@
+# tests/test_alerts.py
+from datetime import date, timedelta
+
+import pandas as pd
+
+import alerts
+from alerts import AlertEngine, AlertRule, get_alert_engine
+from conftest import run_in_other_process
+from db import get_pool, insert_dataframe_to_table, notify_table_changed
+
+
+def _visits(plates, days_ago=1):
+    day = date.today() - timedelta(days=days_ago)
+    return pd.DataFrame({"stop_date": [day] * len(plates), "stop_time": ["10:00:00"] * len(plates),
+                         "country_name": ["India"] * len(plates), "vehicle_number": plates})
+
+
+def _flagged(engine):
+    return dict(engine.alerts("repeated_vehicles").itertuples(index=False))
+
+
+def test_window_slides_and_threshold_applies():
+    today = date(2024, 3, 31)
+    engine = AlertEngine([AlertRule("r", min_count=2, window_days=30)], today=today)
+    engine.add({(today - timedelta(days=29), "A"): 1, (today - timedelta(days=1), "A"): 1,
+                (today, "B"): 1}, today=today)
+    assert list(engine.alerts("r", today=today)["vehicle_number"]) == ["A"]
+    # a day later the older visit of A has left the 30-day window
+    assert engine.alerts("r", today=today + timedelta(days=2)).empty
+    assert not engine.is_flagged("r", "A")
+
+
+def test_local_inserts_are_counted_once(sqlite_db):
+    engine = get_alert_engine()
+    insert_dataframe_to_table(_visits(["TN1", "TN1", "TN2"]), "checkpost_stops")
+    assert _flagged(get_alert_engine()) == {"TN1": 2}
+    assert get_alert_engine() is engine
+    assert _flagged(get_alert_engine()) == {"TN1": 2}
+
+
+def test_inserts_from_another_process_are_caught_up(sqlite_db):
+    insert_dataframe_to_table(_visits(["TN1"]), "checkpost_stops")
+    assert _flagged(get_alert_engine()) == {}
+    run_in_other_process(sqlite_db, """
+        import pandas as pd
+        from datetime import date, timedelta
+        from db import insert_dataframe_to_table
+        day = date.today() - timedelta(days=3)
+        insert_dataframe_to_table(pd.DataFrame({"stop_date": [day, day], "vehicle_number": ["TN1", "TN9"]}),
+                                  "checkpost_stops")
+    """)
+    assert _flagged(get_alert_engine()) == {"TN1": 2}
+
+
+def test_deletes_trigger_a_rebuild(sqlite_db):
+    insert_dataframe_to_table(_visits(["TN1", "TN1"]), "checkpost_stops")
+    assert _flagged(get_alert_engine()) == {"TN1": 2}
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM checkpost_stops WHERE id = (SELECT MIN(id) FROM checkpost_stops)")
+        conn.commit()
+        cursor.close()
+    notify_table_changed("checkpost_stops")
+    assert alerts._engine.stale
+    assert _flagged(get_alert_engine()) == {}
@@ -0,0 +1,102 @@
+# tests/test_archive.py
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import archive
+from db import insert_dataframe_to_table, run_query
+from queries import ANALYTICS_QUERIES, filter_where
+
+TODAY = date(2023, 1, 1)            # synthetic stops run 2020-2024: about 60% get archived
+# panels with a LIMIT: ties may pick other rows, so only the measure is compared
+LIMITED = {"Top 10 vehicles in drug-related stops": "drug_stop_count", "Vehicles most frequently searched": "searches",
+           "Violation trends by age & race": "cnt", "Top 5 violations by arrest rate": "arrest_rate"}
+
+
+@pytest.fixture
+def loaded(sqlite_db, stops, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    archive._forget_cold()
+    df = stops(3_000)
+    insert_dataframe_to_table(df, "checkpost_stops")
+    yield df
+    archive._forget_cold()
+
+
+def _count(where=""):
+    return int(run_query(f"SELECT COUNT(*) AS n FROM checkpost_stops {where}", ttl=0)["n"].iloc[0])
+
+
+def _panels():
+    from panels import load_panel
+    return {label: load_panel(label, refresh=True) for label in ANALYTICS_QUERIES}
+
+
+def _same(label, before, after):
+    if label in LIMITED:
+        col = LIMITED[label]
+        assert sorted(before[col].tolist()) == sorted(after[col].tolist()), label
+        return
+    key = list(before.columns)
+    pd.testing.assert_frame_equal(after[key].sort_values(key, na_position="first").reset_index(drop=True),
+                                  before.sort_values(key, na_position="first").reset_index(drop=True),
+                                  check_dtype=False, obj=label)
+
+
+def test_old_stops_move_to_parquet_with_their_violation_ids(loaded):
+    old = _count("WHERE stop_date < '2023-01-01'")
+    run = archive.archive(horizon_days=0, today=TODAY)
+    assert run["rows"] == run["deleted"] == old
+    assert _count() == len(loaded) - old
+    assert archive.archived_before() == "2023-01-01"
+    cold = pd.concat(t.to_pandas() for t in archive.scan_cold(["violation", "violation_id"]))
+    assert len(cold) == old and cold["violation_id"].notna().all()
+    from violations import get_dictionary
+    names = get_dictionary().names()
+    assert (cold["violation_id"].map(lambda i: names[int(i)]) == cold["violation"].astype(str)).all()
+
+
+def test_every_panel_counts_archived_stops(loaded):
+    import rollups
+
+    before = _panels()
+    archive.archive(horizon_days=0, today=TODAY)
+    after = _panels()
+    for label in ANALYTICS_QUERIES:
+        _same(label, before[label], after[label])
+    # a rebuilt rollup folds the archive back in, ids included
+    rollups.rebuild()
+    for label, df in _panels().items():
+        _same(label, before[label], df)
+
+
+@pytest.mark.parametrize("filters", [
+    (),
+    (date(2021, 6, 1), date(2023, 6, 30), "All", "", "", "All"),
+    (date(2020, 1, 1), date(2024, 12, 31), "Female", "speed", "", "True"),
+    (None, None, "All", "", "TN10050", "All"),
+])
+def test_summary_counts_archived_stops(loaded, filters):
+    from summary import summarize
+
+    conditions, params = filter_where(*filters)
+    before = summarize(conditions, params, ttl=0)
+    archive.archive(horizon_days=0, today=TODAY)
+    after = summarize(conditions, params, ttl=0, filters=filters)
+    assert before["total"] > 0
+    for field in ("total", "arrests", "searches", "drug_stops", "high_risk"):
+        assert after[field] == before[field], field
+    assert after["avg_age"] == pytest.approx(before["avg_age"])
+    if not filters:
+        for field in ("top_violation", "top_gender", "top_gender_stops", "top_duration", "top_outcome"):
+            assert after[field] == before[field], field
+
+
+def test_refuses_to_archive_when_raw_panels_would_miss_the_cold_tier(loaded, monkeypatch):
+    monkeypatch.setattr(archive, "USE_ROLLUPS", False)
+    with pytest.raises(RuntimeError, match="SECURECHECK_USE_ROLLUPS"):
+        archive.archive(horizon_days=0, today=TODAY)
+    assert _count() == len(loaded) and archive.cold_dataset() is None
+    monkeypatch.setattr(archive, "ANALYTICS_BACKEND", "duckdb")     # its snapshot reads both tiers
+    archive.check_readers()
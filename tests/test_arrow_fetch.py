@@ -0,0 +1,44 @@
+# tests/test_arrow_fetch.py
+import sqlite3
+from datetime import date
+
+import pyarrow as pa
+import pytest
+from pymysql.constants import FIELD_TYPE
+
+from arrow_fetch import arrow_schema, combine_batches, inline_params, iter_record_batches, to_frame
+
+
+def test_inline_params_binds_only_placeholders():
+    sql = ("SELECT * FROM t WHERE violation LIKE '%speed%' AND stop_date = %s "
+           "AND note = '100%%' AND DATE_FORMAT(stop_date, '%Y') = %s AND n %% 2 = %s")
+    assert inline_params(sql, [date(2024, 1, 2), "2024", 1]) == (
+        "SELECT * FROM t WHERE violation LIKE '%speed%' AND stop_date = '2024-01-02' "
+        "AND note = '100%' AND DATE_FORMAT(stop_date, '%Y') = '2024' AND n % 2 = 1")
+    assert inline_params("SELECT '%s'", None) == "SELECT '%s'"
+    assert inline_params("SELECT %s", ["it's"]) == "SELECT 'it\\'s'"
+
+
+def test_inline_params_counts_arguments():
+    with pytest.raises(TypeError):
+        inline_params("SELECT %s, %s", [1])
+    with pytest.raises(TypeError):
+        inline_params("SELECT %s", [1, 2])
+
+
+def test_record_batches_from_a_cursor():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (n INTEGER, name TEXT, note TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, NULL)", [(i, f"v{i}") for i in range(7)])
+    cursor = conn.execute("SELECT n, name, note FROM t ORDER BY n")
+    batches = list(iter_record_batches(cursor, batch_rows=3))
+    assert [b.num_rows for b in batches] == [3, 3, 1]
+    table = combine_batches(batches, ["n", "name", "note"])
+    df = to_frame(table)
+    assert df["n"].tolist() == list(range(7)) and df["note"].isna().all()
+    assert combine_batches([], ["a"]).column_names == ["a"]
+
+
+def test_mysql_types_map_to_arrow():
+    fields = arrow_schema([("d", FIELD_TYPE.DATE), ("x", FIELD_TYPE.NEWDECIMAL), ("g", 255)])
+    assert fields == [("d", pa.date32()), ("x", pa.float64()), ("g", None)]
@@ -0,0 +1,61 @@
+# tests/test_backfill.py
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from backfill import backfill, split_ranges
+from data_processing import load_and_clean
+from synth import make_stops
+
+CHUNK = 16 * 1024
+
+
+@pytest.fixture
+def exports(tmp_path):
+    paths = []
+    for seed, n in ((1, 900), (2, 400)):
+        path = tmp_path / f"export-{seed}.csv"
+        make_stops(n, seed=seed).to_csv(path, index=False)
+        paths.append(str(path))
+    return paths
+
+
+def test_ranges_cover_the_file_on_line_breaks(exports):
+    header, ranges = split_ranges(exports[0], CHUNK)
+    with open(exports[0], "rb") as fh:
+        data = fh.read()
+    assert len(ranges) > 3 and data.startswith(header)
+    assert ranges[0][0] == len(header) and ranges[-1][1] == len(data)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+
+
+def test_parallel_csv_matches_a_serial_clean(exports, tmp_path):
+    out = str(tmp_path / "cleaned.csv")
+    report = backfill(exports, out=out, workers=2, chunk_bytes=CHUNK, max_in_flight=3)
+    assert report["rows"] == 1_300 and report["peak_in_flight"] <= 3
+    serial = pd.concat([load_and_clean(pd.read_csv(p), compact=False) for p in exports], ignore_index=True)
+    serial.to_csv(tmp_path / "serial.csv", index=False)
+    pd.testing.assert_frame_equal(pd.read_csv(out), pd.read_csv(tmp_path / "serial.csv"))
+
+
+def test_parquet_keeps_input_order(exports, tmp_path):
+    out = str(tmp_path / "cleaned.parquet")
+    backfill(exports, out=out, workers=2, chunk_bytes=CHUNK)
+    plates = pq.read_table(out, columns=["vehicle_number"]).column(0).to_pylist()
+    expected = pd.concat([pd.read_csv(p)["vehicle_number"] for p in exports]).tolist()
+    assert plates == expected
+
+
+def test_partitioned_dataset_has_every_row(exports, tmp_path):
+    root = str(tmp_path / "dataset")
+    report = backfill(exports, partitioned=root, workers=2, chunk_bytes=CHUNK)
+    assert ds.dataset(root, format="parquet", partitioning="hive").count_rows() == report["rows"] == 1_300
+
+
+def test_needs_exactly_one_destination(exports, tmp_path):
+    with pytest.raises(ValueError):
+        backfill(exports)
+    with pytest.raises(ValueError):
+        backfill(exports, out=str(tmp_path / "a.csv"), partitioned=str(tmp_path / "b"))
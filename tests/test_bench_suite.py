@@ -0,0 +1,42 @@
+# tests/test_bench_suite.py
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+import bench_suite  # noqa: E402
+
+
+def _run(stages):
+    return {"created": "x", "results": [
+        {"stage": stage, "rows": 100, "p50_ms": p50, "peak_rss_mb": 10.0} for stage, p50 in stages]}
+
+
+def test_percentiles_interpolate():
+    assert bench_suite.percentile([4, 1, 3, 2], 50) == 2.5
+    assert bench_suite.percentile([5], 99) == 5
+
+
+def test_compare_flags_only_real_slowdowns(capsys):
+    baseline = _run([("clean", 100.0), ("query:a", 0.5), ("query:b", 20.0)])
+    current = _run([("clean", 130.0), ("query:a", 0.9), ("query:b", 10.0), ("query:new", 1.0)])
+    assert bench_suite.compare(baseline, current, threshold=10) == ["clean"]     # query:a: under 1 ms
+    out = capsys.readouterr().out
+    assert "faster" in out and "new" in out
+
+
+def test_a_small_run_covers_every_stage(tmp_path):
+    out = tmp_path / "run.json"
+    subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "bench_suite.py"), "--sizes", "400",
+                    "--repeat", "1", "--ingest-repeat", "1", "--out", str(out)],
+                   check=True, cwd=str(tmp_path), capture_output=True, timeout=300)
+    doc = json.loads(out.read_text())
+    stages = {r["stage"] for r in doc["results"]}
+    assert {"csv_parse", "clean", "bulk_insert", "alert_engine", "plate_search"} <= stages
+    assert sum(s.startswith("query:") for s in stages) >= 10
+    assert all(r["rows"] == 400 and r["p50_ms"] >= 0 for r in doc["results"])
+    assert subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "bench_suite.py"),
+                           "--compare", str(out), str(out)], capture_output=True).returncode == 0
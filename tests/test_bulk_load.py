@@ -0,0 +1,50 @@
+# tests/test_bulk_load.py
+import datetime
+import sqlite3
+
+import pandas as pd
+
+from bulk_load import bulk_insert, frame_to_rows
+
+
+def test_frame_to_rows_uses_positions_not_labels():
+    df = pd.DataFrame({
+        "d": pd.to_datetime(["2020-01-01", None, "2020-01-03"]),
+        "t": pd.to_timedelta(["01:00:00", None, "02:00:00"]),
+        "n": pd.array([1, None, 3], dtype="Int8"),
+        "c": pd.Categorical(["x", None, "y"]),
+    }, index=[10, 11, 12])
+    rows = frame_to_rows(df)
+    assert rows[0] == (datetime.datetime(2020, 1, 1), datetime.timedelta(hours=1), 1, "x")
+    assert rows[1] == (None, None, None, None)
+    assert rows[2][0] == datetime.datetime(2020, 1, 3)
+    assert type(rows[2][2]) is int
+
+
+def test_bulk_insert_quarantines_only_bad_rows(caplog):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    df = pd.DataFrame({"id": [1, 2, 3, 4, 5], "name": ["a", "b", None, "d", "e"]}, index=range(100, 105))
+    report = bulk_insert(conn, df, "t", batch_size=2)
+    assert (report["inserted"], report["failed"], report["chunks"]) == (4, 1, 3)
+    assert list(report["quarantine"].index) == [102]
+    assert "Row 102 of t quarantined" in caplog.text
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 4
+
+
+def test_multi_batch_insert_keeps_dates(sqlite_db, stops):
+    from db import insert_dataframe_to_table, run_query
+
+    df = stops(12_000)
+    df.index = pd.RangeIndex(5_000, 17_000)           # like an ingest chunk deep into a file
+    report = insert_dataframe_to_table(df, "checkpost_stops", batch_size=5_000)
+    assert report["inserted"] == 12_000 and report["chunks"] == 3
+    stored = run_query("SELECT COUNT(*) AS n, COUNT(stop_date) AS dated, COUNT(stop_time) AS timed "
+                       "FROM checkpost_stops", ttl=0)
+    assert stored.iloc[0].tolist() == [12_000, 12_000, 12_000]
+    # the rollup is fed from the DataFrame; it must agree with the raw rows
+    raw = run_query("SELECT CAST(strftime('%Y', stop_date) AS INTEGER) AS y, COUNT(*) AS n "
+                    "FROM checkpost_stops GROUP BY y ORDER BY y", ttl=0)
+    rolled = run_query("SELECT CAST(strftime('%Y', stop_date) AS INTEGER) AS y, SUM(n_stops) AS n "
+                       "FROM checkpost_stops_daily GROUP BY y ORDER BY y", ttl=0)
+    assert raw["n"].tolist() == rolled["n"].tolist()
@@ -0,0 +1,52 @@
+# tests/test_change_feed.py
+import pytest
+
+from change_feed import ChangeFeed
+from db import insert_dataframe_to_table, run_query
+
+
+@pytest.fixture
+def insert(sqlite_db, stops):
+    def insert(n, seed=0, ids=None):
+        df = stops(n, seed=seed)
+        if ids is not None:
+            df.insert(0, "id", ids)
+        insert_dataframe_to_table(df, "checkpost_stops")
+    return insert
+
+
+def _newest(n, where=""):
+    return run_query(f"SELECT id FROM checkpost_stops{where} ORDER BY id DESC LIMIT {n}", ttl=0)["id"].tolist()
+
+
+def test_seeds_then_fetches_only_new_stops(insert):
+    feed = ChangeFeed(max_rows=50)
+    assert feed.refresh()["new_rows"] == 0 and feed.high_water is None
+    insert(80)
+    first = feed.refresh()
+    assert first["new_rows"] == 50 and first["high_water"] == 80
+    assert first["rows"]["id"].tolist() == _newest(50)
+    assert feed.refresh()["new_rows"] == 0
+    insert(7, seed=1)
+    again = feed.refresh()
+    assert again["new_rows"] == 7 and again["rows"]["id"].tolist() == _newest(50)
+
+
+def test_filters_move_the_mark_past_non_matching_arrivals(insert):
+    feed = ChangeFeed(["driver_gender = %s"], ["Female"], max_rows=1_000)
+    insert(60)
+    insert(40, seed=2)
+    result = feed.refresh()
+    assert result["rows"]["id"].tolist() == _newest(1_000, " WHERE driver_gender = 'Female'")
+    assert result["high_water"] == 100
+
+
+def test_late_commits_below_the_mark_are_picked_up(insert):
+    feed = ChangeFeed(max_rows=100)
+    insert(10, ids=list(range(1, 11)))
+    insert(1, seed=1, ids=[12])
+    assert feed.refresh()["high_water"] == 12
+    insert(1, seed=2, ids=[11])                       # id taken earlier, committed after the refresh
+    result = feed.refresh()
+    assert result["new_rows"] == 1
+    assert result["rows"]["id"].tolist() == list(range(12, 0, -1))
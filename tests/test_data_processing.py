@@ -0,0 +1,92 @@
+# tests/test_data_processing.py
+import pandas as pd
+import pytest
+
+from data_processing import BOOL_LOOKUP, load_and_clean
+
+
+def test_chunk_without_any_parseable_time_still_compacts():
+    raw = pd.DataFrame({"stop_date": ["2020-01-01", "2020-01-02"], "stop_time": ["zz", "yy"],
+                        "country_name": ["India", "USA"]})
+    cleaned = load_and_clean(raw)
+    assert str(cleaned["stop_time"].dtype) == "timedelta64[ns]"
+    assert cleaned["stop_time"].isna().all()
+    assert cleaned["stop_date"].notna().all()
+
+
+def test_chunk_without_any_parseable_date_still_compacts():
+    raw = pd.DataFrame({"stop_date": ["not a date", "??"], "stop_time": ["10:00", "11:30:00"]})
+    cleaned = load_and_clean(raw)
+    assert str(cleaned["stop_date"].dtype) == "datetime64[ns]"
+    assert cleaned["stop_date"].isna().all()
+    assert cleaned["stop_time"].tolist() == [pd.Timedelta(hours=10), pd.Timedelta(hours=11, minutes=30)]
+
+
+def _legacy_load_and_clean(df):
+    """The row-wise cleaner load_and_clean replaced (kept here as the reference)."""
+    df = df.copy().dropna(axis=1, how='all')
+    df.columns = [c.strip().lower() for c in df.columns]
+    df['stop_date'] = pd.to_datetime(df['stop_date'], errors='coerce').dt.date
+    df['stop_time'] = pd.to_datetime(df['stop_time'], errors='coerce').dt.time
+    df['driver_age'] = pd.to_numeric(df['driver_age_raw'], errors='coerce').astype('Int64')
+    for c in ['search_conducted', 'is_arrested', 'drugs_related_stop']:
+        df[c] = df[c].map(BOOL_LOOKUP).astype('boolean')
+
+    def map_violation(s):
+        if pd.isna(s):
+            return None
+        s0 = str(s).lower()
+        if 'speed' in s0:
+            return 'Speeding'
+        if 'dui' in s0 or 'drunk' in s0:
+            return 'DUI'
+        if 'seat' in s0:
+            return 'Seatbelt'
+        if 'equipment' in s0:
+            return 'Equipment'
+        return s.strip().title()
+    df['violation'] = df['violation_raw'].apply(map_violation)
+    for c in ['country_name', 'driver_gender', 'driver_race', 'stop_outcome', 'stop_duration']:
+        df[c] = df[c].fillna('Unknown')
+    df['needs_review'] = (df['stop_date'].isna() & df['stop_time'].isna()).astype('boolean')
+    return df
+
+
+@pytest.mark.parametrize("dates, times", [
+    (["2020-01-05", "2021-12-31", None, "bad", "2020-01-05"], ["14:30", "09:05:10", None, "x", "14:30"]),
+    (["05/01/2020", "12/31/2021", "", None, "01/02/2022"], ["2:30 PM", "23:59", None, "noon?", "2:30 PM"]),
+])
+def test_vectorized_cleaning_matches_the_row_wise_version(dates, times):
+    raw = pd.DataFrame({
+        "Stop_Date ": dates, "stop_time": times,
+        "country_name": ["India", None, "USA", "India", "Canada"],
+        "driver_gender": ["M", "F", None, "F", "M"],
+        "driver_race": ["Asian", None, "White", "Black", "Other"],
+        "stop_outcome": ["Warning", "Arrest", None, "Ticket", "Warning"],
+        "stop_duration": ["0-15 Min", None, "30+ Min", "16-30 Min", "0-15 Min"],
+        "driver_age_raw": ["27", "x", None, 65, "19"],
+        "violation_raw": ["Speeding ", "drunk driving", None, "seat belt", "  other thing"],
+        "search_conducted": ["True", "0", None, 1, False],
+        "is_arrested": ["false", "1", "maybe", 0, True],
+        "drugs_related_stop": [False, True, None, "true", "0"],
+        "empty": [None] * 5,
+    })
+    got = load_and_clean(raw, compact=False)
+    pd.testing.assert_frame_equal(got, _legacy_load_and_clean(raw), check_dtype=False)
+
+
+def test_compact_schema_dtypes_and_saving():
+    from data_processing import STOP_SCHEMA, memory_report
+    from synth import make_stops
+
+    raw = make_stops(5_000, seed=2)
+    loose, compact = load_and_clean(raw, compact=False), load_and_clean(raw)
+    for col in compact.columns:
+        if col in STOP_SCHEMA:
+            assert compact[col].dtype == STOP_SCHEMA[col], col
+    report = memory_report(loose, compact)
+    assert report.loc["TOTAL", "ratio"] > 3
+    # the values survive the casts
+    assert compact["stop_date"].dt.date.tolist() == loose["stop_date"].tolist()
+    assert compact["driver_age"].astype("Int64").tolist() == loose["driver_age"].tolist()
+    assert compact["is_arrested"].tolist() == loose["is_arrested"].tolist()
@@ -0,0 +1,84 @@
+# tests/test_db.py
+import logging
+import threading
+import time
+
+import pytest
+
+import db
+from db import insert_dataframe_to_table, on_table_write, run_query
+
+
+def _count():
+    return int(run_query("SELECT COUNT(*) AS n FROM checkpost_stops", ttl=0)["n"].iloc[0])
+
+
+def test_failing_write_listener_is_logged_and_reported(sqlite_db, stops, monkeypatch, caplog):
+    monkeypatch.setattr(db, "_write_listeners", list(db._write_listeners))
+
+    def broken_listener(table_name, inserted):
+        raise ValueError("no room")
+
+    on_table_write(broken_listener)
+    with caplog.at_level(logging.ERROR, logger="db"):
+        report = insert_dataframe_to_table(stops(300), "checkpost_stops", batch_size=100)
+    assert report["inserted"] == 300 and _count() == 300       # the rows still commit
+    assert report["listener_errors"] == ["test_db.broken_listener: ValueError: no room"] * 3
+    assert "broken_listener failed for checkpost_stops" in caplog.text
+
+
+def test_writes_invalidate_cached_reads(sqlite_db, stops):
+    sql = "SELECT COUNT(*) AS n FROM checkpost_stops"
+    assert int(run_query(sql)["n"].iloc[0]) == 0
+    report = insert_dataframe_to_table(stops(50), "checkpost_stops")
+    assert report["listener_errors"] == []
+    assert int(run_query(sql)["n"].iloc[0]) == 50
+
+
+def _pool(sqlite_db, **kwargs):
+    return db.ConnectionPool(**{"size": 2, "timeout": 0.2, **kwargs})
+
+
+def test_pool_reuses_connections_and_bounds_them(sqlite_db):
+    pool = _pool(sqlite_db)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as again:
+        assert again is first
+    a, b = pool.acquire(), pool.acquire()
+    with pytest.raises(db.PoolTimeout):
+        pool.acquire()
+    threading.Timer(0.05, pool.release, args=(a,)).start()
+    assert pool.acquire(timeout=5) is a                      # a waiter gets the released connection
+    stats = pool.stats()
+    assert (stats["hits"], stats["misses"], stats["in_use"]) == (3, 2, 2)
+    assert stats["waits"] == 2 and stats["wait_time_max"] > 0
+    pool.release(a)
+    pool.release(b)
+    pool.close_all()
+
+
+def test_pool_drops_stale_and_dead_connections(sqlite_db):
+    pool = _pool(sqlite_db, max_idle=0.01)
+    conn = pool.acquire()
+    pool.release(conn)
+    time.sleep(0.05)
+    assert pool.acquire() is not conn and pool.stats()["evicted_idle"] == 1
+
+    pool = _pool(sqlite_db)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()                                             # e.g. the server went away
+    assert pool.acquire() is not conn
+    assert pool.stats()["failed_health_checks"] == 1
+
+
+def test_pool_rolls_back_on_error(sqlite_db):
+    pool = _pool(sqlite_db)
+    with pytest.raises(ZeroDivisionError):
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO checkpost_stops (vehicle_number) VALUES (%s)", ("X1",))
+            1 / 0
+    assert _count() == 0 and pool.stats()["idle"] == 1
+    pool.close_all()
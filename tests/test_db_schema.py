@@ -0,0 +1,66 @@
+# tests/test_db_schema.py
+import pandas as pd
+import pytest
+
+import db_schema
+from db import get_pool, run_query
+from db_schema import COLUMNS, INDEXES, TABLE, advise, dashboard_queries, migrate
+
+
+def _names(sql):
+    return set(run_query(sql, (TABLE,), ttl=0).iloc[:, 0])
+
+
+def test_migrate_is_idempotent(sqlite_db):
+    assert set(INDEXES) <= _names(db_schema.INDEXES_SQL)
+    again = migrate(verbose=False)
+    assert all(stmt.startswith("CREATE TABLE IF NOT EXISTS") for stmt in again)
+
+
+def test_migrate_upgrades_an_old_table(sqlite_db):
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE {TABLE}")
+        # an id-era table (adding a primary key later is MySQL-only) from before violation_id
+        cursor.execute(f"CREATE TABLE {TABLE} (id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT, stop_date DATE, "
+                       "vehicle_number VARCHAR(32), violation VARCHAR(64), country_name VARCHAR(64), "
+                       "PRIMARY KEY (id), KEY idx_country_violation (country_name, violation))")
+        cursor.execute(f"INSERT INTO {TABLE} (stop_date, vehicle_number, violation) VALUES (%s, %s, %s)",
+                       ("2024-01-02", "TN01", "Speeding"))
+        conn.commit()
+    done = migrate(verbose=False)
+    assert f"ALTER TABLE {TABLE} DROP INDEX idx_country_violation" in done
+    assert set(COLUMNS) <= _names(db_schema.COLUMNS_SQL)
+    indexes = _names(db_schema.INDEXES_SQL)
+    assert set(INDEXES) <= indexes and "idx_country_violation" not in indexes
+    row = run_query(f"SELECT id, violation_id FROM {TABLE}", ttl=0).iloc[0]
+    assert row["id"] == 1 and row["violation_id"] > 0                # backfilled from the name
+
+
+def test_every_dashboard_query_runs(sqlite_db):
+    for name, sql, params in dashboard_queries():
+        run_query(sql, params, ttl=0, name=name)
+
+
+def test_advisor_verdicts(monkeypatch):
+    plans = {
+        "scan": [{"table": TABLE, "type": "ALL", "key": None, "rows": 10 ** 6, "Extra": "Using where"}],
+        "seek": [{"table": "<derived2>", "type": "ALL"},
+                 {"table": TABLE, "type": "range", "key": "idx_stop_date_time", "rows": 50, "Extra": None}],
+        "rollup": [{"table": "checkpost_stops_daily", "type": "index", "key": "PRIMARY", "rows": 900}],
+    }
+
+    def explain(sql, params=()):
+        if sql == "broken":
+            raise RuntimeError("syntax error")
+        return pd.DataFrame(plans[sql])
+
+    monkeypatch.setattr(db_schema, "explain", explain)
+    report = advise([(name, name, ()) for name in plans] + [("broken", "broken", ())])
+    assert report.set_index("query")["verdict"].to_dict() == {
+        "scan": "FULL TABLE SCAN", "seek": "ok", "rollup": "summary table scan", "broken": "EXPLAIN failed"}
+
+
+@pytest.mark.parametrize("name", sorted(INDEXES))
+def test_indexes_name_real_columns(name):
+    assert set(INDEXES[name]) <= set(COLUMNS)
@@ -0,0 +1,68 @@
+# tests/test_duckdb_engine.py
+import pandas as pd
+import pytest
+
+import archive
+import duckdb_engine
+from db import insert_dataframe_to_table, run_query
+from queries import ANALYTICS_QUERIES
+
+pytest.importorskip("duckdb")
+
+# panels with a LIMIT: ties may pick other rows, so only the measure is compared
+LIMITED = {"Top 10 vehicles in drug-related stops": "drug_stop_count", "Vehicles most frequently searched": "searches",
+           "Violation trends by age & race": "cnt", "Top 5 violations by arrest rate": "arrest_rate"}
+
+
+@pytest.fixture
+def engine(sqlite_db, stops, tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    archive._forget_cold()
+    insert_dataframe_to_table(stops(2_000), "checkpost_stops")
+    yield duckdb_engine.DuckDBEngine(snapshot=str(tmp_path / "snapshot" / "checkpost_stops.parquet"))
+    archive._forget_cold()
+
+
+def _count(engine):
+    return int(engine.run_query("SELECT COUNT(*) AS n FROM checkpost_stops")["n"].iloc[0])
+
+
+@pytest.mark.parametrize("label", sorted(ANALYTICS_QUERIES))
+def test_panels_match_the_database(engine, label):
+    sql = ANALYTICS_QUERIES[label]
+    expected, got = run_query(sql, ttl=0), engine.run_query(sql, name=label)
+    assert list(got.columns) == list(expected.columns)
+    if label in LIMITED:
+        col = LIMITED[label]
+        assert sorted(got[col].astype(float)) == pytest.approx(sorted(expected[col].astype(float)))
+        return
+    key = list(expected.columns)
+    pd.testing.assert_frame_equal(got.sort_values(key, na_position="first").reset_index(drop=True),
+                                  expected.sort_values(key, na_position="first").reset_index(drop=True),
+                                  check_dtype=False, obj=label)
+
+
+def test_stale_snapshot_is_refreshed_after_writes(engine, stops, monkeypatch):
+    assert _count(engine) == 2_000
+    monkeypatch.setattr(duckdb_engine, "_engine", engine)      # the write hook marks the live engine
+    insert_dataframe_to_table(stops(100, seed=1), "checkpost_stops")
+    assert _count(engine) == 2_000                             # still within SYNC_SECONDS
+    monkeypatch.setattr(duckdb_engine, "SYNC_SECONDS", 0)
+    _count(engine)
+    engine._syncing.join(timeout=30)
+    assert _count(engine) == 2_100
+
+
+def test_failed_background_sync_is_logged(engine, monkeypatch, caplog):
+    _count(engine)
+
+    def broken(path=None, chunk_rows=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(duckdb_engine, "write_snapshot", broken)
+    monkeypatch.setattr(duckdb_engine, "SYNC_SECONDS", 0)
+    engine.mark_dirty()
+    _count(engine)
+    engine._syncing.join(timeout=30)
+    assert "DuckDB snapshot sync failed: disk full" in caplog.text
+    assert engine._dirty                                       # retried on a later call
@@ -0,0 +1,67 @@
+# tests/test_ingest.py
+import io
+
+import pytest
+
+import ingest
+from db import run_query
+from synth import make_stops
+
+ROWS = 2_500
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "stops.csv"
+    make_stops(ROWS, seed=5).to_csv(path, index=False)
+    return str(path)
+
+
+def _stored():
+    return int(run_query("SELECT COUNT(*) AS n FROM checkpost_stops", ttl=0)["n"].iloc[0])
+
+
+def _load(source, **kwargs):
+    return ingest.stream_csv_to_table(source, "checkpost_stops", chunk_rows=1_000, batch_size=400, **kwargs)
+
+
+def test_resumes_after_the_last_committed_batch(sqlite_db, export):
+    def crash(progress):
+        if progress["rows_done"] >= 1_400:
+            raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        _load(export, on_progress=crash)
+    assert _stored() == 1_400
+    assert ingest.dry_run(export, "checkpost_stops", chunk_rows=1_000)["resume_from"] == 1_400
+    result = _load(export)
+    assert (result["resumed_from"], result["rows_done"], _stored()) == (1_400, ROWS, ROWS)
+    assert _load(export)["rows_done"] == ROWS and _stored() == ROWS     # finished: not loaded again
+
+
+def test_a_batch_and_its_checkpoint_commit_together(sqlite_db, export, monkeypatch):
+    save = ingest._save_checkpoint
+    calls = []
+
+    def fail_third(cursor, key, state):
+        calls.append(state["rows_done"])
+        if len(calls) == 3:
+            raise OSError("disk full")          # the batch's rows must roll back with it
+        save(cursor, key, state)
+
+    monkeypatch.setattr(ingest, "_save_checkpoint", fail_third)
+    with pytest.raises(OSError):
+        _load(export)
+    assert _stored() == 800
+    monkeypatch.setattr(ingest, "_save_checkpoint", save)
+    assert _load(export)["resumed_from"] == 800
+    assert _stored() == ROWS
+
+
+def test_restart_and_uploads(sqlite_db, export):
+    with open(export, "rb") as fh:
+        upload = io.BytesIO(fh.read())
+    upload.name = "stops.csv"
+    assert _load(upload)["rows_inserted"] == ROWS
+    assert _load(upload)["resumed_from"] == ROWS
+    assert _load(upload, resume=False)["resumed_from"] == 0
+    assert _stored() == 2 * ROWS
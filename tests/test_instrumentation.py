@@ -0,0 +1,85 @@
+# tests/test_instrumentation.py
+import json
+import threading
+import time
+
+import pytest
+
+import instrumentation
+from db import insert_dataframe_to_table, run_query
+from instrumentation import Recorder, export_json, new_call
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    fresh = Recorder(window=50, slow_ms=float("inf"))
+    monkeypatch.setattr(instrumentation, "_recorder", fresh)
+    return fresh
+
+
+def test_calls_are_timed_per_name(sqlite_db, stops, recorder):
+    insert_dataframe_to_table(stops(120), "checkpost_stops", batch_size=50)
+    for _ in range(3):
+        run_query("SELECT COUNT(*) AS n FROM checkpost_stops", name="Count")
+    with pytest.raises(Exception):
+        run_query("SELECT nope FROM checkpost_stops", ttl=0, name="Broken")
+    stats = recorder.percentiles()
+    assert stats["Count"]["calls"] == 3 and stats["Count"]["cache_hits"] == 2
+    assert stats["Count"]["p50"] <= stats["Count"]["p99"] <= stats["Count"]["max"]
+    assert stats["Broken"]["errors"] == 1
+    assert [c["name"] for c in recorder.recent(errors_only=True)] == ["Broken"]
+    inserts = [c for c in recorder.recent() if c["rows"] == 120]
+    assert len(inserts) == 1 and inserts[0]["bytes"] > 0
+    assert "raw_params" not in recorder.recent()[0]
+
+
+def test_slow_queries_are_logged_with_their_plan(sqlite_db, recorder, caplog):
+    recorder.slow_ms = 0.0
+    run_query("SELECT id FROM checkpost_stops WHERE vehicle_number = %s", ("AB1",), ttl=0, name="Plate")
+    deadline = time.monotonic() + 5
+    while not recorder.slow_log() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    (entry,) = recorder.slow_log()
+    assert entry["name"] == "Plate" and entry["params"] == "('AB1',)"
+    assert entry["plan"] or entry["plan_error"]
+    assert "Slow query 'Plate'" in caplog.text
+
+
+def test_export_is_json(recorder, tmp_path):
+    call = new_call("Manual", "SELECT 1", (1,))
+    call["total_ms"] = 12.0
+    recorder.record(call)
+    path = tmp_path / "stats.json"
+    data = json.loads(export_json(str(path), recorder))
+    assert data["queries"]["Manual"]["max"] == 12.0
+    assert json.loads(path.read_text()) == data
+
+
+def test_explains_run_one_at_a_time_once_per_name(recorder, monkeypatch):
+    state = {"active": 0, "peak": 0, "runs": []}
+    lock = threading.Lock()
+
+    def fake_explain(sql, params=None):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["runs"].append(sql)
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        return [{"plan": sql}]
+
+    monkeypatch.setattr(instrumentation, "explain_plan", fake_explain)
+    recorder.slow_ms = 0.0
+    for i in range(50):
+        call = new_call(f"Panel {i % 5}", f"SELECT {i % 5} FROM checkpost_stops")
+        call["total_ms"] = 900.0
+        recorder.record(call)
+    deadline = time.monotonic() + 5
+    while len(recorder.slow_log()) < 50 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    log = recorder.slow_log()
+    assert len(log) == 50 and state["peak"] == 1
+    assert sorted(state["runs"]) == [f"SELECT {i} FROM checkpost_stops" for i in range(5)]
+    assert sum(e["plan"] is not None for e in log) == 5
+    assert all(e["plan_error"].startswith("explained") for e in log if e["plan"] is None)
@@ -0,0 +1,52 @@
+# tests/test_pagination.py
+import pytest
+
+import pagination
+from db import insert_dataframe_to_table, run_query
+from pagination import approx_count, fetch_page
+
+
+@pytest.fixture
+def loaded(sqlite_db, stops):
+    df = stops(230, seed=4)
+    df.loc[df.index[:5], "stop_date"] = None          # NULL dates sort last (lowest) when newest first
+    df.loc[df.index[5:40], "stop_date"] = df["stop_date"].iloc[40]   # ties broken by time, then id
+    insert_dataframe_to_table(df, "checkpost_stops")
+    return sqlite_db
+
+
+def _expected(where=""):
+    return run_query(f"SELECT id FROM checkpost_stops{where} "
+                     "ORDER BY stop_date DESC, stop_time DESC, id DESC", ttl=0)["id"].tolist()
+
+
+@pytest.mark.parametrize("arrow", [True, False])
+def test_pages_walk_forward_and_back(loaded, monkeypatch, arrow):
+    monkeypatch.setattr(pagination, "ARROW_PAGES", arrow)
+    pages = [fetch_page([], [], page_size=40)]
+    while pages[-1]["has_next"]:
+        pages.append(fetch_page([], [], page_size=40, after=pages[-1]["last"]))
+    assert [len(p["rows"]) for p in pages] == [40] * 5 + [30]
+    assert [i for p in pages for i in p["rows"]["id"].tolist()] == _expected()
+    assert not pages[0]["has_prev"] and pages[-1]["has_prev"]
+
+    back = fetch_page([], [], page_size=40, before=pages[3]["first"])
+    assert back["rows"]["id"].tolist() == pages[2]["rows"]["id"].tolist()
+    assert back["has_prev"] and back["has_next"]
+
+
+def test_pages_respect_filters_and_count(loaded):
+    conditions, params = ["vehicle_number LIKE %s"], ["%1%"]
+    ids = fetch_page(conditions, params, page_size=1_000)["rows"]["id"].tolist()
+    assert ids == _expected(" WHERE vehicle_number LIKE '%1%'")
+    assert approx_count(conditions, params) == len(ids)
+    assert approx_count([], []) == 230
+
+
+def test_failed_estimate_is_logged(sqlite_db, monkeypatch, caplog):
+    def broken(*args, **kwargs):
+        raise RuntimeError("server gone")
+
+    monkeypatch.setattr(pagination, "run_query", broken)
+    assert approx_count([], []) is None
+    assert "Row estimate failed: server gone" in caplog.text
@@ -0,0 +1,49 @@
+# tests/test_panels.py
+import pytest
+
+import panels
+from conftest import INSERT_SYNTH_STOPS, run_in_other_process
+from db import insert_dataframe_to_table
+
+LABEL = "Countries with most searches"
+
+
+def _searches(df):
+    return int(df["searches"].sum())
+
+
+@pytest.fixture
+def fresh_memo(sqlite_db, monkeypatch):
+    monkeypatch.setattr(panels, "_memo", {})
+    monkeypatch.setattr(panels, "_mark", None)
+    monkeypatch.setattr(panels, "_checked_at", None)
+    monkeypatch.setattr(panels, "PANEL_CHECK_SECONDS", 0)
+    return sqlite_db
+
+
+def test_memo_is_reused_until_a_local_write(fresh_memo, stops):
+    insert_dataframe_to_table(stops(2_000), "checkpost_stops")
+    first = panels.load_panel(LABEL)
+    assert panels.load_panel(LABEL) is not first            # a shallow copy of the memo
+    version = panels.data_version()
+    insert_dataframe_to_table(stops(2_000, seed=1), "checkpost_stops")
+    assert panels.data_version() > version
+    assert _searches(panels.load_panel(LABEL)) > _searches(first)
+
+
+def test_rows_inserted_by_another_process_show_up(fresh_memo, stops):
+    insert_dataframe_to_table(stops(2_000), "checkpost_stops")
+    before = _searches(panels.load_panel(LABEL))
+    run_in_other_process(fresh_memo, INSERT_SYNTH_STOPS.format(n=2_000, seed=7))
+    assert _searches(panels.load_panel(LABEL)) > before
+
+
+def test_memo_expires_after_panel_ttl(fresh_memo, stops, monkeypatch):
+    insert_dataframe_to_table(stops(500), "checkpost_stops")
+    panels.load_panel(LABEL)
+    monkeypatch.setattr(panels, "PANEL_TTL", 0)
+    calls = []
+    real = panels.run_query
+    monkeypatch.setattr(panels, "run_query", lambda sql, *a, **k: calls.append(sql) or real(sql, *a, **k))
+    panels.load_panel(LABEL)
+    assert any("n_searches" in sql for sql in calls)
@@ -0,0 +1,103 @@
+# tests/test_plate_search.py
+import random
+import re
+import sqlite3
+
+import pytest
+
+import plate_search
+from db import insert_dataframe_to_table, notify_table_changed, run_query
+from plate_search import PlateIndex, get_plate_index, normalize
+
+
+def _one_edit_apart(q, key):
+    """Reference check: one substitution, or one character deleted from the longer side."""
+    if len(q) == len(key):
+        return sum(a != b and a != "?" for a, b in zip(q, key)) <= 1
+    longer, shorter = (q, key) if len(q) > len(key) else (key, q)
+    if len(longer) - len(shorter) != 1:
+        return False
+    return any(all(a == b or a == "?" or b == "?" for a, b in zip(longer[:i] + longer[i + 1:], shorter))
+               for i in range(len(longer)))
+
+
+def _brute_force(keys, q):
+    if len(q.replace("?", "")) < 2:
+        return {}
+    pattern = re.compile("".join("." if c == "?" else re.escape(c) for c in q))
+    out = {}
+    for key in keys:
+        if pattern.fullmatch(key):
+            out[key] = "exact"
+        elif pattern.match(key):
+            out[key] = "prefix"
+        elif pattern.search(key):
+            out[key] = "substring"
+        elif _one_edit_apart(q, key):
+            out[key] = "fuzzy"
+    return out
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = random.Random(11)
+    plates = {f"{rng.choice(['TN', 'KA', 'KL'])}{rng.randint(1, 99):02d}"
+              f"{rng.choice('ABCDE')}{rng.choice('ABCDE')}{rng.randint(0, 9999):04d}": rng.randint(1, 9)
+              for _ in range(1_500)}
+    idx = PlateIndex()
+    idx.add({p: (n, None) for p, n in plates.items()})
+    return idx, [normalize(p) for p in plates], rng
+
+
+def test_search_finds_exactly_what_a_scan_finds(index):
+    idx, keys, rng = index
+    queries = ["TN09", "AB12", "tn-09 ab", "KA?1", "?09AB", "A1", "?0?B", "T"]
+    for key in rng.sample(keys, 15):
+        cut = rng.randrange(len(key))
+        queries += [key, key[:cut + 2], key[cut:], key[:cut] + key[cut + 1:],              # deletion
+                    key[:cut] + "X" + key[cut + 1:], key[:cut] + "?" + key[cut + 1:]]     # substitution
+    for query in queries:
+        q = plate_search._STRIP_QUERY.sub("", query.upper())
+        got = {normalize(h["plate"]): h["match"] for h in idx.search(query, limit=10 ** 6)}
+        assert got == _brute_force(keys, q), query
+
+
+def test_ranked_by_match_then_stops(index):
+    idx, keys, _ = index
+    hits = idx.search("A1", limit=50)
+    ranks = [(plate_search.MATCH_RANK[h["match"]], -h["stops"]) for h in hits]
+    assert ranks == sorted(ranks) and len(hits) == 50
+    assert idx.search("T") == []                         # too short to narrow anything
+
+
+def test_index_follows_inserts_and_deletes(sqlite_db, stops):
+    df = stops(400, seed=9)
+    insert_dataframe_to_table(df.iloc[:300], "checkpost_stops")
+    index = get_plate_index()
+    plate = str(df["vehicle_number"].iloc[350])
+    expected = int((df["vehicle_number"].iloc[:300] == plate).sum())
+    found = {h["plate"]: h["stops"] for h in index.search(plate)}
+    assert found.get(plate, 0) == expected
+    insert_dataframe_to_table(df.iloc[300:], "checkpost_stops")        # folded in by the write hook
+    assert get_plate_index() is index
+    assert {h["plate"]: h["stops"] for h in index.search(plate)}[plate] == expected + int(
+        (df["vehicle_number"].iloc[300:] == plate).sum())
+
+    run_query("DELETE FROM checkpost_stops WHERE vehicle_number = %s", (plate,), ttl=0)
+    notify_table_changed("checkpost_stops")
+    assert plate not in {h["plate"] for h in get_plate_index().search(plate)}
+
+
+def test_index_catches_up_with_other_writers(sqlite_db, stops, monkeypatch):
+    insert_dataframe_to_table(stops(200, seed=4), "checkpost_stops")
+    index = get_plate_index()
+    monkeypatch.setattr(plate_search, "PLATE_CHECK_SECONDS", 3600)
+    with sqlite3.connect(sqlite_db) as other:          # another process: no write hook here
+        other.executemany("INSERT INTO checkpost_stops (vehicle_number, stop_date) VALUES (?, ?)",
+                          [("ZZ99QQ0001", "2024-05-01"), ("ZZ99QQ0001", "2024-05-03")])
+    assert get_plate_index().search("ZZ99QQ") == []    # not due yet
+    monkeypatch.setattr(plate_search, "PLATE_CHECK_SECONDS", 0)
+    (hit,) = get_plate_index().search("ZZ99QQ")
+    assert get_plate_index() is index
+    assert hit["plate"] == "ZZ99QQ0001" and hit["stops"] == 2 and str(hit["last_seen"]) == "2024-05-03"
+    assert index.high_water == 202
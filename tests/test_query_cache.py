@@ -0,0 +1,54 @@
+# tests/test_query_cache.py
+import time
+
+import pandas as pd
+
+from db import run_query
+from query_cache import QueryCache, is_cacheable, normalize_sql, tables_in
+
+
+def _frame(n=10):
+    return pd.DataFrame({"n": range(n)})
+
+
+def test_keys_ignore_layout_but_not_literals():
+    assert normalize_sql("SELECT  *\n FROM t ;") == "SELECT * FROM t"
+    assert normalize_sql("SELECT 'a  b'") == "SELECT 'a  b'"
+    assert QueryCache.make_key("SELECT * FROM t", [1]) == QueryCache.make_key("SELECT *\nFROM t", (1,))
+    assert tables_in("SELECT * FROM a JOIN `B` ON 1 WHERE x IN (SELECT y FROM c)") == {"a", "b", "c"}
+    assert is_cacheable(" with x AS (SELECT 1) SELECT * FROM x") and not is_cacheable("DELETE FROM t")
+
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    cache = QueryCache(max_bytes=3_000, default_ttl=60)
+    cache.put("short", _frame(), ttl=0.01, tables=["t"])
+    time.sleep(0.03)
+    assert cache.get("short") is None and cache.stats()["expired"] == 1
+    for key in "abc":
+        cache.put(key, _frame(), nbytes=1_000, tables=["t"])
+    cache.get("a")                                     # b is now the least recently used
+    cache.put("d", _frame(), nbytes=1_000, tables=["u"])
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 3_000
+    cache.put("huge", _frame(), nbytes=10_000)         # bigger than the budget: not cached
+    assert cache.get("huge") is None
+    assert cache.invalidate_table("T") == 2 and cache.get("d") is not None
+
+
+def test_cached_frames_are_not_shared_with_callers():
+    cache = QueryCache()
+    cache.put("k", _frame())
+    got = cache.get("k")
+    got["extra"] = 1
+    assert list(cache.get("k").columns) == ["n"]
+
+
+def test_run_query_serves_repeats_from_the_cache(sqlite_db):
+    import query_cache
+
+    sql = "SELECT COUNT(*) AS n FROM checkpost_stops"
+    run_query(sql)
+    run_query(sql + "\n")
+    run_query(sql, ttl=0)                              # always hits the database
+    stats = query_cache.get_cache().stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
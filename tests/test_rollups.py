@@ -0,0 +1,26 @@
+# tests/test_rollups.py
+import pandas as pd
+import pytest
+
+from db import insert_dataframe_to_table, run_query
+from queries import ANALYTICS_QUERIES, ROLLUP_QUERIES
+
+
+@pytest.fixture
+def loaded(sqlite_db, stops):
+    insert_dataframe_to_table(stops(3_000), "checkpost_stops", batch_size=1_000)
+    return sqlite_db
+
+
+@pytest.mark.parametrize("label", sorted(ROLLUP_QUERIES))
+def test_rollup_panel_matches_raw_panel(loaded, label):
+    rolled = run_query(ROLLUP_QUERIES[label], ttl=0)
+    raw = run_query(ANALYTICS_QUERIES[label], ttl=0)[rolled.columns]
+    key = list(rolled.columns)
+    pd.testing.assert_frame_equal(rolled.sort_values(key).reset_index(drop=True),
+                                  raw.sort_values(key).reset_index(drop=True), check_dtype=False)
+
+
+def test_averages_are_not_integer_divided(loaded):
+    avg = run_query(ROLLUP_QUERIES["Driver demographics by country"], ttl=0)["avg_age"]
+    assert (avg % 1 != 0).any()
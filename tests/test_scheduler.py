@@ -0,0 +1,53 @@
+# tests/test_scheduler.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from db import insert_dataframe_to_table, run_query
+from scheduler import QueryScheduler
+
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=4)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+def test_independent_tasks_overlap(executor):
+    scheduler = QueryScheduler(executor)
+    barrier = threading.Barrier(3, timeout=5)           # only passes if all three run at once
+    for name in "abc":
+        scheduler.submit(name, barrier.wait)
+    assert sorted(scheduler.result(name) for name in "abc") == [0, 1, 2]
+    summary = scheduler.summary()
+    assert summary["critical"] in "abc" and summary["wall"] <= summary["serial"] + 0.05
+
+
+def test_timings_errors_and_resubmits(executor):
+    scheduler = QueryScheduler(executor)
+
+    def fail():
+        raise ValueError("bad sql")
+
+    first = scheduler.submit("slow", time.sleep, 0.05)
+    assert scheduler.submit("slow", time.sleep, 5) is first
+    scheduler.submit("broken", fail)
+    scheduler.result("slow")
+    with pytest.raises(ValueError):
+        scheduler.result("broken")
+    timings = {t["name"]: t for t in scheduler.timings()}
+    assert timings["slow"]["status"] == "ok" and timings["slow"]["seconds"] >= 0.05
+    assert timings["broken"]["status"] == "error" and timings["broken"]["wait"] >= 0
+
+
+def test_dashboard_queries_run_side_by_side(sqlite_db, stops, executor):
+    insert_dataframe_to_table(stops(500), "checkpost_stops")
+    scheduler = QueryScheduler(executor)
+    sqls = {f"count {g}": f"SELECT COUNT(*) AS n FROM checkpost_stops WHERE driver_gender = '{g}'"
+            for g in ("Male", "Female")}
+    for name, sql in sqls.items():
+        scheduler.submit(name, run_query, sql, ttl=0)
+    assert sum(int(scheduler.result(name)["n"].iloc[0]) for name in sqls) == 500
@@ -0,0 +1,47 @@
+# tests/test_securecheck.py
+import sys
+
+import pandas as pd
+import pytest
+
+import securecheck
+from db import run_query
+from synth import make_stops
+
+
+@pytest.fixture
+def export(tmp_path):
+    path = tmp_path / "stops.csv"
+    make_stops(1_200, seed=3).to_csv(path, index=False)
+    return str(path)
+
+
+def _stored():
+    return int(run_query("SELECT COUNT(*) AS n FROM checkpost_stops", ttl=0)["n"].iloc[0])
+
+
+def test_ingest_loads_once_and_dry_run_inserts_nothing(sqlite_db, export, capsys):
+    assert securecheck.main(["ingest", export, "--dry-run"]) == 0
+    assert _stored() == 0 and "would insert 1,200" in capsys.readouterr().out
+    assert securecheck.main(["ingest", export, export, "--batch-size", "500"]) == 0
+    assert _stored() == 1_200
+    assert securecheck.main(["ingest", export]) == 0             # finished: skipped
+    assert _stored() == 1_200 and "already loaded" in capsys.readouterr().out
+
+
+def test_ingest_reports_missing_files(sqlite_db, tmp_path):
+    assert securecheck.main(["ingest", str(tmp_path / "nope.csv")]) == 2
+
+
+def test_backfill_gets_its_arguments_without_touching_sys_argv(export, tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["securecheck.py", "backfill"])
+    out = tmp_path / "cleaned.csv"
+    assert securecheck.main(["backfill", export, "--out", str(out), "--workers", "1"]) == 0
+    assert sys.argv == ["securecheck.py", "backfill"]
+    assert len(pd.read_csv(out)) == 1_200
+
+
+def test_backfill_usage_names_the_subcommand(capsys):
+    with pytest.raises(SystemExit):
+        securecheck.main(["backfill", "--bogus"])
+    assert "securecheck backfill" in capsys.readouterr().err
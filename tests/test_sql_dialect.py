@@ -0,0 +1,63 @@
+# tests/test_sql_dialect.py
+import sqlite3
+
+import pytest
+
+from sql_dialect import split_indexes, translate
+
+duckdb = pytest.importorskip("duckdb")
+
+PANEL = """
+SELECT country_name, SUM(is_arrested = 1) AS arrests, SUM(n) AS total,
+       CAST(AVG(age) AS SIGNED) AS avg_age, HOUR(stop_time) AS hour
+FROM t
+WHERE stop_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY) AND note LIKE %s AND memo <> 'SUM(a = 1) %s'
+GROUP BY country_name, hour
+"""
+
+
+def test_mysql_is_left_alone():
+    assert translate(PANEL, "mysql") == PANEL
+    with pytest.raises(ValueError):
+        translate(PANEL, "oracle")
+
+
+def test_rewrites_skip_string_literals():
+    sql = translate(PANEL, "sqlite")
+    assert "'SUM(a = 1) %s'" in sql and sql.count("?") == 1
+    assert "SUM(CASE WHEN is_arrested = 1 THEN 1 ELSE 0 END)" in sql and "SUM(n)" in sql
+    assert "CAST(strftime('%H', stop_time) AS INTEGER)" in sql
+    assert "CAST(ROUND(AVG(age)) AS INTEGER) AS avg_age" in sql        # MySQL rounds, SQLite's CAST truncates
+    duck = translate(PANEL, "duckdb")
+    assert "ILIKE ?" in duck and "CURRENT_DATE - INTERVAL 30 DAY" in duck and "AS BIGINT" in duck
+
+
+@pytest.mark.parametrize("dialect", ["sqlite", "duckdb"])
+def test_translated_panel_runs(dialect):
+    rows = [("IN", 1, 2, 30, "10:15:00", "2099-01-01", "Speeding", "x"),
+            ("IN", 0, 3, 41, "10:45:00", "2099-01-01", "speeding", "x"),
+            ("US", 1, 1, 50, "23:00:00", "2000-01-01", "Speeding", "x")]
+    ddl = ("CREATE TABLE t (country_name TEXT, is_arrested INT, n INT, age INT, stop_time TIME, "
+           "stop_date DATE, note TEXT, memo TEXT)")
+    conn = sqlite3.connect(":memory:") if dialect == "sqlite" else duckdb.connect()
+    conn.execute(ddl)
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    got = conn.execute(translate(PANEL, dialect), ["speed%"]).fetchall()
+    # DuckDB's ILIKE matches both spellings, as MySQL's case-insensitive collation does;
+    # SQLite's LIKE is case-insensitive for ASCII already
+    assert [tuple(r) for r in got] == [("IN", 1, 5, 36, 10)]
+
+
+def test_sqlite_ddl_and_writes():
+    ddl = ("CREATE TABLE IF NOT EXISTS t (id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT, d DATE, n INT, "
+           "PRIMARY KEY (id), UNIQUE KEY uq_d (d), KEY idx_n (n)) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4")
+    table, indexes = split_indexes(translate(ddl, "sqlite"))
+    assert "AUTO_INCREMENT" not in table and "ENGINE" not in table and "KEY" not in table.replace("PRIMARY KEY", "")
+    assert indexes == ["CREATE UNIQUE INDEX IF NOT EXISTS uq_d ON t (d)", "CREATE INDEX IF NOT EXISTS idx_n ON t (n)"]
+    assert translate("ALTER TABLE t ADD INDEX idx_x (n, d)", "sqlite") == "CREATE INDEX IF NOT EXISTS idx_x ON t (n, d)"
+    assert translate("ALTER TABLE t DROP INDEX idx_x", "sqlite") == "DROP INDEX IF EXISTS idx_x"
+    assert translate("DELETE FROM t WHERE d < %s LIMIT 500", "sqlite") == (
+        "DELETE FROM t WHERE rowid IN (SELECT rowid FROM t WHERE d < ? LIMIT 500)")
+    assert translate("INSERT INTO t (d, n) VALUES (%s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)",
+                     "sqlite").endswith("ON CONFLICT DO UPDATE SET n = n + excluded.n")
+    assert translate("EXPLAIN SELECT 1", "sqlite") == "EXPLAIN QUERY PLAN SELECT 1"
@@ -0,0 +1,57 @@
+# tests/test_sqlite_backend.py
+import datetime
+
+import pandas as pd
+
+from sqlite_backend import connect
+
+
+def _table(tmp_path):
+    conn = connect(str(tmp_path / "t.sqlite"))
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE t (id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT, d DATE, tm TIME, n INT, "
+                   "PRIMARY KEY (id), KEY idx_d (d)) ENGINE=InnoDB")
+    conn.commit()
+    return conn, cursor
+
+
+def test_savepoints_stay_inside_the_transaction(tmp_path):
+    conn, cursor = _table(tmp_path)
+    cursor.execute("SAVEPOINT sp_1")
+    cursor.execute("INSERT INTO t (n) VALUES (%s)", (1,))
+    cursor.execute("RELEASE SAVEPOINT sp_1")
+    conn.rollback()                                   # as in MySQL, the released work is not committed
+    cursor.execute("SELECT COUNT(*) FROM t")
+    assert cursor.fetchone()[0] == 0
+    cursor.execute("SAVEPOINT sp_2")
+    cursor.execute("INSERT INTO t (n) VALUES (%s)", (2,))
+    cursor.execute("RELEASE SAVEPOINT sp_2")
+    conn.commit()
+    cursor.execute("SELECT n FROM t")
+    assert cursor.fetchall() == [(2,)]
+
+
+def test_dates_and_times_round_trip_like_mysql(tmp_path):
+    conn, cursor = _table(tmp_path)
+    cursor.execute("INSERT INTO t (d, tm) VALUES (%s, %s)",
+                   (pd.Timestamp("2024-03-05"), datetime.timedelta(hours=13, minutes=7)))
+    cursor.execute("SELECT d, tm, YEAR(d), HOUR(tm) FROM t")
+    assert cursor.fetchone() == (datetime.date(2024, 3, 5), datetime.timedelta(hours=13, minutes=7), 2024, 13)
+
+
+def test_upserts_are_translated(tmp_path):
+    conn, cursor = _table(tmp_path)
+    sql = "INSERT INTO t (id, n) VALUES (%s, %s) ON DUPLICATE KEY UPDATE n = n + VALUES(n)"
+    cursor.executemany(sql, [(1, 2), (1, 3)])
+    conn.commit()
+    cursor.execute("SELECT n FROM t WHERE id = 1")
+    assert cursor.fetchone()[0] == 5
+
+
+def test_create_if_not_exists_leaves_an_existing_table_alone(tmp_path):
+    conn, cursor = _table(tmp_path)
+    # a newer DDL whose KEY names a column the old table lacks: MySQL ignores it all
+    cursor.execute("CREATE TABLE IF NOT EXISTS t (id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT, d DATE, "
+                   "extra INT, PRIMARY KEY (id), KEY idx_extra (extra)) ENGINE=InnoDB")
+    cursor.execute("SELECT name FROM pragma_index_list('t')")
+    assert [row[0] for row in cursor.fetchall()] == ["idx_d"]
@@ -0,0 +1,56 @@
+# tests/test_streaming.py
+import pandas as pd
+import pyarrow.parquet as pq
+
+import sqlite_backend
+from db import get_pool, insert_dataframe_to_table
+from streaming import export_query, run_query_chunks
+
+SQL = "SELECT id, vehicle_number, stop_date FROM checkpost_stops ORDER BY id"
+
+
+def _load(stops, n=250):
+    insert_dataframe_to_table(stops(n, seed=6), "checkpost_stops")
+
+
+def test_chunks_cover_the_result(sqlite_db, stops):
+    _load(stops)
+    chunks = list(run_query_chunks(SQL, chunk_rows=100))
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    assert pd.concat(chunks)["id"].tolist() == list(range(1, 251))
+    assert get_pool().stats()["in_use"] == 0
+
+
+def test_stopping_early_drops_the_connection(sqlite_db, stops):
+    _load(stops)
+    pool = get_pool()
+    before = pool.stats()["idle"]
+    chunks = run_query_chunks(SQL, chunk_rows=100)
+    next(chunks)
+    assert pool.stats()["in_use"] == 1
+    chunks.close()
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["idle"] == before - 1    # half-read connection not pooled
+
+
+def test_failed_cancel_is_logged(sqlite_db, stops, monkeypatch, caplog):
+    _load(stops)
+
+    def broken(self):
+        raise OSError("connection reset")
+
+    monkeypatch.setattr(sqlite_backend.SQLiteConnection, "interrupt", broken)
+    chunks = run_query_chunks(SQL, chunk_rows=100)
+    next(chunks)
+    chunks.close()
+    assert "KILL QUERY failed, the statement may run on: connection reset" in caplog.text
+
+
+def test_export_csv_and_parquet(sqlite_db, stops, tmp_path):
+    _load(stops)
+    csv_path, parquet_path = str(tmp_path / "out.csv"), str(tmp_path / "out.parquet")
+    assert export_query(SQL, csv_path, chunk_rows=64) == 250
+    assert export_query(SQL, parquet_path, chunk_rows=64) == 250
+    from_csv, from_parquet = pd.read_csv(csv_path), pq.read_table(parquet_path).to_pandas()
+    assert from_csv["id"].tolist() == from_parquet["id"].tolist() == list(range(1, 251))
+    assert from_csv["vehicle_number"].tolist() == from_parquet["vehicle_number"].tolist()
@@ -0,0 +1,57 @@
+# tests/test_summary.py
+from datetime import date
+
+import pytest
+
+from db import insert_dataframe_to_table, run_query
+from queries import TABLE, build_summary_partial_sql, filter_where
+from summary import COUNT_FIELDS, summarize, summarize_frame, summarize_partial
+
+FILTERS = [
+    (),
+    (date(2021, 6, 1), date(2023, 6, 30), "All", "", "", "All"),
+    (date(2020, 1, 1), date(2024, 12, 31), "Female", "speed", "", "True"),
+]
+
+
+@pytest.fixture
+def loaded(sqlite_db, stops):
+    insert_dataframe_to_table(stops(2_000, seed=8), "checkpost_stops")
+    return sqlite_db
+
+
+def _rows(conditions, params):
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return run_query(f"SELECT * FROM {TABLE}{where}", tuple(params), ttl=0)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_sql_summary_matches_pandas_over_every_row(loaded, filters):
+    conditions, params = filter_where(*filters)
+    got, expected = summarize(conditions, params, ttl=0), summarize_frame(_rows(conditions, params))
+    assert got["total"] > 0
+    for field in COUNT_FIELDS:
+        assert got[field] == expected[field], field
+    assert got["avg_age"] == pytest.approx(expected["avg_age"])
+    for field in ("top_violation", "top_duration", "top_outcome"):
+        assert got[field] == expected[field], field
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_group_counts_give_the_same_summary(loaded, filters):
+    conditions, params = filter_where(*filters)
+    sql, sql_params = build_summary_partial_sql(conditions, params)
+    combined = summarize_partial(run_query(sql, tuple(sql_params), ttl=0))
+    direct = summarize(conditions, params, ttl=0)
+    for field in COUNT_FIELDS:
+        assert combined[field] == direct[field], field
+    assert combined["avg_age"] == pytest.approx(direct["avg_age"])
+    for field in ("top_violation", "top_gender", "top_duration", "top_outcome"):
+        assert combined[field] == direct[field], field
+
+
+def test_no_matching_stops(loaded):
+    conditions, params = filter_where(plate="NO-SUCH-PLATE")
+    got = summarize(conditions, params, ttl=0)
+    assert got["total"] == 0 and got["avg_age"] is None
+    assert summarize_frame(_rows(conditions, params))["total"] == 0
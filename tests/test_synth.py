@@ -0,0 +1,27 @@
+# tests/test_synth.py
+from db import insert_dataframe_to_table, run_query
+from queries import ANALYTICS_QUERIES, build_summary_sql, filter_where
+from rollups import DURATION_MINUTES
+from synth import iter_stops, make_stops
+
+
+def test_chunks_add_up_and_share_a_plate_pool():
+    chunks = list(iter_stops(2_500, chunk_rows=1_000))
+    assert [len(c) for c in chunks] == [1_000, 1_000, 500]
+    plates = set().union(*(set(c["vehicle_number"]) for c in chunks))
+    assert len(plates) <= 2_500 // 3
+
+
+def test_values_match_what_the_dashboard_queries_expect():
+    df = make_stops(1_000)
+    assert set(df["driver_gender"]) == {"Male", "Female"}
+    assert set(df["stop_duration"]) <= set(DURATION_MINUTES)
+
+
+def test_gender_filter_and_duration_average_are_populated(sqlite_db, stops):
+    insert_dataframe_to_table(stops(1_000), "checkpost_stops")
+    conditions, params = filter_where(gender="Male")
+    sql, params = build_summary_sql(conditions, params)
+    assert run_query(sql, tuple(params), ttl=0)["total"].iloc[0] > 0
+    durations = run_query(ANALYTICS_QUERIES["Average stop duration per violation"], ttl=0)
+    assert durations["avg_duration"].notna().all()
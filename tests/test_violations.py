@@ -0,0 +1,64 @@
+# tests/test_violations.py
+import pandas as pd
+import pytest
+
+from db import get_pool, insert_dataframe_to_table, run_query
+from queries import ANALYTICS_QUERIES, ROLLUP_QUERIES, filter_where
+
+
+@pytest.fixture
+def loaded(sqlite_db, stops):
+    df = stops(2_000)
+    insert_dataframe_to_table(df, "checkpost_stops")
+    return df
+
+
+def test_search_box_resolves_names_and_keywords(sqlite_db):
+    from violations import get_dictionary
+
+    names = get_dictionary().names()
+    assert [names[i] for i in get_dictionary().resolve("spe")] == ["Speeding"]
+    assert [names[i] for i in get_dictionary().resolve("drunk")] == ["DUI"]
+    assert get_dictionary().resolve("no such thing") == []
+
+
+def test_every_insert_gets_an_id(loaded):
+    rows = run_query("SELECT s.violation, v.name FROM checkpost_stops s "
+                     "LEFT JOIN violations v ON v.violation_id = s.violation_id", ttl=0)
+    assert rows["name"].notna().all()
+    assert (rows["violation"] == rows["name"]).all()
+
+
+def test_filter_matches_the_old_like(loaded):
+    conditions, params = filter_where(violation_contains="speed")
+    by_id = run_query(f"SELECT COUNT(*) AS n FROM checkpost_stops WHERE {conditions[0]}", tuple(params), ttl=0)
+    by_text = run_query("SELECT COUNT(*) AS n FROM checkpost_stops WHERE violation LIKE '%speed%'", ttl=0)
+    assert by_id["n"].iloc[0] == by_text["n"].iloc[0] > 0
+
+
+def test_rollup_and_summary_group_by_id(loaded):
+    from summary import summarize, summarize_frame
+
+    columns = set(run_query("SELECT * FROM checkpost_stops_daily LIMIT 1", ttl=0).columns)
+    assert "violation_id" in columns and "violation" not in columns
+    assert summarize([], [], ttl=0)["top_violation"] == summarize_frame(loaded)["top_violation"]
+    conditions, params = filter_where(violation_contains="seat")
+    assert summarize(conditions, params, ttl=0)["top_violation"] == "Seatbelt"
+
+
+def test_migrate_rebuilds_a_rollup_keyed_by_name(loaded):
+    import db_schema
+
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE checkpost_stops_daily")
+        cursor.execute("CREATE TABLE checkpost_stops_daily (stop_date DATE, country_name TEXT, violation TEXT, "
+                       "n_stops INT)")
+        conn.commit()
+        cursor.close()
+    done = db_schema.migrate(verbose=False)
+    assert "DROP TABLE checkpost_stops_daily" in done
+    label = "Violations linked to searches/arrests"
+    rolled = run_query(ROLLUP_QUERIES[label], ttl=0).sort_values("violation").reset_index(drop=True)
+    raw = run_query(ANALYTICS_QUERIES[label], ttl=0).sort_values("violation").reset_index(drop=True)
+    pd.testing.assert_frame_equal(rolled, raw[rolled.columns], check_dtype=False)
@@ -0,0 +1,227 @@
+# violations.py
+"""Violation dictionary: checkpost_stops refers to violations by a small id.
+
+The `violations` table holds one row per violation name. The keyword
+categories of data_processing.VIOLATION_KEYWORDS are seeded with their
+keywords; any other cleaned name (map_violations title-cases unmatched raw
+values) is added the first time a stop with it is inserted.
+checkpost_stops.violation_id is filled in on every insert through the
+db.before_table_write hook; the `violation` text stays for row display,
+exports and the archive.
+
+The "Violation contains" box no longer runs `violation LIKE '%x%'` over
+the fact table: ViolationDictionary.resolve() turns the text into a set of
+ids in memory (every word a prefix of a token of the name or its keywords,
+or the text a substring of the name, as LIKE matched), and the filter is
+`violation_id IN (...)` on idx_violation_date. The violation panels (raw
+and rollup) and the summary's top violation group by violation_id and
+look the names up here afterwards.
+
+    python violations.py backfill   # fill violation_id for rows loaded before the column existed
+"""
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing import VIOLATION_KEYWORDS
+from db import before_table_write, get_pool, notify_table_changed, run_query
+from queries import TABLE
+
+
+VIOLATION_TABLE = "violations"
+VIOLATION_RESYNC_SECONDS = float(os.environ.get("SECURECHECK_VIOLATION_RESYNC", "300"))
+BACKFILL_BATCH_ROWS = 50_000
+
+VIOLATION_DDL = f"""
+CREATE TABLE IF NOT EXISTS {VIOLATION_TABLE} (
+  violation_id SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  name VARCHAR(64) NOT NULL,
+  keywords VARCHAR(255) NOT NULL DEFAULT '',
+  PRIMARY KEY (violation_id),
+  UNIQUE KEY uq_violation_name (name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+SEED_SQL = (f"INSERT INTO {VIOLATION_TABLE} (name, keywords) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE keywords = VALUES(keywords)")
+ADD_SQL = f"INSERT INTO {VIOLATION_TABLE} (name) VALUES (%s) ON DUPLICATE KEY UPDATE name = name"
+LOAD_SQL = f"SELECT violation_id, name, keywords FROM {VIOLATION_TABLE}"
+
+BACKFILL_SQL = f"""
+UPDATE {TABLE}
+SET violation_id = (SELECT v.violation_id FROM {VIOLATION_TABLE} v WHERE v.name = {TABLE}.violation)
+WHERE id BETWEEN %s AND %s AND violation_id IS NULL AND violation IS NOT NULL
+"""
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def _tokens(*texts):
+    return {w for text in texts for w in _WORD.findall(str(text).lower())}
+
+
+def _execute(sql, rows=None):
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            if rows is None:
+                cursor.execute(sql)
+            else:
+                cursor.executemany(sql, rows)
+            conn.commit()
+        finally:
+            cursor.close()
+
+
+def ensure_table():
+    """Create the dictionary and (re)seed the keyword categories."""
+    _execute(VIOLATION_DDL)
+    _execute(SEED_SQL, [(category, " ".join(keywords)) for keywords, category in VIOLATION_KEYWORDS])
+
+
+class ViolationDictionary:
+    """In-memory copy of the violations table with a token index for the search box."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}          # name -> id
+        self._names = {}        # id -> name
+        self._tokens = {}       # token -> set of ids
+        self._sorted = []       # tokens in order, for prefix lookups
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def load(self):
+        """Re-read the whole table (it has one row per violation name)."""
+        rows = run_query(LOAD_SQL, ttl=0, name="Violation dictionary")
+        with self._lock:
+            self._ids, self._names, self._tokens = {}, {}, {}
+            for vid, name, keywords in rows[["violation_id", "name", "keywords"]].itertuples(index=False):
+                vid = int(vid)
+                self._ids[name] = vid
+                self._names[vid] = name
+                for token in _tokens(name, keywords or ""):
+                    self._tokens.setdefault(token, set()).add(vid)
+            self._sorted = sorted(self._tokens)
+            self.loaded_at = time.time()
+        return len(rows)
+
+    def names(self):
+        """id -> name."""
+        with self._lock:
+            return dict(self._names)
+
+    def ids_for(self, names):
+        """name -> id for every given name, adding the ones not in the table yet."""
+        names = {str(n) for n in names if n is not None and not pd.isna(n) and str(n) != ""}
+        with self._lock:
+            missing = names - self._ids.keys()
+        if missing:
+            _execute(ADD_SQL, [(name,) for name in sorted(missing)])
+            self.load()
+        with self._lock:
+            return {name: self._ids[name] for name in names if name in self._ids}
+
+    def with_ids(self, df):
+        """`df` with a violation_id column for its `violation` names."""
+        codes, uniques = pd.factorize(df["violation"])
+        ids = self.ids_for(uniques)
+        lookup = np.array([ids.get(str(name), -1) for name in uniques] + [-1], dtype=np.int32)
+        values = lookup[codes]
+        return df.assign(violation_id=pd.arrays.IntegerArray(np.maximum(values, 0), values < 0))
+
+    def fill_ids(self, df):
+        """`df` with violation_id set where it is missing but the name is known
+        (e.g. archive files written before the column)."""
+        if "violation_id" not in df.columns:
+            return self.with_ids(df)
+        ids = pd.to_numeric(df["violation_id"]).astype("Int64")
+        missing = ids.isna() & df["violation"].notna()
+        if not missing.any():
+            return df
+        filled = self.with_ids(df.loc[missing, ["violation"]])["violation_id"].astype("Int64")
+        return df.assign(violation_id=ids.mask(missing, filled))
+
+    def resolve(self, text):
+        """Sorted ids of the violations matching the search text."""
+        text = str(text).strip().lower()
+        if not text:
+            return []
+        words = _WORD.findall(text)
+        with self._lock:
+            found = {vid for name, vid in self._ids.items() if text in name.lower()}
+            matched = None
+            for word in words:
+                ids = set()
+                i = bisect.bisect_left(self._sorted, word)
+                while i < len(self._sorted) and self._sorted[i].startswith(word):
+                    ids |= self._tokens[self._sorted[i]]
+                    i += 1
+                matched = ids if matched is None else matched & ids
+        return sorted(found | (matched or set()))
+
+
+_dictionary = None
+_dictionary_lock = threading.Lock()
+
+
+def get_dictionary():
+    """Return the process-wide dictionary, reloaded every SECURECHECK_VIOLATION_RESYNC seconds
+    (other processes may have added names)."""
+    global _dictionary
+    with _dictionary_lock:
+        if _dictionary is None:
+            ensure_table()
+            dictionary = ViolationDictionary()
+            dictionary.load()
+            _dictionary = dictionary
+        elif time.time() - _dictionary.loaded_at > VIOLATION_RESYNC_SECONDS:
+            _dictionary.load()
+    return _dictionary
+
+
+@before_table_write
+def _add_violation_ids(table_name, df):
+    if table_name.lower() != TABLE or "violation" not in df.columns or "violation_id" in df.columns:
+        return df
+    return get_dictionary().with_ids(df)
+
+
+def backfill(batch_rows=BACKFILL_BATCH_ROWS):
+    """Set violation_id on stops that have a violation name but no id. Returns rows updated."""
+    pending = f"FROM {TABLE} WHERE violation_id IS NULL AND violation IS NOT NULL"
+    names = run_query(f"SELECT DISTINCT violation {pending}", ttl=0, name="Violation backfill names")
+    if names.empty:
+        return 0
+    get_dictionary().ids_for(names["violation"])
+    bounds = run_query(f"SELECT MIN(id) AS lo, MAX(id) AS hi {pending}", ttl=0, name="Violation backfill range")
+    lo, hi = int(bounds["lo"].iloc[0]), int(bounds["hi"].iloc[0])
+    updated = 0
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # id ranges keep each UPDATE (and its locks) short
+            for start in range(lo, hi + 1, batch_rows):
+                cursor.execute(BACKFILL_SQL, (start, start + batch_rows - 1))
+                updated += cursor.rowcount
+                conn.commit()
+        finally:
+            cursor.close()
+    notify_table_changed(TABLE)
+    return updated
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        ensure_table()
+        print(f"{backfill():,} stops given a violation_id")
+    else:
+        print(__doc__)